@@ -0,0 +1,344 @@
+"""
+Price and indicator alerts for watchlist symbols.
+
+A rule watches one metric of one symbol (price, daily % change, RSI or the
+gap between price and a moving average) and fires when that metric crosses
+its threshold in the chosen direction. Thresholds are kept in sorted arrays
+per (symbol, metric, direction), so checking a new quote is two binary
+searches for the thresholds that lie between the previous and the current
+value, however many rules a symbol has.
+
+A rule that fired stays quiet for its cool-down window, and repeated quotes
+cannot fire it twice because only a move across the threshold counts. Rules
+and the history of fired alerts are saved as JSON.
+
+There is one engine per process: the dashboard has no user accounts, so all
+browser sessions share the same rules and history (single-user use). Every
+session shows the alerts that fire after it started, whichever session's
+quotes triggered them.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+import history_store
+import indicators
+
+logger = logging.getLogger(__name__)
+
+# Where rules and fired alerts are saved (override with the STOCK_ALERTS_FILE environment variable)
+DEFAULT_ALERTS_FILE = os.environ.get(
+    "STOCK_ALERTS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "alerts.json")
+)
+
+# Moving averages that price can be compared against
+MA_WINDOWS = (20, 50, 200)
+
+# Metric -> label; the ma<N> metrics are the % gap between price and the N-day SMA
+METRICS = {
+    'price': "Price",
+    'pct_change': "Change (%)",
+    'rsi': f"RSI ({indicators.RSI_PERIOD})",
+    **{f'ma{window}': f"Price vs {window}-day MA (%)" for window in MA_WINDOWS},
+}
+DIRECTIONS = ('above', 'below')
+
+# Metrics that need the daily close history rather than just the quote
+HISTORY_METRICS = frozenset(['rsi'] + [f'ma{window}' for window in MA_WINDOWS])
+
+# Default seconds a rule stays quiet after firing
+DEFAULT_COOLDOWN = 3600
+
+# Fired alerts kept in the saved history
+MAX_HISTORY = 200
+
+
+class ThresholdIndex:
+    """
+    Sorted thresholds of the rules watching one metric of one symbol in one direction
+
+    Finding the thresholds crossed by a move is two bisections plus the matches.
+    """
+
+    def __init__(self):
+        self.thresholds = []
+        self.rule_ids = []
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    def add(self, threshold, rule_id):
+        position = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(position, threshold)
+        self.rule_ids.insert(position, rule_id)
+
+    def remove(self, threshold, rule_id):
+        position = bisect_left(self.thresholds, threshold)
+        while self.rule_ids[position] != rule_id:
+            position += 1
+        del self.thresholds[position], self.rule_ids[position]
+
+    def crossed_upward(self, previous, current):
+        """Rules with previous < threshold <= current"""
+        return self.rule_ids[bisect_right(self.thresholds, previous):bisect_right(self.thresholds, current)]
+
+    def crossed_downward(self, previous, current):
+        """Rules with current <= threshold < previous"""
+        return self.rule_ids[bisect_left(self.thresholds, current):bisect_left(self.thresholds, previous)]
+
+
+def _history_closes(symbol):
+    """Daily closes before today, used as the base for RSI and moving averages"""
+    hist = history_store.get_store().get_history(symbol, "1y")
+    if hist.empty:
+        return None
+    closes = hist['Close'].dropna()
+    today = pd.Timestamp.now(tz=closes.index.tz).normalize()
+    return closes[closes.index < today].to_numpy(dtype=float)
+
+
+def indicator_levels(closes, price):
+    """
+    RSI and moving-average gaps with the current price as today's close
+
+    Parameters:
+    closes (numpy.ndarray): Daily closes before today
+    price (float): Current price
+
+    Returns:
+    dict: 'rsi' and 'ma<N>' (% above or below the N-day SMA) for every level with enough history
+    """
+    series = pd.Series(np.append(closes, price))
+    levels = {}
+    rsi = indicators.rsi(series).iloc[-1]
+    if not np.isnan(rsi):
+        levels['rsi'] = float(rsi)
+    for window in MA_WINDOWS:
+        if len(series) >= window:
+            average = series.iloc[-window:].mean()
+            levels[f'ma{window}'] = float((price / average - 1) * 100)
+    return levels
+
+
+def describe(rule):
+    """Human-readable description of a rule, e.g. 'RELIANCE.NS Price above 2500'"""
+    return f"{rule['symbol']} {METRICS[rule['metric']]} {rule['direction']} {rule['threshold']:g}"
+
+
+class AlertEngine:
+    """
+    Alert rules with indexed threshold evaluation and persistent history
+
+    Parameters:
+    path (str): JSON file for rules and fired alerts (defaults to DEFAULT_ALERTS_FILE)
+    load_closes (callable): Function returning a symbol's daily closes before today, for indicator rules
+    clock (callable): Time source in epoch seconds (replaceable for testing)
+    """
+
+    def __init__(self, path=None, load_closes=_history_closes, clock=time.time):
+        self.path = path or DEFAULT_ALERTS_FILE
+        self._load_closes = load_closes
+        self._clock = clock
+        self._lock = threading.RLock()
+        self.rules = {}      # rule id -> rule dict
+        self.history = []    # fired alerts, newest first
+        self._index = {}     # (symbol, metric, direction) -> ThresholdIndex
+        self._last = {}      # (symbol, metric) -> last value seen
+        self._closes = {}    # symbol -> (day, daily closes before that day)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+            for rule in saved.get('rules', []):
+                self._insert(rule)
+            self.history = saved.get('history', [])[:MAX_HISTORY]
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            # A truncated or hand-edited file must not stop the dashboard loading; keep a copy
+            # because the next saved rule replaces it
+            shutil.copyfile(self.path, f"{self.path}.corrupt")
+            logger.warning("Could not read alerts %s (%s); starting with no rules, copy kept at %s.corrupt",
+                           self.path, e, self.path)
+            self.rules, self.history, self._index = {}, [], {}
+
+    def save(self):
+        """Write rules and fired alerts to JSON, replacing the file atomically"""
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'rules': list(self.rules.values()), 'history': self.history}, f, indent=2)
+            os.replace(temp_path, self.path)
+
+    def _insert(self, rule):
+        self.rules[rule['id']] = rule
+        key = (rule['symbol'], rule['metric'], rule['direction'])
+        self._index.setdefault(key, ThresholdIndex()).add(rule['threshold'], rule['id'])
+
+    def add_rule(self, symbol, metric, direction, threshold, cooldown=DEFAULT_COOLDOWN):
+        """
+        Register a rule and save it
+
+        Parameters:
+        symbol (str): Stock ticker symbol
+        metric (str): One of METRICS
+        direction (str): "above" (fires on a move up through the threshold) or "below"
+        threshold (float): Level to watch
+        cooldown (float): Seconds the rule stays quiet after firing
+
+        Returns:
+        dict: The new rule
+
+        Raises:
+        ValueError: If the metric or direction is unknown, or the same rule already exists
+        """
+        symbol = symbol.strip().upper()
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        if direction not in DIRECTIONS:
+            raise ValueError("direction must be above or below")
+        threshold = float(threshold)
+
+        with self._lock:
+            for rule in self.rules.values():
+                if (rule['symbol'], rule['metric'], rule['direction'], rule['threshold']) == \
+                        (symbol, metric, direction, threshold):
+                    raise ValueError(f"An alert for {describe(rule)} already exists")
+            rule = {
+                'id': uuid.uuid4().hex[:12], 'symbol': symbol, 'metric': metric, 'direction': direction,
+                'threshold': threshold, 'cooldown': float(cooldown), 'created': self._clock(), 'last_fired': None,
+            }
+            self._insert(rule)
+            self.save()
+        return rule
+
+    def remove_rule(self, rule_id):
+        """Delete a rule and save the change"""
+        with self._lock:
+            rule = self.rules.pop(rule_id)
+            key = (rule['symbol'], rule['metric'], rule['direction'])
+            self._index[key].remove(rule['threshold'], rule_id)
+            if not self._index[key]:
+                del self._index[key]
+            self.save()
+
+    def clear_history(self):
+        with self._lock:
+            self.history = []
+            self.save()
+
+    def fired_since(self, since):
+        """
+        Alerts fired after a point in time, oldest first
+
+        Parameters:
+        since (float): Epoch seconds
+
+        Returns:
+        list: Entries of the alert history
+        """
+        return [alert for alert in reversed(self.history) if alert['time'] > since]
+
+    def _refresh_closes(self, symbols):
+        """Load today's daily closes for symbols that need them, without holding the engine lock"""
+        today = time.strftime('%Y-%m-%d', time.localtime(self._clock()))
+        with self._lock:
+            stale = [symbol for symbol in symbols if self._closes.get(symbol, (None,))[0] != today]
+        for symbol in stale:
+            try:
+                closes = self._load_closes(symbol)
+            except Exception:
+                # Leave it uncached so the next evaluation tries again
+                continue
+            with self._lock:
+                self._closes[symbol] = (today, closes)
+
+    def _metric_values(self, quote, metrics):
+        """Current values of the wanted metrics for one quote row"""
+        values = {'price': quote['price'], 'pct_change': quote.get('pct_change')}
+        if metrics & HISTORY_METRICS:
+            cached = self._closes.get(quote['symbol'])
+            if cached is not None and cached[1] is not None:
+                values.update(indicator_levels(cached[1], quote['price']))
+        return {metric: values[metric] for metric in metrics if pd.notna(values.get(metric))}
+
+    def evaluate(self, quotes):
+        """
+        Check quotes against the rules and record the alerts that fire
+
+        The first value seen for a metric only sets its baseline; afterwards a
+        rule fires when the metric moves through its threshold in the rule's
+        direction, unless the rule is still cooling down.
+
+        Parameters:
+        quotes (pandas.DataFrame): Quote snapshot with symbol, price and pct_change columns
+
+        Returns:
+        list: Alerts fired by these quotes (dicts with rule, symbol, metric, value, time and message)
+        """
+        fired = []
+        with self._lock:
+            watched = {}
+            for symbol, metric, _ in self._index:
+                watched.setdefault(symbol, set()).add(metric)
+
+        # Only the few rows of symbols with rules leave the columnar snapshot
+        watched_quotes = quotes[quotes['symbol'].isin(list(watched)) & quotes['price'].notna()]
+        # History may come from the network, so it is loaded before the lock is taken
+        self._refresh_closes([symbol for symbol in watched_quotes['symbol'] if watched[symbol] & HISTORY_METRICS])
+
+        with self._lock:
+            now = self._clock()
+            for quote in watched_quotes.to_dict('records'):
+                metrics = watched[quote['symbol']]
+                for metric, value in self._metric_values(quote, metrics).items():
+                    previous = self._last.get((quote['symbol'], metric))
+                    self._last[(quote['symbol'], metric)] = value
+                    if previous is None or value == previous:
+                        continue
+                    direction = 'above' if value > previous else 'below'
+                    index = self._index.get((quote['symbol'], metric, direction))
+                    if index is None:
+                        continue
+                    crossed = (index.crossed_upward(previous, value) if direction == 'above'
+                               else index.crossed_downward(previous, value))
+                    for rule_id in crossed:
+                        rule = self.rules[rule_id]
+                        if rule['last_fired'] is not None and now - rule['last_fired'] < rule['cooldown']:
+                            continue
+                        rule['last_fired'] = now
+                        fired.append({
+                            'rule': rule_id, 'symbol': rule['symbol'], 'metric': metric,
+                            'direction': direction, 'threshold': rule['threshold'], 'value': value, 'time': now,
+                            'message': f"{describe(rule)} (now {value:,.2f})",
+                        })
+
+            if fired:
+                self.history = (fired[::-1] + self.history)[:MAX_HISTORY]
+                self.save()
+        return fired
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide alert engine, loading it on first use"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = AlertEngine()
+        return _default_engine
@@ -1,16 +1,27 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
-import base64
-from io import StringIO
-import pandas_datareader.data as web
-import requests
-import json
+from collections import OrderedDict
+from datetime import datetime
+import functools
+import os
 import time
 
+import alerts
+import backtest
+import chart_prep
+import comparison
+import exporter
+import history_store
+import indicators
+import intraday_store
+import live_feed
+import market_data
+import metrics
+import news
+import portfolio
+import prefetch
+import symbol_index
+
 # Set page configuration
 st.set_page_config(
     page_title="Indian Stock Market Analysis",
@@ -21,6 +32,11 @@ st.set_page_config(
 # Create a theme toggle button in the sidebar
 theme = st.sidebar.toggle("Dark Theme", value=False)
 
+# Stream price updates into the watchlist and price chart
+live_mode = st.sidebar.toggle("Live Quotes", value=False, help="Update prices every few seconds")
+LIVE_REFRESH = live_feed.POLL_INTERVAL  # seconds between live updates
+MAX_INDICATOR_ENGINES = 4  # recently analysed (symbol, period, interval) views kept per session
+
 # Apply theme based on toggle
 if theme:
     st.markdown("""
@@ -61,6 +77,123 @@ else:
 # Initialize session states
 if 'watchlist' not in st.session_state:
     st.session_state.watchlist = ["RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS"]
+if 'portfolio' not in st.session_state:
+    st.session_state.portfolio = portfolio.Portfolio.load()
+if 'alerts_seen' not in st.session_state:
+    st.session_state.alerts_seen = time.time()
+
+# Cached views over the headless data layer (market_data has no Streamlit dependency)
+# (hits and misses of each st.cache_data layer are counted for the diagnostics panel)
+load_daily_data = metrics.count_cache("st:load_stock_data", st.cache_data(ttl=3600, show_spinner=False),
+                                      market_data.load_stock_data)
+load_comparison_panel = metrics.count_cache("st:load_comparison_panel", st.cache_data(ttl=3600, show_spinner=False),
+                                            comparison.load_panel)
+run_parameter_sweep = metrics.count_cache("st:run_parameter_sweep", st.cache_data(ttl=3600, show_spinner=False),
+                                          backtest.sweep)
+get_sectors = metrics.count_cache("st:get_sectors", st.cache_data(ttl=86400, show_spinner=False),
+                                  market_data.get_sectors)
+# Watchlist quotes, index quotes, the penny screen and market breadth are cached inside the
+# data layer, shared by all sessions and kept warm by the background prefetcher
+get_index_snapshot = market_data.get_index_snapshot
+get_watchlist_data = market_data.get_watchlist_data
+get_penny_stocks = market_data.get_penny_stocks
+get_market_breadth = market_data.get_market_breadth
+# News feeds and articles are cached per symbol and per article, so overlapping feeds share them
+get_news_feed = market_data.get_news_feed
+
+
+# Function to load intraday bars for the current bar only
+def load_intraday_bar(ticker, period, interval, bar):
+    """
+    Load intraday data; bar (the number of the current bar) is only part of the cache key
+
+    The intraday store already caches the bars, so this layer only saves the
+    repeated company-info lookup and is refreshed as each new bar starts.
+    """
+    return market_data.load_stock_data(ticker, period, interval)
+
+
+load_intraday_data = metrics.count_cache("st:load_intraday_data", st.cache_data(ttl=900, show_spinner=False),
+                                         load_intraday_bar)
+
+
+# Function to get stock data through the cache that suits the interval
+def load_stock_data(ticker, period, interval='1d'):
+    """
+    Load stock data, caching daily bars for an hour and intraday bars for one bar
+
+    Parameters:
+    ticker (str): Stock ticker symbol
+    period (str): Time period for historical data
+    interval (str): Bar interval, "1d" or one of intraday_store.INTERVALS
+
+    Returns:
+    tuple: Stock information and historical data, (None, None) if unavailable
+    """
+    if interval in intraday_store.INTERVALS:
+        bar = int(time.time() // intraday_store.bar_seconds(interval))
+        return load_intraday_data(ticker, period, interval, bar)
+    return load_daily_data(ticker, period, interval)
+
+
+# One background refresher per server process
+@st.cache_resource
+def get_prefetcher():
+    """Start the background prefetcher for watchlist, index and penny-stock data"""
+    return prefetch.Prefetcher().start()
+
+
+get_prefetcher().track(st.session_state.watchlist)
+
+
+# One metrics file writer per server process, read by a local Prometheus scraper
+@st.cache_resource
+def get_metrics_writer():
+    """
+    Start rewriting the Prometheus metrics file
+
+    Set STOCK_METRICS_FILE to choose the file (defaults to metrics.prom in the cache directory).
+    """
+    path = os.environ.get("STOCK_METRICS_FILE", os.path.join(history_store.CACHE_DIR, "metrics.prom"))
+    return metrics.TextfileWriter(path).start()
+
+
+get_metrics_writer()
+
+
+# One live quote feed per server process, shared by every session
+@st.cache_resource
+def get_live_feed():
+    """
+    Create the live quote feed
+
+    Set STOCK_LIVE_REPLAY to a CSV of recorded ticks (symbol, time, price) to
+    replay it instead of polling Yahoo; STOCK_LIVE_REPLAY_SPEED speeds it up.
+    """
+    replay_file = os.environ.get("STOCK_LIVE_REPLAY")
+    if replay_file:
+        speed = float(os.environ.get("STOCK_LIVE_REPLAY_SPEED", "1"))
+        return live_feed.ReplayFeed.from_csv(replay_file, speed=speed, loop=True)
+    return live_feed.PollingFeed()
+
+
+# Function to read the live ticks a part of the page has not shown yet
+def read_live_ticks(reader, symbols):
+    """
+    Get new ticks for some symbols since this reader last asked
+
+    Parameters:
+    reader (str): Name of the page section reading the feed (each keeps its own cursor)
+    symbols (list): Stock symbols
+
+    Returns:
+    list: New ticks, oldest first
+    """
+    feed = get_live_feed()
+    feed.subscribe(symbols)
+    cursors = st.session_state.setdefault('live_cursors', {})
+    ticks, cursors[reader] = feed.updates(cursors.get(reader, 0), symbols)
+    return ticks
 
 # Custom CSS
 st.markdown("""
@@ -112,22 +245,6 @@ st.markdown("""
         padding: 2px 5px;
         border-radius: 3px;
     }
-    .download-btn {
-        text-align: center;
-        color: white;
-        background-color: #FF6B6B;
-        padding: 10px 15px;
-        border-radius: 5px;
-        text-decoration: none;
-        display: inline-block;
-        margin: 10px 0;
-        transition: background-color 0.3s;
-    }
-    .download-btn:hover {
-        background-color: #FF4F4F;
-        text-decoration: none;
-        color: white;
-    }
     .footer {
         text-align: center;
         margin-top: 20px;
@@ -153,75 +270,98 @@ st.markdown("""
 # Market Overview widget showing major Indian indices
 st.markdown('<div class="sub-header">🔍 Market Overview</div>', unsafe_allow_html=True)
 
-# Create a 4-column layout for market indices
-col1, col2, col3, col4 = st.columns(4)
-
-
-# Function to get current index data
-@st.cache_data(ttl=1800)  # Cache for 30 minutes
-def get_index_data(ticker):
-    try:
-        index = yf.Ticker(ticker)
-        info = index.info
-        current = info.get('regularMarketPrice', 0)
-        prev_close = info.get('previousClose', 0)
-        change = current - prev_close
-        pct_change = (change / prev_close) * 100 if prev_close else 0
-        return current, change, pct_change
-    except:
-        return 0, 0, 0
-
-
-# Get data for each index
-nifty_price, nifty_change, nifty_pct = get_index_data("^NSEI")  # NIFTY 50
-sensex_price, sensex_change, sensex_pct = get_index_data("^BSESN")  # SENSEX
-nifty_bank_price, nifty_bank_change, nifty_bank_pct = get_index_data("^NSEBANK")  # NIFTY BANK
-nifty_it_price, nifty_it_change, nifty_it_pct = get_index_data("NIFTYIT.NS")  # NIFTY IT
+# Get data for all indices in one concurrent round-trip
+index_snapshot = get_index_snapshot(tuple(symbol for _, symbol in market_data.MARKET_INDICES))
 
 # Display the indices
-with col1:
-    st.markdown(f"""
-    <div class="card" style="text-align: center; height: 100px;">
-        <span class="metric-label">NIFTY 50</span>
-        <div class="metric-value">{nifty_price:.2f}</div>
-        <p class="{'green-text' if nifty_change >= 0 else 'red-text'}" style="margin: 0;">
-            {'+' if nifty_change >= 0 else ''}{nifty_change:.2f} ({nifty_pct:.2f}%)
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+for col, (label, symbol) in zip(st.columns(len(market_data.MARKET_INDICES)), market_data.MARKET_INDICES):
+    index_price, index_change, index_pct = index_snapshot[symbol]
+    with col:
+        st.markdown(f"""
+        <div class="card" style="text-align: center; height: 100px;">
+            <span class="metric-label">{label}</span>
+            <div class="metric-value">{index_price:.2f}</div>
+            <p class="{'green-text' if index_change >= 0 else 'red-text'}" style="margin: 0;">
+                {'+' if index_change >= 0 else ''}{index_change:.2f} ({index_pct:.2f}%)
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
 
-with col2:
-    st.markdown(f"""
-    <div class="card" style="text-align: center; height: 100px;">
-        <span class="metric-label">SENSEX</span>
-        <div class="metric-value">{sensex_price:.2f}</div>
-        <p class="{'green-text' if sensex_change >= 0 else 'red-text'}" style="margin: 0;">
-            {'+' if sensex_change >= 0 else ''}{sensex_change:.2f} ({sensex_pct:.2f}%)
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
 
-with col3:
-    st.markdown(f"""
-    <div class="card" style="text-align: center; height: 100px;">
-        <span class="metric-label">NIFTY BANK</span>
-        <div class="metric-value">{nifty_bank_price:.2f}</div>
-        <p class="{'green-text' if nifty_bank_change >= 0 else 'red-text'}" style="margin: 0;">
-            {'+' if nifty_bank_change >= 0 else ''}{nifty_bank_change:.2f} ({nifty_bank_pct:.2f}%)
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+# Function to draw the sector -> stock treemap coloured by the day's change
+def render_sector_treemap(stocks):
+    import plotly.graph_objects as go
+
+    sectors = stocks.groupby('sector')['change_pct'].mean()
+    # Sector tiles first, then every stock under its sector (tiles are equal-sized per stock)
+    ids = [f"sector:{sector}" for sector in sectors.index] + list(stocks.index)
+    labels = list(sectors.index) + list(stocks['name'])
+    parents = [""] * len(sectors) + [f"sector:{sector}" for sector in stocks['sector']]
+    changes = list(sectors) + list(stocks['change_pct'])
+    limit = max(1.0, float(stocks['change_pct'].abs().quantile(0.95)))
+
+    fig = go.Figure(go.Treemap(
+        ids=ids, labels=labels, parents=parents, values=[0] * len(sectors) + [1] * len(stocks),
+        customdata=changes, branchvalues="remainder",
+        marker=dict(colors=changes, colorscale='RdYlGn', cmid=0, cmin=-limit, cmax=limit),
+        texttemplate="%{label}<br>%{customdata:+.2f}%",
+        hovertemplate="%{label}: %{customdata:+.2f}%<extra></extra>"
+    ))
+    fig.update_layout(height=500, margin=dict(l=0, r=0, t=10, b=0))
+    st.plotly_chart(fig, use_container_width=True)
+
+
+# Market breadth reruns on its own and is only computed while it is open
+@st.fragment
+def render_market_breadth():
+    panel = st.expander("📊 Market Breadth & Sector Heatmap", key="breadth_panel", on_change="rerun")
+    if not panel.open:
+        return
+
+    with panel:
+        with st.spinner("Scanning the market..."):
+            result = get_market_breadth()
+        if result is None:
+            st.warning("Market breadth is unavailable right now. Please try again later.")
+            return
+
+        summary = result['summary']
+        ad_ratio = summary['ad_ratio']
+        cols = st.columns(4)
+        cols[0].metric("Advances / Declines", f"{summary['advances']} / {summary['declines']}",
+                       f"A/D ratio {ad_ratio:.2f}" if ad_ratio == ad_ratio and ad_ratio != float('inf') else None,
+                       delta_color="off")
+        cols[1].metric("Above 50-Day MA", f"{summary['pct_above_ma50']:.1f}%")
+        cols[2].metric("Above 200-Day MA", f"{summary['pct_above_ma200']:.1f}%")
+        cols[3].metric("52-Week Highs / Lows", f"{summary['new_highs']} / {summary['new_lows']}")
+        as_of = result['as_of']
+        st.caption(f"{summary['stocks']} stocks, {summary['unchanged']} unchanged"
+                   + (f" · closes as of {as_of:%d %b %Y}" if as_of is not None else ""))
+
+        heatmap_tab, sector_tab = st.tabs(["Sector Heatmap", "Sector Breadth"])
+        with heatmap_tab:
+            render_sector_treemap(result['stocks'])
+        with sector_tab:
+            st.dataframe(
+                result['sectors'].rename_axis('Sector').rename(columns={
+                    'stocks': 'Stocks',
+                    'advances': 'Advances',
+                    'declines': 'Declines',
+                    'avg_change_pct': 'Avg Change (%)',
+                    'pct_above_ma50': 'Above 50-Day MA (%)',
+                    'pct_above_ma200': 'Above 200-Day MA (%)',
+                    'new_highs': '52W Highs',
+                    'new_lows': '52W Lows'
+                }).style.format({
+                    'Avg Change (%)': '{:+.2f}',
+                    'Above 50-Day MA (%)': '{:.1f}',
+                    'Above 200-Day MA (%)': '{:.1f}'
+                }),
+                use_container_width=True
+            )
 
-with col4:
-    st.markdown(f"""
-    <div class="card" style="text-align: center; height: 100px;">
-        <span class="metric-label">NIFTY IT</span>
-        <div class="metric-value">{nifty_it_price:.2f}</div>
-        <p class="{'green-text' if nifty_it_change >= 0 else 'red-text'}" style="margin: 0;">
-            {'+' if nifty_it_change >= 0 else ''}{nifty_it_change:.2f} ({nifty_it_pct:.2f}%)
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+
+render_market_breadth()
 
 # Stock Market Basics for beginners expandable section
 with st.expander("📚 Stock Market Basics for Beginners"):
@@ -286,156 +426,57 @@ with st.expander("📚 Stock Market Basics for Beginners"):
     """)
 
 
-# Function to get stock data
-@st.cache_data(ttl=3600, show_spinner=False)
-def load_stock_data(ticker, period='1y'):
+# Shared symbol index and background remote search (one per server process)
+@st.cache_resource
+def get_symbol_search():
     """
-    Load stock data for the given ticker symbol
-
-    Parameters:
-    ticker (str): Stock ticker symbol
-    period (str): Time period for historical data
-
-    Returns:
-    tuple: Stock information and historical data
-    """
-    try:
-        # Get stock information
-        stock = yf.Ticker(ticker)
-        info = stock.info
-
-        # Get historical market data
-        hist = stock.history(period=period)
-
-        # Check if data was retrieved
-        if hist.empty:
-            return None, None
-
-        return info, hist
-    except Exception as e:
-        st.error(f"Error retrieving data: {e}")
-        return None, None
-
-
-@st.cache_data(ttl=86400, show_spinner=False)
-def search_stock_symbols(query):
-    """
-    Search for stock symbols and company names based on a query
-
-    Parameters:
-    query (str): Search query
+    Build the local symbol index and its remote enrichment helper
 
     Returns:
-    list: List of dictionaries containing stock symbols and company names
-    """
-    try:
-        # Yahoo Finance API endpoint for symbol suggestions
-        url = f"https://query1.finance.yahoo.com/v1/finance/search?q={query}&quotesCount=20&newsCount=0"
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        response = requests.get(url, headers=headers)
-
-        if response.status_code == 200:
-            data = response.json()
-            if 'quotes' in data and len(data['quotes']) > 0:
-                results = []
-                for quote in data['quotes']:
-                    # Only include equities, not currencies, futures, etc.
-                    if 'symbol' in quote and 'shortname' in quote and 'quoteType' in quote:
-                        if quote['quoteType'] in ['EQUITY', 'ETF']:
-                            results.append({
-                                'symbol': quote['symbol'],
-                                'name': quote['shortname'],
-                                'exchange': quote.get('exchange', '')
-                            })
-                return results
-        return []
-    except Exception as e:
-        # Silently fail and return empty list
-        return []
-
-
-# Function to get commonly used stock symbols (as a fallback)
-@st.cache_data(ttl=86400, show_spinner=False)
-def get_popular_stocks(query):
+    tuple: (SymbolIndex, RemoteEnricher)
     """
-    Get a list of popular stocks that match the query
+    index = symbol_index.get_index()
+    return index, symbol_index.RemoteEnricher(market_data.search_stock_symbols, index=index)
+
+
+# Polls until the background remote search finishes, then reruns the page with its results added
+@st.fragment(run_every=1)
+def wait_for_remote_search():
+    query = st.session_state.remote_search
+    _, enricher = get_symbol_search()
+    if not enricher.is_pending(query):
+        existing_symbols = {stock['symbol'] for stock in st.session_state.search_results}
+        st.session_state.search_results = st.session_state.search_results + [
+            result for result in enricher.lookup(query) if result['symbol'] not in existing_symbols
+        ]
+        st.session_state.remote_search = None
+        st.rerun()
+    st.caption("Searching Yahoo Finance for more matches...")
 
-    Parameters:
-    query (str): Search query (prefix)
 
-    Returns:
-    list: List of dictionaries containing stock symbols and company names
-    """
-    # List of popular Indian stock symbols and names (NSE)
-    popular_stocks = [
-        {"symbol": "RELIANCE.NS", "name": "Reliance Industries Ltd."},
-        {"symbol": "TCS.NS", "name": "Tata Consultancy Services Ltd."},
-        {"symbol": "HDFCBANK.NS", "name": "HDFC Bank Ltd."},
-        {"symbol": "INFY.NS", "name": "Infosys Ltd."},
-        {"symbol": "HINDUNILVR.NS", "name": "Hindustan Unilever Ltd."},
-        {"symbol": "ICICIBANK.NS", "name": "ICICI Bank Ltd."},
-        {"symbol": "SBIN.NS", "name": "State Bank of India"},
-        {"symbol": "BHARTIARTL.NS", "name": "Bharti Airtel Ltd."},
-        {"symbol": "KOTAKBANK.NS", "name": "Kotak Mahindra Bank Ltd."},
-        {"symbol": "ITC.NS", "name": "ITC Ltd."},
-        {"symbol": "LT.NS", "name": "Larsen & Toubro Ltd."},
-        {"symbol": "AXISBANK.NS", "name": "Axis Bank Ltd."},
-        {"symbol": "ASIANPAINT.NS", "name": "Asian Paints Ltd."},
-        {"symbol": "HCLTECH.NS", "name": "HCL Technologies Ltd."},
-        {"symbol": "MARUTI.NS", "name": "Maruti Suzuki India Ltd."},
-        {"symbol": "SUNPHARMA.NS", "name": "Sun Pharmaceutical Industries Ltd."},
-        {"symbol": "BAJFINANCE.NS", "name": "Bajaj Finance Ltd."},
-        {"symbol": "TITAN.NS", "name": "Titan Company Ltd."},
-        {"symbol": "ULTRACEMCO.NS", "name": "UltraTech Cement Ltd."},
-        {"symbol": "WIPRO.NS", "name": "Wipro Ltd."},
-        {"symbol": "TATAMOTORS.NS", "name": "Tata Motors Ltd."},
-        {"symbol": "ADANIENT.NS", "name": "Adani Enterprises Ltd."},
-        {"symbol": "ONGC.NS", "name": "Oil & Natural Gas Corporation Ltd."},
-        {"symbol": "NTPC.NS", "name": "NTPC Ltd."},
-        {"symbol": "POWERGRID.NS", "name": "Power Grid Corporation of India Ltd."},
-        {"symbol": "TATASTEEL.NS", "name": "Tata Steel Ltd."},
-        {"symbol": "M&M.NS", "name": "Mahindra & Mahindra Ltd."},
-        {"symbol": "BAJAJFINSV.NS", "name": "Bajaj Finserv Ltd."},
-        {"symbol": "HDFCLIFE.NS", "name": "HDFC Life Insurance Company Ltd."},
-        {"symbol": "COALINDIA.NS", "name": "Coal India Ltd."},
-        {"symbol": "JSWSTEEL.NS", "name": "JSW Steel Ltd."},
-        {"symbol": "ADANIPORTS.NS", "name": "Adani Ports and Special Economic Zone Ltd."},
-        {"symbol": "TECHM.NS", "name": "Tech Mahindra Ltd."},
-        {"symbol": "NESTLEIND.NS", "name": "Nestle India Ltd."},
-        {"symbol": "INDUSINDBK.NS", "name": "IndusInd Bank Ltd."},
-        {"symbol": "NIFTY50.NS", "name": "Nifty 50 Index"},
-        {"symbol": "BANKNIFTY.NS", "name": "Nifty Bank Index"}
-    ]
-
-    # Filter stocks based on query (case-insensitive)
-    query = query.lower()
-    filtered_stocks = []
-
-    for stock in popular_stocks:
-        if (stock["symbol"].lower().startswith(query) or
-                query in stock["name"].lower() or
-                stock["symbol"].lower() == query):
-            filtered_stocks.append(stock)
-
-    return filtered_stocks
-
-
-# Function to create a downloadable CSV
-def get_csv_download_link(df, filename="stock_data.csv"):
+# Function to show download buttons for a DataFrame, one per export format
+def render_download_buttons(df, name, key):
     """
-    Generate a download link for a DataFrame as CSV
+    Show a download button for each export format; files are only written when clicked
 
     Parameters:
-    df (pandas.DataFrame): DataFrame to convert to CSV
-    filename (str): Name of the file to download
-
-    Returns:
-    str: HTML download link
+    df (pandas.DataFrame): DataFrame to export
+    name (str): File name without extension
+    key (str): Widget key prefix
     """
-    csv = df.to_csv(index=True)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="{filename}">Download CSV File</a>'
-    return href
+    available = exporter.available_formats()
+    for col, (fmt, (label, _, _, modules)) in zip(st.columns(len(exporter.FORMATS)), exporter.FORMATS.items()):
+        with col:
+            st.download_button(
+                f"📥 Download as {label}",
+                data=functools.partial(exporter.to_bytes, df, fmt),
+                file_name=exporter.file_name(name, fmt),
+                mime=exporter.mime_type(fmt),
+                key=f"{key}_{fmt}",
+                on_click="ignore",
+                disabled=fmt not in available,
+                help=None if fmt in available else f"Install {' or '.join(modules)} to enable {label} export"
+            )
 
 
 # Function to format large numbers
@@ -459,208 +500,6 @@ def format_number(num):
         return f"{num:.2f}"
 
 
-# Function to get news for a stock
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_stock_news(ticker, num_items=5):
-    """
-    Get latest news for a stock
-
-    Parameters:
-    ticker (str): Stock ticker symbol
-    num_items (int): Number of news items to retrieve
-
-    Returns:
-    list: List of news items
-    """
-    try:
-        # Get the ticker object
-        stock = yf.Ticker(ticker)
-
-        # Get news
-        news = stock.news
-
-        # Limit to specified number of items
-        news = news[:num_items] if news and len(news) > 0 else []
-
-        return news
-    except Exception as e:
-        # Silently fail
-        return []
-
-
-# Function to get market news (general)
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_market_news(num_items=5):
-    """
-    Get general market news
-
-    Parameters:
-    num_items (int): Number of news items to retrieve
-
-    Returns:
-    list: List of news items
-    """
-    try:
-        # Use either NIFTY50.NS or SENSEX.BO to get market news
-        market = yf.Ticker("^NSEI")  # NIFTY 50 Index
-
-        # Get news
-        news = market.news
-
-        # Limit to specified number of items
-        news = news[:num_items] if news and len(news) > 0 else []
-
-        return news
-    except Exception as e:
-        # Silently fail
-        return []
-
-
-# Function to get data for multiple stocks (watchlist)
-@st.cache_data(ttl=900, show_spinner=False)  # Cache for 15 minutes
-def get_watchlist_data(symbols):
-    """
-    Get current price data for multiple stocks
-
-    Parameters:
-    symbols (list): List of stock symbols
-
-    Returns:
-    list: List of dictionaries with stock data
-    """
-    results = []
-    for symbol in symbols:
-        try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            hist = stock.history(period="1d")
-
-            if not hist.empty and 'Close' in hist.columns:
-                current_price = hist['Close'].iloc[-1]
-                prev_close = info.get('previousClose', current_price)
-                change = current_price - prev_close
-                pct_change = (change / prev_close) * 100 if prev_close else 0
-
-                results.append({
-                    'symbol': symbol,
-                    'name': info.get('longName', symbol),
-                    'price': current_price,
-                    'change': change,
-                    'pct_change': pct_change,
-                    'volume': info.get('volume', 0),
-                    'market_cap': info.get('marketCap', 0)
-                })
-        except Exception as e:
-            # Skip stocks with errors
-            continue
-
-    return results
-
-
-# Function to get penny stocks data
-@st.cache_data(ttl=86400, show_spinner=False)  # Cache for a day
-def get_penny_stocks():
-    """
-    Get a curated list of penny stocks from India
-
-    Returns:
-    list: List of dictionaries with penny stock data
-    """
-    # List of promising Indian penny stocks (price < ₹100)
-    # Updated with verified symbols that are available on Yahoo Finance
-    penny_stocks = [
-        {"symbol": "YESBANK.NS", "name": "Yes Bank Ltd.", "sector": "Banking",
-         "desc": "Recovering private bank focusing on digital transformation"},
-        {"symbol": "SUZLON.NS", "name": "Suzlon Energy Ltd.", "sector": "Renewable Energy",
-         "desc": "Wind power equipment manufacturer with global presence"},
-        {"symbol": "IDFC.NS", "name": "IDFC Ltd.", "sector": "Finance",
-         "desc": "Infrastructure finance company with focus on banking and financial services"},
-        {"symbol": "PNB.NS", "name": "Punjab National Bank", "sector": "Banking",
-         "desc": "One of India's largest public sector banks with nationwide presence"},
-        {"symbol": "ZOMATO.NS", "name": "Zomato Ltd.", "sector": "Technology",
-         "desc": "Leading food delivery platform expanding into quick commerce"},
-        {"symbol": "BANKBARODA.NS", "name": "Bank of Baroda", "sector": "Banking",
-         "desc": "Major public sector bank with international presence"},
-        {"symbol": "FEDERALBNK.NS", "name": "Federal Bank Ltd.", "sector": "Banking",
-         "desc": "Private sector bank with strong presence in South India"},
-        {"symbol": "IRCTC.NS", "name": "Indian Railway Catering and Tourism Corp.", "sector": "Travel",
-         "desc": "Railway ticketing and catering monopoly business"},
-        {"symbol": "PETRONET.NS", "name": "Petronet LNG Ltd.", "sector": "Energy",
-         "desc": "India's largest importer of liquefied natural gas"}
-    ]
-
-    # Get current data for these penny stocks
-    results = []
-    for stock in penny_stocks:
-        try:
-            # First check if we can get a history for this stock (validates the symbol)
-            data = yf.Ticker(stock["symbol"])
-            hist = data.history(period="1mo")
-
-            if hist.empty or 'Close' not in hist.columns:
-                continue
-
-            # Get price data
-            current_price = hist['Close'].iloc[-1] if not hist.empty else None
-            price_30d_ago = hist['Close'].iloc[0] if len(hist) > 1 else current_price
-
-            # Only process if we have valid price data
-            if current_price and current_price > 0:
-                # Calculate change
-                pct_change_30d = ((
-                                              current_price - price_30d_ago) / price_30d_ago) * 100 if price_30d_ago and price_30d_ago > 0 else 0
-
-                # Get additional info if available
-                info = data.info if hasattr(data, 'info') else {}
-
-                results.append({
-                    'symbol': stock["symbol"],
-                    'name': stock["name"],
-                    'sector': stock["sector"],
-                    'description': stock["desc"],
-                    'price': current_price,
-                    'pct_change_30d': pct_change_30d
-                })
-        except Exception as e:
-            # Skip stocks with errors but don't fail completely
-            continue
-
-    # If we couldn't get any valid data, return a default placeholder
-    if not results:
-        # Return at least two stocks we know exist (major Indian stocks)
-        default_stocks = [
-            {"symbol": "RELIANCE.NS", "name": "Reliance Industries Ltd.", "sector": "Conglomerate",
-             "desc": "India's largest private sector company with interests in petrochemicals, retail, and telecommunications"},
-            {"symbol": "TCS.NS", "name": "Tata Consultancy Services Ltd.", "sector": "IT Services",
-             "desc": "India's largest IT services company with global operations"}
-        ]
-
-        # Try to get data for these default stocks
-        for stock in default_stocks:
-            try:
-                data = yf.Ticker(stock["symbol"])
-                hist = data.history(period="1mo")
-
-                if not hist.empty and 'Close' in hist.columns:
-                    current_price = hist['Close'].iloc[-1]
-                    price_30d_ago = hist['Close'].iloc[0] if len(hist) > 1 else current_price
-                    pct_change_30d = ((
-                                                  current_price - price_30d_ago) / price_30d_ago) * 100 if price_30d_ago and price_30d_ago > 0 else 0
-
-                    results.append({
-                        'symbol': stock["symbol"],
-                        'name': stock["name"],
-                        'sector': stock["sector"],
-                        'description': stock["desc"],
-                        'price': current_price,
-                        'pct_change_30d': pct_change_30d
-                    })
-            except:
-                continue
-
-    return results
-
-
 # Input for stock symbol with search suggestions
 col1, col2 = st.columns([3, 1])
 with col1:
@@ -680,24 +519,28 @@ with col1:
 
     # If the search query is at least 2 characters long, search for symbols
     if len(search_query) >= 2 and search_query != st.session_state.stock_symbol:
-        with st.spinner("Searching..."):
-            # First, try to get symbols from our local popular stocks list for quick results
-            popular_results = get_popular_stocks(search_query)
+        index, enricher = get_symbol_search()
 
-            # Then get results from Yahoo Finance API
-            api_results = search_stock_symbols(search_query)
+        # Local index answers instantly and offline
+        with metrics.timer("search:symbol_index"):
+            combined_results = index.search(search_query, limit=10)
 
-            # Combine results (prioritize our popular stocks)
-            combined_results = popular_results.copy()
-
-            # Add API results that aren't duplicates
-            existing_symbols = [stock['symbol'] for stock in combined_results]
-            for result in api_results:
+        # Remote search only fills in when the local index has few matches;
+        # it runs in the background and the page reruns once it has finished
+        if len(combined_results) < 6:
+            existing_symbols = {stock['symbol'] for stock in combined_results}
+            for result in enricher.lookup(search_query):
                 if result['symbol'] not in existing_symbols:
                     combined_results.append(result)
+            if enricher.is_pending(search_query):
+                st.session_state.remote_search = search_query
+
+        # Save the combined results
+        st.session_state.search_results = combined_results
 
-            # Save the combined results
-            st.session_state.search_results = combined_results
+    # A remote search still running keeps polling until its results are in
+    if st.session_state.get('remote_search'):
+        wait_for_remote_search()
 
     # Display search results as buttons
     if st.session_state.search_results:
@@ -709,6 +552,7 @@ with col1:
                 if st.button(f"{result['symbol']} - {result['name']}", key=f"suggestion_{i}"):
                     st.session_state.stock_symbol = result['symbol']
                     st.session_state.search_results = []
+                    st.session_state.remote_search = None
                     # Use rerun to update the page with the selected symbol
                     st.rerun()
 
@@ -729,8 +573,33 @@ with col2:
         "2 Years": "2y",
         "5 Years": "5y"
     }
-    selected_period = st.selectbox("Select Time Period", list(period_options.keys()))
-    period = period_options[selected_period]
+    interval_options = {
+        "Daily": "1d",
+        "15 Minutes": "15m",
+        "5 Minutes": "5m",
+        "1 Minute": "1m"
+    }
+    intraday_period_options = {
+        "Today": "1d",
+        "5 Days": "5d",
+        "1 Month": "1mo"
+    }
+    period_col, interval_col = st.columns([2, 1])
+    with interval_col:
+        selected_interval = st.selectbox("Bar Interval", list(interval_options.keys()))
+        interval = interval_options[selected_interval]
+    with period_col:
+        if interval == "1d":
+            selected_period = st.selectbox("Select Time Period", list(period_options.keys()))
+            period = period_options[selected_period]
+        else:
+            # Yahoo Finance only serves a limited window of intraday bars
+            supported = intraday_store.supported_periods(interval)
+            selected_period = st.selectbox(
+                "Select Time Period",
+                [label for label, value in intraday_period_options.items() if value in supported]
+            )
+            period = intraday_period_options[selected_period]
 
 # Add watchlist section
 st.markdown('<div class="sub-header">👀 Your Watchlist</div>', unsafe_allow_html=True)
@@ -751,75 +620,367 @@ def remove_from_watchlist(symbol):
     return False
 
 
-# Create three columns - one for adding to watchlist, two for displaying the watchlist data
-watchlist_col1, watchlist_col2 = st.columns([1, 3])
+# The watchlist reruns on its own when stocks are added or removed,
+# and on a timer while live quotes are on
+def render_watchlist():
+    # Create three columns - one for adding to watchlist, two for displaying the watchlist data
+    watchlist_col1, watchlist_col2 = st.columns([1, 3])
+
+    with watchlist_col1:
+        # Add to watchlist section
+        st.markdown("**Add to Watchlist**")
+        new_symbol = st.text_input("Enter Stock Symbol (e.g., RELIANCE.NS)", key="new_watchlist_item")
 
-with watchlist_col1:
-    # Add to watchlist section
-    st.markdown("**Add to Watchlist**")
-    new_symbol = st.text_input("Enter Stock Symbol (e.g., RELIANCE.NS)", key="new_watchlist_item")
+        if st.button("➕ Add to Watchlist", key="add_watchlist_btn"):
+            if add_to_watchlist(new_symbol.upper()):
+                get_prefetcher().track([new_symbol.upper()])
+                st.toast(f"Added {new_symbol.upper()} to watchlist!")
+                st.rerun(scope="fragment")
+            else:
+                if new_symbol == "":
+                    st.warning("Please enter a valid stock symbol")
+                else:
+                    st.info(f"{new_symbol.upper()} is already in your watchlist")
+
+    with watchlist_col2:
+        # Display watchlist data
+        if st.session_state.watchlist:
+            # Get data for all watchlist stocks
+            with st.spinner("Loading watchlist data..."):
+                watchlist_data = get_watchlist_data(st.session_state.watchlist)
+
+            # Overlay the latest streamed price for each symbol
+            if live_mode and not watchlist_data.empty:
+                latest = st.session_state.setdefault('live_latest', {})
+                latest.update({tick.symbol: tick for tick in read_live_ticks('watchlist', st.session_state.watchlist)})
+                watchlist_data = live_feed.apply_ticks(watchlist_data, list(latest.values()))
+
+            # Check every refreshed quote against the alert rules, then show every alert fired since
+            # this session last looked (rules are shared, so another session's quotes may fire them)
+            engine = alerts.get_engine()
+            engine.evaluate(watchlist_data)
+            for alert in engine.fired_since(st.session_state.alerts_seen):
+                st.toast(f"🔔 {alert['message']}")
+                st.session_state.alerts_seen = alert['time']
+
+            if not watchlist_data.empty:
+                # Display the snapshot in a clean table using the recommended style.map() method
+                styled_df = watchlist_data[['symbol', 'name', 'price', 'pct_change']].rename(
+                    columns={
+                        'symbol': 'Symbol',
+                        'name': 'Company',
+                        'price': 'Price (₹)',
+                        'pct_change': 'Change (%)'
+                    }
+                ).style.format({
+                    'Price (₹)': '{:.2f}',
+                    'Change (%)': '{:.2f}%'
+                })
 
-    if st.button("➕ Add to Watchlist", key="add_watchlist_btn"):
-        if add_to_watchlist(new_symbol.upper()):
-            st.success(f"Added {new_symbol.upper()} to watchlist!")
-            time.sleep(1)
-            st.rerun()
+                # Apply color formatting to the Change column
+                styled_df = styled_df.map(
+                    lambda val: f'color: {"green" if val > 0 else "red" if val < 0 else "black"}',
+                    subset=['Change (%)']
+                )
+
+                st.dataframe(styled_df)
+
+                # Add remove buttons for each stock
+                cols = st.columns(len(watchlist_data))
+                for i, (col, symbol) in enumerate(zip(cols, watchlist_data['symbol'])):
+                    with col:
+                        if st.button(f"🗑️ Remove {symbol}", key=f"remove_{i}"):
+                            remove_from_watchlist(symbol)
+                            st.rerun(scope="fragment")
+
+                # Export the stored history of every watchlist stock as one archive
+                export_col1, export_col2 = st.columns([1, 2])
+                with export_col1:
+                    export_format = st.selectbox(
+                        "Export format", exporter.available_formats(),
+                        format_func=lambda fmt: exporter.FORMATS[fmt][0], key="watchlist_export_format"
+                    )
+                with export_col2:
+                    st.download_button(
+                        f"📦 Export {selected_period} {selected_interval.lower()} history",
+                        data=functools.partial(exporter.export_histories, list(st.session_state.watchlist),
+                                               period, export_format, interval),
+                        file_name=f"watchlist_{period}_{interval}_{export_format}.zip",
+                        mime="application/zip",
+                        key="watchlist_export",
+                        on_click="ignore"
+                    )
+            else:
+                st.info("Unable to fetch data for your watchlist. Please try again later.")
         else:
-            if new_symbol == "":
-                st.warning("Please enter a valid stock symbol")
+            st.info("Your watchlist is empty. Add stocks to track them here.")
+
+
+st.fragment(render_watchlist, run_every=LIVE_REFRESH if live_mode else None)()
+
+
+# Alert rules are checked whenever the watchlist refreshes; this panel only manages them
+@st.fragment
+def render_alerts():
+    engine = alerts.get_engine()
+    panel = st.expander(f"🔔 Price & Indicator Alerts ({len(engine.rules)} active)", key="alerts_panel",
+                        on_change="rerun")
+    if not panel.open:
+        return
+
+    with panel:
+        with st.form("add_alert", clear_on_submit=True):
+            form_cols = st.columns([2, 2, 1, 1, 1])
+            alert_symbol = form_cols[0].selectbox("Symbol", st.session_state.watchlist, accept_new_options=True)
+            alert_metric = form_cols[1].selectbox("Condition", list(alerts.METRICS),
+                                                  format_func=lambda metric: alerts.METRICS[metric])
+            alert_direction = form_cols[2].selectbox("Crosses", alerts.DIRECTIONS)
+            alert_threshold = form_cols[3].number_input("Threshold", value=0.0, step=1.0)
+            alert_cooldown = form_cols[4].number_input("Cool-down (min)", min_value=0,
+                                                       value=alerts.DEFAULT_COOLDOWN // 60, step=5)
+            submitted = st.form_submit_button("➕ Add Alert")
+
+        if submitted:
+            if not alert_symbol:
+                st.warning("Please pick a stock symbol")
             else:
-                st.info(f"{new_symbol.upper()} is already in your watchlist")
-
-with watchlist_col2:
-    # Display watchlist data
-    if st.session_state.watchlist:
-        # Get data for all watchlist stocks
-        with st.spinner("Loading watchlist data..."):
-            watchlist_data = get_watchlist_data(st.session_state.watchlist)
-
-        if watchlist_data:
-            # Create a DataFrame for better display
-            watchlist_df = pd.DataFrame(watchlist_data)
-
-
-            # Format the display with colors for price changes
-            def highlight_change(val):
-                color = 'green' if val > 0 else 'red' if val < 0 else 'black'
-                return f'color: {color}'
-
-
-            # Display in a clean table using the recommended style.map() method
-            styled_df = watchlist_df[['symbol', 'name', 'price', 'pct_change']].rename(
-                columns={
-                    'symbol': 'Symbol',
-                    'name': 'Company',
-                    'price': 'Price (₹)',
-                    'pct_change': 'Change (%)'
-                }
-            ).style.format({
-                'Price (₹)': '{:.2f}',
-                'Change (%)': '{:.2f}%'
-            })
-
-            # Apply color formatting to the Change column
-            styled_df = styled_df.map(
-                lambda val: f'color: {"green" if val > 0 else "red" if val < 0 else "black"}',
-                subset=['Change (%)']
+                try:
+                    rule = engine.add_rule(alert_symbol, alert_metric, alert_direction, alert_threshold,
+                                           cooldown=alert_cooldown * 60)
+                    if rule['symbol'] not in st.session_state.watchlist:
+                        add_to_watchlist(rule['symbol'])
+                        get_prefetcher().track([rule['symbol']])
+                    st.toast(f"Alert added: {alerts.describe(rule)}")
+                except ValueError as e:
+                    st.error(str(e))
+
+        st.caption("Alerts fire when a watchlist quote moves through the threshold, then stay quiet for the cool-down. "
+                   "Rules and history are shared by every browser session of this dashboard (single-user).")
+
+        for rule in sorted(engine.rules.values(), key=lambda rule: (rule['symbol'], rule['metric'], rule['threshold'])):
+            rule_col, delete_col = st.columns([5, 1])
+            rule_col.markdown(f"**{alerts.describe(rule)}** · cool-down {rule['cooldown'] / 60:g} min")
+            if delete_col.button("🗑️ Delete", key=f"delete_alert_{rule['id']}"):
+                engine.remove_rule(rule['id'])
+                st.rerun(scope="fragment")
+
+        if engine.history:
+            st.markdown("**Recent Alerts**")
+            st.dataframe(
+                pd.DataFrame(engine.history).assign(
+                    time=lambda frame: pd.to_datetime(frame['time'], unit='s', utc=True).dt.tz_convert('Asia/Kolkata')
+                )[['time', 'message']].rename(columns={'time': 'Time', 'message': 'Alert'}),
+                hide_index=True,
+                use_container_width=True
             )
+            if st.button("Clear alert history", key="clear_alert_history"):
+                engine.clear_history()
+                st.rerun(scope="fragment")
 
-            st.dataframe(styled_df)
 
-            # Add remove buttons for each stock
-            cols = st.columns(len(watchlist_data))
-            for i, (col, stock) in enumerate(zip(cols, watchlist_data)):
-                with col:
-                    if st.button(f"🗑️ Remove {stock['symbol']}", key=f"remove_{i}"):
-                        remove_from_watchlist(stock['symbol'])
-                        st.rerun()
-        else:
-            st.info("Unable to fetch data for your watchlist. Please try again later.")
-    else:
-        st.info("Your watchlist is empty. Add stocks to track them here.")
+render_alerts()
+
+# Comparison Section
+st.markdown('<div class="sub-header">⚖️ Compare Stocks</div>', unsafe_allow_html=True)
+
+
+# The comparison reruns on its own and only loads data while it is open
+@st.fragment
+def render_comparison():
+    panel = st.expander("Compare stocks against NIFTY 50", key="compare_panel", on_change="rerun")
+    if not panel.open:
+        return
+
+    with panel:
+        pick_col, period_col = st.columns([3, 1])
+        with pick_col:
+            symbols = st.multiselect(
+                "Stocks to compare (type to add symbols outside your watchlist)",
+                options=st.session_state.watchlist,
+                default=st.session_state.watchlist,
+                accept_new_options=True
+            )
+        with period_col:
+            compare_label = st.selectbox("Comparison Period", list(period_options.keys()), index=3)
+
+        symbols = [symbol.upper() for symbol in symbols]
+        if len(symbols) < 2:
+            st.info("Pick at least two stocks to compare")
+            return
+
+        # One aligned close panel feeds every statistic below
+        with st.spinner("Loading price history..."):
+            closes = load_comparison_panel(symbols, period_options[compare_label])
+
+        if closes.shape[1] < 2:
+            st.warning("Not enough price history to compare these stocks. Please try again later.")
+            return
+
+        result = comparison.compare(closes)
+        benchmark_label = dict((symbol, label) for label, symbol in market_data.MARKET_INDICES).get(
+            comparison.BENCHMARK, comparison.BENCHMARK)
+
+        perf_tab, corr_tab, beta_tab = st.tabs(["Performance", "Correlation", f"Beta vs {benchmark_label}"])
+
+        with perf_tab:
+            st.markdown("**Growth of ₹100**")
+            st.line_chart(result['normalized'])
+            st.dataframe(
+                result['summary'].rename(columns={
+                    'total_return_pct': 'Return (%)',
+                    'volatility_pct': 'Volatility (%, annualized)',
+                    'beta': f'Beta vs {benchmark_label}'
+                }).style.format('{:.2f}'),
+                use_container_width=True
+            )
+
+        with corr_tab:
+            import plotly.graph_objects as go
+
+            view = st.radio("Correlation over", ["Whole period", f"Rolling {comparison.ROLLING_WINDOW}-day window"],
+                            horizontal=True, label_visibility="collapsed")
+            corr = result['correlation']
+            corr_caption = "Correlation of daily returns over the whole period"
+            if view != "Whole period":
+                rolling_corr = comparison.rolling_correlation_matrix(result['returns'])
+                window_ends = rolling_corr.dropna(how='all').index.get_level_values(0).unique()
+                if len(window_ends):
+                    window_end = st.select_slider("Window ending", options=list(window_ends),
+                                                  value=window_ends[-1], format_func=lambda d: d.strftime('%d %b %Y'))
+                    corr = rolling_corr.loc[window_end]
+                    corr_caption = (f"Correlation of daily returns over the {comparison.ROLLING_WINDOW} trading days "
+                                    f"ending {window_end.strftime('%d %b %Y')}")
+                else:
+                    st.info(f"Not enough history yet for a {comparison.ROLLING_WINDOW}-day correlation window")
+
+            corr_fig = go.Figure(go.Heatmap(
+                z=corr.to_numpy(), x=corr.columns, y=corr.index,
+                zmin=-1, zmax=1, colorscale='RdBu', reversescale=True,
+                hovertemplate='%{y} / %{x}: %{z:.2f}<extra></extra>'
+            ))
+            corr_fig.update_layout(height=max(300, 25 * len(corr)), template="plotly_white",
+                                   margin=dict(l=10, r=10, t=10, b=10))
+            st.plotly_chart(corr_fig, use_container_width=True)
+            st.caption(corr_caption)
+
+        with beta_tab:
+            if 'rolling_beta' in result:
+                st.markdown(f"**Rolling {comparison.ROLLING_WINDOW}-day correlation with {benchmark_label}**")
+                st.line_chart(result['rolling_correlation'].dropna(how='all'))
+                st.markdown(f"**Rolling {comparison.ROLLING_WINDOW}-day beta**")
+                st.line_chart(result['rolling_beta'].dropna(how='all'))
+            else:
+                st.info(f"{benchmark_label} data is unavailable right now")
+
+
+render_comparison()
+
+# Portfolio Section
+st.markdown('<div class="sub-header">💼 My Portfolio</div>', unsafe_allow_html=True)
+
+
+# The portfolio reruns on its own and is only valued while it is open
+@st.fragment
+def render_portfolio():
+    panel = st.expander("Holdings, profit & loss and sector allocation", key="portfolio_panel", on_change="rerun")
+    if not panel.open:
+        return
+
+    with panel:
+        # The portfolio file is shared, so pick up transactions other sessions have saved
+        if not st.session_state.portfolio.is_current():
+            st.session_state.portfolio = portfolio.Portfolio.load()
+        book = st.session_state.portfolio
+
+        # Record a buy or sell
+        with st.form("add_transaction", clear_on_submit=True):
+            form_cols = st.columns([2, 1, 1, 1, 1, 2])
+            tx_symbol = form_cols[0].text_input("Symbol", placeholder="RELIANCE.NS")
+            tx_side = form_cols[1].selectbox("Side", portfolio.SIDES)
+            tx_quantity = form_cols[2].number_input("Quantity", min_value=0.0, step=1.0)
+            tx_price = form_cols[3].number_input("Price (₹)", min_value=0.0, step=0.05)
+            tx_fees = form_cols[4].number_input("Fees (₹)", min_value=0.0, step=1.0)
+            tx_date = form_cols[5].date_input("Trade Date", value=datetime.now().date())
+            submitted = st.form_submit_button("➕ Add Transaction")
+
+        if submitted:
+            try:
+                book = st.session_state.portfolio = portfolio.update(
+                    lambda latest: latest.add(tx_symbol, tx_side, tx_quantity, tx_price, fees=tx_fees, on=tx_date)
+                )
+                st.toast(f"Recorded {tx_side.lower()} of {tx_quantity:g} {tx_symbol.upper()}")
+            except ValueError as e:
+                st.error(str(e))
+
+        if book.transactions.empty:
+            st.info("Your portfolio is empty. Add a transaction above to start tracking it.")
+            return
+
+        # One batched quote snapshot values every open lot
+        symbols = book.symbols
+        with st.spinner("Valuing portfolio..."):
+            quotes = get_watchlist_data(symbols) if symbols else None
+            prices = dict(zip(quotes['symbol'], quotes['price'])) if quotes is not None else {}
+        result = book.valuation(prices, get_sectors())
+        totals, holdings = result['totals'], result['holdings']
+
+        total_cols = st.columns(5)
+        total_cols[0].metric("Current Value", f"₹{format_number(totals['market_value'])}")
+        total_cols[1].metric("Invested", f"₹{format_number(totals['invested'])}")
+        total_cols[2].metric("Unrealized P&L", f"₹{totals['unrealized_pnl']:,.2f}",
+                             f"{totals['unrealized_pnl'] / totals['invested'] * 100:.2f}%" if totals['invested'] else None)
+        total_cols[3].metric("Realized P&L", f"₹{totals['realized_pnl']:,.2f}")
+        total_cols[4].metric("XIRR", "N/A" if pd.isna(totals['xirr_pct']) else f"{totals['xirr_pct']:.2f}%")
+
+        holdings_col, allocation_col = st.columns([3, 2])
+
+        with holdings_col:
+            st.markdown("**Holdings**")
+            st.dataframe(
+                holdings.rename(columns={
+                    'symbol': 'Symbol', 'quantity': 'Qty', 'avg_cost': 'Avg Cost (₹)', 'cost': 'Invested (₹)',
+                    'price': 'Price (₹)', 'market_value': 'Value (₹)', 'unrealized_pnl': 'Unrealized (₹)',
+                    'unrealized_pct': 'Unrealized (%)', 'realized_pnl': 'Realized (₹)', 'weight_pct': 'Weight (%)'
+                }).style.format(precision=2, na_rep='-').map(
+                    lambda val: f'color: {"green" if val > 0 else "red" if val < 0 else "black"}',
+                    subset=['Unrealized (₹)', 'Unrealized (%)', 'Realized (₹)']
+                ),
+                hide_index=True,
+                use_container_width=True
+            )
+
+        with allocation_col:
+            allocation = result['allocation']
+            if not allocation.empty:
+                import plotly.graph_objects as go
+
+                st.markdown("**Sector Allocation**")
+                allocation_fig = go.Figure(go.Pie(labels=allocation['sector'], values=allocation['market_value'],
+                                                  hole=0.45, textinfo='label+percent'))
+                allocation_fig.update_layout(height=300, showlegend=False, margin=dict(l=10, r=10, t=10, b=10))
+                st.plotly_chart(allocation_fig, use_container_width=True)
+
+        # Transaction history, with removal of mistaken entries
+        st.markdown("**Transactions**")
+        st.dataframe(book.transactions.assign(date=book.transactions['date'].dt.date), hide_index=True,
+                     use_container_width=True)
+
+        remove_cols = st.columns([3, 1])
+        position = remove_cols[0].selectbox(
+            "Remove a transaction", range(len(book.transactions)),
+            format_func=lambda i: "{date:%Y-%m-%d} {side} {quantity:g} {symbol} @ ₹{price:.2f}".format(
+                **book.transactions.iloc[i])
+        )
+        if remove_cols[1].button("🗑️ Remove", key="remove_transaction"):
+            transaction = book.transactions.iloc[position]
+            try:
+                st.session_state.portfolio = portfolio.update(lambda latest: latest.remove(latest.find(transaction)))
+                st.rerun(scope="fragment")
+            except ValueError as e:
+                st.error(str(e))
+
+
+render_portfolio()
 
 # Penny Stocks Section with enhanced UI
 st.markdown('<div class="sub-header">💰 Promising Penny Stocks</div>', unsafe_allow_html=True)
@@ -851,230 +1012,189 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Add filter options with tabs
-tab1, tab2, tab3 = st.tabs(["All Penny Stocks", "By Sector", "By Performance"])
-
-# Get penny stocks data
-with st.spinner("Loading penny stocks data..."):
-    penny_stocks_data = get_penny_stocks()
 
-if penny_stocks_data:
-    # Sort stocks by price for consistent display
-    penny_stocks_data = sorted(penny_stocks_data, key=lambda x: x['price'])
+# Column labels and number formats shared by the penny stock tables; formatting happens
+# in the browser, so the columns stay numeric and sort correctly
+penny_column_config = {
+    'symbol': "Symbol",
+    'name': "Name",
+    'sector': "Sector",
+    'price': st.column_config.NumberColumn("Price (₹)", format="₹%.2f"),
+    'pct_change_30d': st.column_config.NumberColumn("30-Day Change", format="%+.2f%%"),
+}
 
-    with tab1:
-        # Display in list view with detailed information
-        st.markdown("""
-        <style>
-        .penny-stock-list {
-            margin-bottom: 20px;
-        }
-        </style>
-        """, unsafe_allow_html=True)
 
-        # Create a data table for all penny stocks
-        data = []
-        for stock in penny_stocks_data:
-            change_arrow = "↑" if stock['pct_change_30d'] > 0 else "↓"
-
-            # Create performance indicator without HTML formatting (for table display)
-            performance = f"{change_arrow} {abs(stock['pct_change_30d']):.2f}%"
-
-            data.append({
-                "Symbol": stock['symbol'],
-                "Name": stock['name'],
-                "Sector": stock['sector'],
-                "Price (₹)": f"₹{stock['price']:.2f}",
-                "30-Day Change": performance,
-                "Action": stock  # We'll use this for action buttons
-            })
-
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-
-        # Format the dataframe for display
-        formatted_df = df.copy()
-        formatted_df = formatted_df.drop(columns=["Action"])
-
-        # Display as table
-        st.markdown("<h4>Complete Penny Stock List</h4>", unsafe_allow_html=True)
-        st.write("Click on any row to see more details about that stock")
-
-
-        # Style the dataframe to colorize the 30-Day Change column
-        def style_change_column(df):
-            styled = df.copy()
-            # Apply styling to the 30-Day Change column
-            for i, row in styled.iterrows():
-                change_text = row['30-Day Change']
-                if "↑" in change_text:
-                    styled.loc[
-                        i, '30-Day Change'] = f"<span style='color: #26A69A; font-weight: bold;'>{change_text}</span>"
-                else:
-                    styled.loc[
-                        i, '30-Day Change'] = f"<span style='color: #EF5350; font-weight: bold;'>{change_text}</span>"
-            return styled
+# Function to render the "All Penny Stocks" tab
+def render_penny_list(penny_stocks_data):
+    """
+    Show the penny stock table and a collapsible detail card per stock
 
+    Each detail card is only built while it is expanded.
 
-        # Apply styling and convert to HTML
-        styled_html = style_change_column(formatted_df).to_html(escape=False, index=False)
+    Parameters:
+    penny_stocks_data (pandas.DataFrame): Penny stock snapshot sorted by price
+    """
+    # Display the snapshot as a table
+    st.markdown("<h4>Complete Penny Stock List</h4>", unsafe_allow_html=True)
+    st.write("Open any stock below to see more details about it")
+
+    st.dataframe(
+        penny_stocks_data[['symbol', 'name', 'sector', 'price', 'pct_change_30d']],
+        column_config=penny_column_config,
+        hide_index=True,
+        use_container_width=True
+    )
 
-        # Display using st.dataframe (for interaction) and st.markdown (for styling)
-        st.dataframe(
-            formatted_df,
-            hide_index=True,
-            use_container_width=True
-        )
+    # Add note about sorting
+    st.info("💡 Tip: Click on any column header to sort the table by that column")
 
-        # Add note about sorting
-        st.info("💡 Tip: Click on any column header to sort the table by that column")
+    # Display detailed list below the table
+    st.markdown("### Detailed Stock Information", unsafe_allow_html=True)
 
-        # Display detailed list below the table
-        st.markdown("### Detailed Stock Information", unsafe_allow_html=True)
+    # Sort by name for consistent display
+    for stock in penny_stocks_data.sort_values('name').itertuples(index=False):
+        symbol = stock.symbol
 
-        # Sort by name for consistent display
-        sorted_stocks = sorted(penny_stocks_data, key=lambda x: x['name'])
+        # Create an expandable section for each stock; its body only runs while it is open
+        detail = st.expander(f"{stock.name} ({symbol})", key=f"penny_detail_{symbol}", on_change="rerun")
+        if not detail.open:
+            continue
 
-        for i, stock in enumerate(sorted_stocks):
-            change_color = "#26A69A" if stock['pct_change_30d'] > 0 else "#EF5350"
-            change_arrow = "↑" if stock['pct_change_30d'] > 0 else "↓"
+        with detail:
+            change_color = "#26A69A" if stock.pct_change_30d > 0 else "#EF5350"
+            change_arrow = "↑" if stock.pct_change_30d > 0 else "↓"
 
             # Calculate performance bars
-            performance_bars = ""
-            perf_val = min(max(int(abs(stock['pct_change_30d']) / 5), 1), 5)
-            if stock['pct_change_30d'] > 0:
+            perf_val = min(max(int(abs(stock.pct_change_30d) / 5), 1), 5)
+            if stock.pct_change_30d > 0:
                 performance_bars = "🟢" * perf_val
             else:
                 performance_bars = "🔴" * perf_val
 
-            # Create an expandable section for each stock
-            with st.expander(f"{stock['name']} ({stock['symbol']})"):
-                # Create two columns for layout
-                col1, col2 = st.columns([2, 1])
-
-                with col1:
-                    st.markdown(f"**Sector:** {stock['sector']}")
-                    st.markdown(f"**Price:** ₹{stock['price']:.2f}")
-                    st.markdown(f"""**30-Day Performance:** 
-                    <span style='color: {change_color}; font-weight: bold;'>
-                        {change_arrow} {abs(stock['pct_change_30d']):.2f}% {performance_bars}
-                    </span>
-                    """, unsafe_allow_html=True)
-                    st.markdown(f"**Description:** {stock['description']}")
+            # Create two columns for layout
+            col1, col2 = st.columns([2, 1])
+
+            with col1:
+                st.markdown(f"**Sector:** {stock.sector}")
+                st.markdown(f"**Price:** ₹{stock.price:.2f}")
+                st.markdown(f"""**30-Day Performance:** 
+                <span style='color: {change_color}; font-weight: bold;'>
+                    {change_arrow} {abs(stock.pct_change_30d):.2f}% {performance_bars}
+                </span>
+                """, unsafe_allow_html=True)
+                st.markdown(f"**Description:** {stock.description}")
+
+            with col2:
+                # Analyzing switches the whole page to this stock
+                if st.button(f"📊 Analyze", key=f"analyze_detail_{symbol}"):
+                    st.session_state.stock_symbol = symbol
+                    st.rerun()
 
-                with col2:
-                    # Add action buttons
-                    if st.button(f"📊 Analyze", key=f"analyze_detail_{i}"):
-                        st.session_state.stock_symbol = stock['symbol']
+                # Watchlist changes rerun the page so the watchlist above picks them up
+                if symbol in st.session_state.watchlist:
+                    if st.button(f"❌ Remove from Watchlist", key=f"remove_watchlist_detail_{symbol}"):
+                        remove_from_watchlist(symbol)
+                        st.toast(f"Removed {symbol} from watchlist!")
+                        st.rerun()
+                else:
+                    if st.button(f"➕ Add to Watchlist", key=f"add_watchlist_detail_{symbol}"):
+                        add_to_watchlist(symbol)
+                        st.toast(f"Added {symbol} to watchlist!")
                         st.rerun()
 
-                    if stock['symbol'] in st.session_state.watchlist:
-                        if st.button(f"❌ Remove from Watchlist", key=f"remove_watchlist_detail_{i}"):
-                            st.session_state.watchlist.remove(stock['symbol'])
-                            st.success(f"Removed {stock['symbol']} from watchlist!")
-                            time.sleep(1)
-                            st.rerun()
-                    else:
-                        if st.button(f"➕ Add to Watchlist", key=f"add_watchlist_detail_{i}"):
-                            if stock['symbol'] not in st.session_state.watchlist:
-                                st.session_state.watchlist.append(stock['symbol'])
-                                st.success(f"Added {stock['symbol']} to watchlist!")
-                                time.sleep(1)
-                                st.rerun()
-
-                # Add a horizontal separator
-                st.markdown("---")
-
-    with tab2:
-        # Group stocks by sector
-        sectors = {}
-        for stock in penny_stocks_data:
-            sector = stock['sector']
-            if sector not in sectors:
-                sectors[sector] = []
-            sectors[sector].append(stock)
-
-        # Display stocks by sector
-        for sector, stocks in sectors.items():
-            st.subheader(f"📌 {sector}")
-
-            # Create table view for this sector
-            data = []
-            for stock in stocks:
-                change_arrow = "↑" if stock['pct_change_30d'] > 0 else "↓"
-                data.append({
-                    "Symbol": stock['symbol'],
-                    "Name": stock['name'],
-                    "Price (₹)": f"₹{stock['price']:.2f}",
-                    "30-Day Change": f"{change_arrow} {abs(stock['pct_change_30d']):.2f}%",
-                    "Action": stock['symbol']  # We'll use this for action buttons
-                })
 
-            # Convert to DataFrame
-            if data:
-                df = pd.DataFrame(data)
+# Function to render the "By Sector" tab
+def render_penny_sectors(penny_stocks_data):
+    """
+    Show penny stocks grouped by sector
 
-                # Display styled dataframe without ButtonColumn which may not be available in this Streamlit version
-                st.dataframe(
-                    df.drop(columns=["Action"]),  # Remove the Action column as we'll add buttons below
-                    hide_index=True,
-                    width=800
-                )
+    Parameters:
+    penny_stocks_data (pandas.DataFrame): Penny stock snapshot sorted by price
+    """
+    # Group stocks by sector, in order of each sector's cheapest stock
+    for sector, stocks in penny_stocks_data.groupby('sector', sort=False, observed=True):
+        st.subheader(f"📌 {sector}")
+
+        # Create table view for this sector
+        st.dataframe(stocks[['symbol', 'name', 'price', 'pct_change_30d']], column_config=penny_column_config,
+                     hide_index=True, width=800)
+
+        # Add action buttons below the table
+        cols = st.columns(len(stocks))
+        for i, (col, symbol) in enumerate(zip(cols, stocks['symbol'])):
+            with col:
+                if st.button(f"📊 Analyze {symbol}", key=f"analyze_sector_{sector}_{i}"):
+                    st.session_state.stock_symbol = symbol
+                    st.rerun()
 
-                # Add action buttons below the table instead
-                cols = st.columns(len(stocks))
-                for i, stock in enumerate(stocks):
-                    with cols[i]:
-                        if st.button(f"📊 Analyze {stock['symbol']}", key=f"analyze_sector_{sector}_{i}"):
-                            st.session_state.stock_symbol = stock['symbol']
-                            st.rerun()
-
-            st.markdown("<br>", unsafe_allow_html=True)
-
-    with tab3:
-        # Sort by performance
-        gainers = sorted([s for s in penny_stocks_data if s['pct_change_30d'] > 0],
-                         key=lambda x: x['pct_change_30d'], reverse=True)
-        losers = sorted([s for s in penny_stocks_data if s['pct_change_30d'] <= 0],
-                        key=lambda x: x['pct_change_30d'])
-
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.subheader("🟢 Top Gainers (30d)")
-            if gainers:
-                # Create styled table for gainers
-                for stock in gainers:
-                    st.markdown(f"""
-                    <div style="border-left: 4px solid #26A69A; padding: 10px; margin-bottom: 10px; background-color: rgba(38, 166, 154, 0.1); border-radius: 4px;">
-                        <div style="display: flex; justify-content: space-between;">
-                            <span style="font-weight: bold;">{stock['symbol']}</span>
-                            <span style="color: #26A69A; font-weight: bold;">↑ {stock['pct_change_30d']:.2f}%</span>
-                        </div>
-                        <div>{stock['name']}</div>
-                        <div style="font-size: 0.9rem; margin-top: 5px;">₹{stock['price']:.2f}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.info("No gainers in the selected period")
+        st.markdown("<br>", unsafe_allow_html=True)
+
+
+# Function to build the gainer or loser cards of the "By Performance" tab as one HTML block
+def performance_cards(stocks, color, background, arrow):
+    return "".join(f"""
+    <div style="border-left: 4px solid {color}; padding: 10px; margin-bottom: 10px; background-color: {background}; border-radius: 4px;">
+        <div style="display: flex; justify-content: space-between;">
+            <span style="font-weight: bold;">{stock.symbol}</span>
+            <span style="color: {color}; font-weight: bold;">{arrow} {abs(stock.pct_change_30d):.2f}%</span>
+        </div>
+        <div>{stock.name}</div>
+        <div style="font-size: 0.9rem; margin-top: 5px;">₹{stock.price:.2f}</div>
+    </div>
+    """ for stock in stocks.itertuples(index=False))
+
+
+# Function to render the "By Performance" tab
+def render_penny_performance(penny_stocks_data):
+    """
+    Show the 30-day gainers and losers side by side
+
+    Parameters:
+    penny_stocks_data (pandas.DataFrame): Penny stock snapshot sorted by price
+    """
+    # Split and sort by performance
+    gaining = penny_stocks_data['pct_change_30d'] > 0
+    gainers = penny_stocks_data[gaining].sort_values('pct_change_30d', ascending=False)
+    losers = penny_stocks_data[~gaining].sort_values('pct_change_30d')
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("🟢 Top Gainers (30d)")
+        if not gainers.empty:
+            st.markdown(performance_cards(gainers, "#26A69A", "rgba(38, 166, 154, 0.1)", "↑"),
+                        unsafe_allow_html=True)
+        else:
+            st.info("No gainers in the selected period")
+
+    with col2:
+        st.subheader("🔴 Top Losers (30d)")
+        if not losers.empty:
+            st.markdown(performance_cards(losers, "#EF5350", "rgba(239, 83, 80, 0.1)", "↓"),
+                        unsafe_allow_html=True)
+        else:
+            st.info("No losers in the selected period")
 
-        with col2:
-            st.subheader("🔴 Top Losers (30d)")
-            if losers:
-                # Create styled table for losers
-                for stock in losers:
-                    st.markdown(f"""
-                    <div style="border-left: 4px solid #EF5350; padding: 10px; margin-bottom: 10px; background-color: rgba(239, 83, 80, 0.1); border-radius: 4px;">
-                        <div style="display: flex; justify-content: space-between;">
-                            <span style="font-weight: bold;">{stock['symbol']}</span>
-                            <span style="color: #EF5350; font-weight: bold;">↓ {abs(stock['pct_change_30d']):.2f}%</span>
-                        </div>
-                        <div>{stock['name']}</div>
-                        <div style="font-size: 0.9rem; margin-top: 5px;">₹{stock['price']:.2f}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.info("No losers in the selected period")
+
+# The penny stock section reruns on its own when a tab or detail card is opened
+@st.fragment
+def render_penny_stocks():
+    # Add filter options with tabs; only the selected tab is built
+    tabs = st.tabs(["All Penny Stocks", "By Sector", "By Performance"], key="penny_tab", on_change="rerun")
+    renderers = [render_penny_list, render_penny_sectors, render_penny_performance]
+
+    # Get the penny stock snapshot, already sorted by price
+    with st.spinner("Loading penny stocks data..."):
+        penny_stocks_data = get_penny_stocks()
+
+    if penny_stocks_data.empty:
+        st.warning("Unable to load penny stocks data. Please try again later.")
+        return
+
+    for tab, render in zip(tabs, renderers):
+        if tab.open:
+            with tab:
+                render(penny_stocks_data)
 
     # Add a disclaimer at the bottom
     st.markdown("""
@@ -1084,8 +1204,277 @@ if penny_stocks_data:
     </div>
     """, unsafe_allow_html=True)
 
-else:
-    st.warning("Unable to load penny stocks data. Please try again later.")
+
+render_penny_stocks()
+
+# Function to display a list of news items as cards
+def render_news_items(items, symbol=None):
+    """
+    Display news items as styled cards
+
+    Parameters:
+    items (list): News items from Yahoo Finance
+    symbol (str): Analysed symbol; items from other feeds are labelled with their source
+    """
+    for item in items:
+        # Format the date
+        publish_date = datetime.fromtimestamp(item.get('providerPublishTime', 0)).strftime('%Y-%m-%d %H:%M')
+        title = item.get('title', 'No title available')
+        summary = item.get('summary', 'No summary available')
+        url = item.get('link', '#')
+        source = item.get('publisher') or 'Unknown Source'
+
+        # Say why an article is in the feed when it is not about the analysed stock
+        feeds = item.get('symbols', [])
+        if symbol is None or symbol in feeds or not feeds:
+            label = ""
+        elif any(feed in news.MARKET_SYMBOLS for feed in feeds):
+            label = " | Market"
+        else:
+            label = f" | Sector peer: {', '.join(feeds)}"
+
+        # Display news in a styled card
+        st.markdown(f"""
+        <div class="card" style="margin-bottom: 10px; background-color: #f8f9fa;">
+            <h4 style="margin-top: 0;">{title}</h4>
+            <p style="color: #666; font-size: 0.8rem;">{publish_date} | Source: {source}{label}</p>
+            <p>{summary[:200]}{'...' if len(summary) > 200 else ''}</p>
+            <a href="{url}" target="_blank" style="color: #FF6B6B; text-decoration: none; font-weight: bold;">
+                Read full article →
+            </a>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+# The news block reruns on its own, so opening it keeps the analysis on screen
+@st.fragment
+def render_news(symbol, company_name):
+    """
+    Show company, sector peer and market news once the reader opens the news panel
+
+    Parameters:
+    symbol (str): Stock ticker symbol
+    company_name (str): Company name shown in the heading
+    """
+    news_panel = st.expander(f"Headlines for {company_name}", key=f"news_{symbol}", on_change="rerun")
+    if not news_panel.open:
+        return
+
+    with news_panel:
+        # One merged feed for the company, its sector peers and the market, fetched concurrently
+        feed = get_news_feed(symbol, num_items=8)
+
+        if feed:
+            st.markdown(f"""
+            <div class="card">
+                <h4 style="color: #3D5A80; margin-top: 0;">Latest News: {company_name}, Sector Peers and Market</h4>
+            </div>
+            """, unsafe_allow_html=True)
+            render_news_items(feed, symbol)
+        else:
+            st.info("No recent news found.")
+
+
+# The price chart reruns on its own: switching the chart type or adding live ticks
+# redraws only this chart, and the history is never re-fetched
+@metrics.instrument("render:price_chart")
+def render_price_chart(hist, chart_data, symbol, title, interval="1d"):
+    """
+    Draw the price and volume chart
+
+    Parameters:
+    hist (pandas.DataFrame): Historical OHLCV data
+    chart_data (pandas.DataFrame): hist with derived chart columns (see chart_prep)
+    symbol (str): Stock ticker symbol
+    title (str): Chart title
+    interval (str): Bar interval of hist
+    """
+    import plotly.graph_objects as go
+
+    # Chart type selector
+    chart_type = st.radio(
+        "Select Chart Type",
+        ["Line Chart", "Candlestick Chart"],
+        horizontal=True
+    )
+
+    # Fold streamed ticks into the latest bar instead of re-fetching history
+    if live_mode:
+        ticks = st.session_state.setdefault('live_ticks', {}).setdefault(symbol, [])
+        ticks.extend(read_live_ticks(f"chart_{symbol}", [symbol]))
+        del ticks[:-live_feed.MAX_TICKS]
+        if ticks:
+            chart_data = chart_prep.prepare_chart_data(
+                live_feed.merge_ticks(hist, ticks, intraday_store.INTERVALS.get(interval))
+            )
+            last_tick = ticks[-1]
+            st.caption(f"🔴 Live: ₹{last_tick.price:.2f} at "
+                       f"{last_tick.time.tz_convert('Asia/Kolkata').strftime('%H:%M:%S')} IST")
+
+    # Prepare data for plotting, bounded by the chart width
+    price_data, volume_data = chart_prep.downsample_for_chart(chart_data, chart_type)
+    fig = go.Figure()
+
+    if chart_type == "Line Chart":
+        ma_unit = "Day" if interval == "1d" else "Bar"
+
+        # Add price line with gradient fill
+        fig.add_trace(
+            go.Scatter(
+                x=price_data.index,
+                y=price_data['Close'],
+                mode='lines',
+                name='Close Price',
+                line=dict(color='#FF6B6B', width=2),
+                fill='tozeroy',
+                fillcolor='rgba(255, 107, 107, 0.1)'
+            )
+        )
+
+        # Add moving averages
+        fig.add_trace(
+            go.Scatter(
+                x=price_data.index,
+                y=price_data['MA5'],
+                mode='lines',
+                name=f'5-{ma_unit} MA',
+                line=dict(color='#4ECDC4', width=1.5, dash='dot')
+            )
+        )
+
+        fig.add_trace(
+            go.Scatter(
+                x=price_data.index,
+                y=price_data['MA20'],
+                mode='lines',
+                name=f'20-{ma_unit} MA',
+                line=dict(color='#FFE66D', width=1.5, dash='dash')
+            )
+        )
+
+    else:  # Candlestick Chart
+        # Add candlestick chart
+        fig.add_trace(
+            go.Candlestick(
+                x=price_data.index,
+                open=price_data['Open'],
+                high=price_data['High'],
+                low=price_data['Low'],
+                close=price_data['Close'],
+                name='Price',
+                increasing=dict(line=dict(color='#26A69A'), fillcolor='#26A69A'),
+                decreasing=dict(line=dict(color='#EF5350'), fillcolor='#EF5350')
+            )
+        )
+
+    # Add volume bars
+    fig.add_trace(
+        go.Bar(
+            x=volume_data.index,
+            y=volume_data['Volume'],
+            name='Volume',
+            yaxis='y2',
+            marker=dict(color=volume_data['VolumeColor'], opacity=0.5)
+        )
+    )
+
+    # Customize layout with better styling
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis_title="Price (₹ INR)",
+        hovermode="x unified",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        yaxis2=dict(
+            title="Volume",
+            overlaying="y",
+            side="right",
+            showgrid=False
+        ),
+        height=500,
+        template="plotly_white",
+        margin=dict(l=10, r=10, t=40, b=10)
+    )
+
+    # Show figure
+    st.plotly_chart(fig, use_container_width=True)
+
+
+# The backtest reruns on its own and only runs while it is open
+@st.fragment
+def render_backtest(hist, symbol):
+    """
+    Backtest a signal strategy on the loaded history and optionally sweep its parameters
+
+    Parameters:
+    hist (pandas.DataFrame): Historical OHLCV data
+    symbol (str): Stock ticker symbol
+    """
+    panel = st.expander("What if you had traded a strategy on this stock?", key=f"backtest_{symbol}",
+                        on_change="rerun")
+    if not panel.open:
+        return
+
+    with panel:
+        strategy = st.selectbox("Strategy", list(backtest.STRATEGIES),
+                                format_func=lambda name: backtest.STRATEGIES[name].label)
+        spec = backtest.STRATEGIES[strategy]
+
+        # One input per strategy parameter, starting from its defaults
+        param_cols = st.columns(len(spec.defaults) + 1)
+        params = {}
+        for col, (name, default) in zip(param_cols, spec.defaults.items()):
+            with col:
+                params[name] = int(st.number_input(name.replace('_', ' ').title(), min_value=1, max_value=500,
+                                                   value=default, step=1, key=f"bt_{strategy}_{name}"))
+        with param_cols[-1]:
+            cost_bps = st.number_input("Cost per trade (bps)", min_value=0.0, max_value=100.0,
+                                       value=float(backtest.DEFAULT_COST_BPS), step=1.0)
+
+        if not spec.valid(params):
+            st.warning("These parameters are not valid for this strategy")
+            return
+
+        stats, curves = backtest.run_backtest(hist, strategy, cost_bps=cost_bps, **params)
+        buy_hold_return = (curves['Buy & Hold'].iloc[-1] - 1) * 100
+
+        stat_cols = st.columns(5)
+        stat_cols[0].metric("Total Return", f"{stats['total_return_pct']:.2f}%",
+                            f"{stats['total_return_pct'] - buy_hold_return:.2f}% vs buy & hold")
+        stat_cols[1].metric("Sharpe Ratio", f"{stats['sharpe']:.2f}")
+        stat_cols[2].metric("Max Drawdown", f"{stats['max_drawdown_pct']:.2f}%")
+        stat_cols[3].metric("Trades", stats['trades'])
+        stat_cols[4].metric("Time in Market", f"{stats['exposure_pct']:.0f}%")
+
+        st.line_chart(curves[['Strategy', 'Buy & Hold']])
+
+        # Parameter sweep over the strategy's default grid
+        grid = backtest.param_grid(strategy)
+        if st.button(f"🔬 Try all {len(grid):,} parameter combinations", key=f"sweep_{symbol}_{strategy}"):
+            with st.spinner("Running parameter sweep..."):
+                results = run_parameter_sweep(hist, strategy, grid, cost_bps=cost_bps)
+
+            st.markdown("**Best combinations by Sharpe ratio**")
+            st.dataframe(results.head(20).rename(columns={
+                'total_return_pct': 'Return (%)', 'cagr_pct': 'CAGR (%)', 'sharpe': 'Sharpe',
+                'max_drawdown_pct': 'Max Drawdown (%)', 'trades': 'Trades', 'exposure_pct': 'Time in Market (%)'
+            }), hide_index=True, use_container_width=True)
+
+            # Two-parameter strategies get a Sharpe heatmap over the whole grid
+            if len(spec.defaults) == 2:
+                import plotly.graph_objects as go
+
+                y_name, x_name = spec.defaults
+                sharpe = results.pivot_table(index=y_name, columns=x_name, values='sharpe')
+                sweep_fig = go.Figure(go.Heatmap(
+                    z=sharpe.to_numpy(), x=sharpe.columns, y=sharpe.index, colorscale='RdYlGn',
+                    colorbar=dict(title='Sharpe'),
+                    hovertemplate=f'{y_name}=%{{y}}, {x_name}=%{{x}}: %{{z:.2f}}<extra></extra>'
+                ))
+                sweep_fig.update_layout(height=400, template="plotly_white", xaxis_title=x_name,
+                                        yaxis_title=y_name, margin=dict(l=10, r=10, t=10, b=10))
+                st.plotly_chart(sweep_fig, use_container_width=True)
+
 
 # Button to get data in a colorful style
 st.markdown("""
@@ -1108,14 +1497,21 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 if st.button("📊 Analyze Stock Data"):
+    # Plotly is only needed for the analysis view, so import it on demand
+    import plotly.graph_objects as go
+
     # Display loading state
     with st.spinner(f"Loading data for {stock_symbol}..."):
         # Get stock data
-        info, hist = load_stock_data(stock_symbol, period)
+        info, hist = load_stock_data(stock_symbol, period, interval)
 
         if info is None or hist is None:
             st.error(f"Unable to fetch data for {stock_symbol}. Please check the symbol and try again.")
         else:
+            # Compute all derived chart/table series in one vectorized pass
+            with metrics.timer("build:chart_data"):
+                chart_data = chart_prep.prepare_chart_data(hist)
+
             # Create two columns layout
             col1, col2 = st.columns([1, 1])
 
@@ -1238,159 +1634,124 @@ if st.button("📊 Analyze Stock Data"):
                     metrics_df = pd.DataFrame(metrics_data)
                     st.table(metrics_df)
 
-                    # Download link for company metrics
-                    st.markdown(f"""
-                    <a href="data:file/csv;base64,{base64.b64encode(metrics_df.to_csv(index=False).encode()).decode()}" 
-                    download="{stock_symbol}_metrics.csv" class="download-btn">
-                    📥 Download Metrics
-                    </a>
-                    """, unsafe_allow_html=True)
+                    # Download button for company metrics
+                    st.download_button(
+                        "📥 Download Metrics",
+                        data=functools.partial(exporter.to_bytes, metrics_df, 'csv'),
+                        file_name=exporter.file_name(f"{stock_symbol}_metrics", 'csv'),
+                        mime=exporter.mime_type('csv'),
+                        on_click="ignore"
+                    )
 
             # Column 2: Stock Price Chart
             with col2:
                 st.markdown('<div class="sub-header">📊 Price Chart</div>', unsafe_allow_html=True)
 
-                # Chart type selector
-                chart_type = st.radio(
-                    "Select Chart Type",
-                    ["Line Chart", "Candlestick Chart"],
-                    horizontal=True
+                st.fragment(render_price_chart, run_every=LIVE_REFRESH if live_mode else None)(
+                    hist, chart_data, stock_symbol,
+                    f"{company_name} ({stock_symbol}) • {selected_period} • {selected_interval}", interval
                 )
 
-                # Prepare data for plotting
-                fig = go.Figure()
-
-                if chart_type == "Line Chart":
-                    # Calculate moving averages
-                    hist['MA5'] = hist['Close'].rolling(window=5).mean()
-                    hist['MA20'] = hist['Close'].rolling(window=20).mean()
-
-                    # Add price line with gradient fill
-                    fig.add_trace(
-                        go.Scatter(
-                            x=hist.index,
-                            y=hist['Close'],
-                            mode='lines',
-                            name='Close Price',
-                            line=dict(color='#FF6B6B', width=2),
-                            fill='tozeroy',
-                            fillcolor='rgba(255, 107, 107, 0.1)'
-                        )
-                    )
-
-                    # Add moving averages
-                    fig.add_trace(
-                        go.Scatter(
-                            x=hist.index,
-                            y=hist['MA5'],
-                            mode='lines',
-                            name='5-Day MA',
-                            line=dict(color='#4ECDC4', width=1.5, dash='dot')
-                        )
-                    )
-
-                    fig.add_trace(
-                        go.Scatter(
-                            x=hist.index,
-                            y=hist['MA20'],
-                            mode='lines',
-                            name='20-Day MA',
-                            line=dict(color='#FFE66D', width=1.5, dash='dash')
-                        )
-                    )
-
-                else:  # Candlestick Chart
-                    # Add candlestick chart
-                    fig.add_trace(
-                        go.Candlestick(
-                            x=hist.index,
-                            open=hist['Open'],
-                            high=hist['High'],
-                            low=hist['Low'],
-                            close=hist['Close'],
-                            name='Price',
-                            increasing=dict(line=dict(color='#26A69A'), fillcolor='#26A69A'),
-                            decreasing=dict(line=dict(color='#EF5350'), fillcolor='#EF5350')
-                        )
-                    )
-
-                # Add volume bars
-                colors = ['#26A69A' if row['Close'] >= row['Open'] else '#EF5350' for _, row in hist.iterrows()]
-
-                fig.add_trace(
-                    go.Bar(
-                        x=hist.index,
-                        y=hist['Volume'],
-                        name='Volume',
-                        yaxis='y2',
-                        marker=dict(color=colors, opacity=0.5)
-                    )
-                )
-
-                # Customize layout with better styling
-                fig.update_layout(
-                    title=f"{company_name} ({stock_symbol}) • {selected_period}",
-                    xaxis_title="Date",
-                    yaxis_title="Price (₹ INR)",
-                    hovermode="x unified",
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-                    yaxis2=dict(
-                        title="Volume",
-                        overlaying="y",
-                        side="right",
-                        showgrid=False
-                    ),
-                    height=500,
-                    template="plotly_white",
-                    margin=dict(l=10, r=10, t=40, b=10)
+            # Technical indicators, updated incrementally when new bars are appended
+            st.markdown('<div class="sub-header">📐 Technical Indicators</div>', unsafe_allow_html=True)
+
+            # Keep engines for the last few views so switching back stays incremental
+            engines = st.session_state.setdefault('indicator_engines', OrderedDict())
+            engine_key = (stock_symbol, period, interval)
+            engine = engines.setdefault(engine_key, indicators.IndicatorEngine())
+            engines.move_to_end(engine_key)
+            while len(engines) > MAX_INDICATOR_ENGINES:
+                engines.popitem(last=False)
+            with metrics.timer("build:indicators"):
+                indicator_data = engine.update(hist)
+            latest = indicator_data.iloc[-1]
+
+            ind_col1, ind_col2, ind_col3, ind_col4 = st.columns(4)
+            ind_col1.metric("RSI (14)", f"{latest['RSI14']:.2f}")
+            ind_col2.metric("MACD", f"{latest['MACD']:.2f}", f"{latest['MACD_Hist']:.2f} vs signal")
+            ind_col3.metric("ATR (14)", f"₹{latest['ATR14']:.2f}")
+            ind_col4.metric("VWAP", f"₹{latest['VWAP']:.2f}")
+
+            with metrics.timer("render:indicator_charts"):
+                rsi_tab, macd_tab, bb_tab = st.tabs(["RSI", "MACD", "Bollinger Bands"])
+
+                # Intraday histories can hold thousands of bars; plot at most one point per pixel
+                rsi_data = chart_prep.thin_for_chart(indicator_data[['RSI14']], 'RSI14')
+                macd_data = chart_prep.thin_for_chart(indicator_data[['MACD', 'MACD_Signal', 'MACD_Hist']], 'MACD')
+                bb_data = chart_prep.thin_for_chart(
+                    indicator_data[['BB_Upper', 'BB_Lower']].assign(Close=hist['Close']), 'Close'
                 )
 
-                # Show figure
-                st.plotly_chart(fig, use_container_width=True)
+                with rsi_tab:
+                    rsi_fig = go.Figure()
+                    rsi_fig.add_trace(go.Scatter(x=rsi_data.index, y=rsi_data['RSI14'], mode='lines',
+                                                 name='RSI (14)', line=dict(color='#3D5A80', width=1.5)))
+                    rsi_fig.add_hline(y=70, line=dict(color='#EF5350', dash='dash'))
+                    rsi_fig.add_hline(y=30, line=dict(color='#26A69A', dash='dash'))
+                    rsi_fig.update_layout(height=250, template="plotly_white", margin=dict(l=10, r=10, t=10, b=10),
+                                          yaxis=dict(range=[0, 100]))
+                    st.plotly_chart(rsi_fig, use_container_width=True)
+
+                with macd_tab:
+                    macd_fig = go.Figure()
+                    macd_fig.add_trace(go.Bar(x=macd_data.index, y=macd_data['MACD_Hist'], name='Histogram',
+                                              marker=dict(color=macd_data['MACD_Hist'].ge(0).map(
+                                                  {True: '#26A69A', False: '#EF5350'}), opacity=0.5)))
+                    macd_fig.add_trace(go.Scatter(x=macd_data.index, y=macd_data['MACD'], mode='lines',
+                                                  name='MACD', line=dict(color='#FF6B6B', width=1.5)))
+                    macd_fig.add_trace(go.Scatter(x=macd_data.index, y=macd_data['MACD_Signal'], mode='lines',
+                                                  name='Signal', line=dict(color='#4ECDC4', width=1.5, dash='dot')))
+                    macd_fig.update_layout(height=250, template="plotly_white", margin=dict(l=10, r=10, t=10, b=10))
+                    st.plotly_chart(macd_fig, use_container_width=True)
+
+                with bb_tab:
+                    bb_fig = go.Figure()
+                    bb_fig.add_trace(go.Scatter(x=bb_data.index, y=bb_data['BB_Upper'], mode='lines',
+                                                name='Upper Band', line=dict(color='#4ECDC4', width=1)))
+                    bb_fig.add_trace(go.Scatter(x=bb_data.index, y=bb_data['BB_Lower'], mode='lines',
+                                                name='Lower Band', line=dict(color='#4ECDC4', width=1),
+                                                fill='tonexty', fillcolor='rgba(78, 205, 196, 0.1)'))
+                    bb_fig.add_trace(go.Scatter(x=bb_data.index, y=bb_data['Close'], mode='lines',
+                                                name='Close Price', line=dict(color='#FF6B6B', width=1.5)))
+                    bb_fig.update_layout(height=300, template="plotly_white", margin=dict(l=10, r=10, t=10, b=10))
+                    st.plotly_chart(bb_fig, use_container_width=True)
+
+            # Strategy backtests run in their own fragment so tweaking parameters keeps the analysis
+            st.markdown('<div class="sub-header">🧪 Strategy Backtest</div>', unsafe_allow_html=True)
+            if interval == "1d":
+                render_backtest(hist, stock_symbol)
+            else:
+                st.info("Backtests run on daily bars. Choose the Daily interval to backtest a strategy.")
 
             # Historical Data Table with better styling
             st.markdown('<div class="sub-header">📅 Historical Price Data</div>', unsafe_allow_html=True)
 
-            # Format historical dataframe for display
-            display_hist = hist.reset_index()
-            display_hist['Date'] = display_hist['Date'].dt.date
-
-            # Add price change and percentage columns
-            display_hist['Change'] = display_hist['Close'] - display_hist['Open']
-            display_hist['Change %'] = (display_hist['Change'] / display_hist['Open'] * 100)
+            with metrics.timer("render:history_table"):
+                # Format historical dataframe for display (Change and Change % come from the chart data)
+                display_hist = chart_data.drop(columns=['VolumeColor', 'MA5', 'MA20']).rename_axis('Date').reset_index()
+                if interval == "1d":
+                    display_hist['Date'] = display_hist['Date'].dt.date
+                else:
+                    display_hist['Date'] = display_hist['Date'].dt.tz_localize(None)
 
-            # Round all numeric columns to 2 decimal places
-            display_hist = display_hist.round(2)
+                # Round all numeric columns to 2 decimal places
+                display_hist = display_hist.round({column: 2 for column in display_hist.select_dtypes('number').columns})
 
-            # Style the dataframe using the modern style.map() method
-            styled_df = display_hist.style
+                # Style the dataframe using the modern style.map() method
+                styled_df = display_hist.style
 
-            # Apply color formatting to the Change columns
-            styled_df = styled_df.map(
-                lambda val: f'color: {"#26A69A" if val > 0 else "#EF5350" if val < 0 else "black"}; font-weight: bold',
-                subset=['Change', 'Change %']
-            )
+                # Apply color formatting to the Change columns
+                styled_df = styled_df.map(
+                    lambda val: f'color: {"#26A69A" if val > 0 else "#EF5350" if val < 0 else "black"}; font-weight: bold',
+                    subset=['Change', 'Change %']
+                )
 
-            # Display the data with a height limit
-            st.dataframe(styled_df, height=300, use_container_width=True)
+                # Display the data with a height limit
+                st.dataframe(styled_df, height=300, use_container_width=True)
 
             # Create an expander for download options
             with st.expander("Download Historical Data"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.markdown(f"""
-                    <a href="data:file/csv;base64,{base64.b64encode(display_hist.to_csv(index=False).encode()).decode()}" 
-                    download="{stock_symbol}_historical_data.csv" class="download-btn">
-                    📥 Download as CSV
-                    </a>
-                    """, unsafe_allow_html=True)
-                with col2:
-                    st.markdown(f"""
-                    <a href="data:file/excel;base64,{base64.b64encode(display_hist.to_excel(index=False).encode()).decode()}" 
-                    download="{stock_symbol}_historical_data.xlsx" class="download-btn" style="background-color: #28a745;">
-                    📊 Download as Excel
-                    </a>
-                    """, unsafe_allow_html=True)
+                render_download_buttons(display_hist, f"{stock_symbol}_historical_data", "download_hist")
 
             # Additional Information in a styled card
             st.markdown('<div class="sub-header">📝 About the Company</div>', unsafe_allow_html=True)
@@ -1409,74 +1770,9 @@ if st.button("📊 Analyze Stock Data"):
             </div>
             """, unsafe_allow_html=True)
 
-            # Get and display news related to the stock
+            # News is fetched only when the reader opens it
             st.markdown('<div class="sub-header">📰 Latest News</div>', unsafe_allow_html=True)
-
-            # Get company-specific news
-            stock_news = get_stock_news(stock_symbol, num_items=3)
-
-            if stock_news:
-                # Display company-specific news
-                st.markdown(f"""
-                <div class="card">
-                    <h4 style="color: #3D5A80; margin-top: 0;">Company News: {company_name}</h4>
-                </div>
-                """, unsafe_allow_html=True)
-
-                # Display each news item in a card
-                for item in stock_news:
-                    # Format the date
-                    publish_date = datetime.fromtimestamp(item.get('providerPublishTime', 0)).strftime('%Y-%m-%d %H:%M')
-                    title = item.get('title', 'No title available')
-                    summary = item.get('summary', 'No summary available')
-                    url = item.get('link', '#')
-                    source = item.get('publisher', 'Unknown Source')
-
-                    # Display news in a styled card
-                    st.markdown(f"""
-                    <div class="card" style="margin-bottom: 10px; background-color: #f8f9fa;">
-                        <h4 style="margin-top: 0;">{title}</h4>
-                        <p style="color: #666; font-size: 0.8rem;">{publish_date} | Source: {source}</p>
-                        <p>{summary[:200]}{'...' if len(summary) > 200 else ''}</p>
-                        <a href="{url}" target="_blank" style="color: #FF6B6B; text-decoration: none; font-weight: bold;">
-                            Read full article →
-                        </a>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-            # Get general market news when company news is limited
-            if len(stock_news) < 2:
-                # Get market news
-                market_news = get_market_news(num_items=3)
-
-                if market_news:
-                    st.markdown(f"""
-                    <div class="card" style="margin-top: 20px;">
-                        <h4 style="color: #3D5A80; margin-top: 0;">Market News: Indian Stock Market</h4>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                    # Display each news item
-                    for item in market_news:
-                        # Format the date
-                        publish_date = datetime.fromtimestamp(item.get('providerPublishTime', 0)).strftime(
-                            '%Y-%m-%d %H:%M')
-                        title = item.get('title', 'No title available')
-                        summary = item.get('summary', 'No summary available')
-                        url = item.get('link', '#')
-                        source = item.get('publisher', 'Unknown Source')
-
-                        # Display news in a styled card
-                        st.markdown(f"""
-                        <div class="card" style="margin-bottom: 10px; background-color: #f8f9fa;">
-                            <h4 style="margin-top: 0;">{title}</h4>
-                            <p style="color: #666; font-size: 0.8rem;">{publish_date} | Source: {source}</p>
-                            <p>{summary[:200]}{'...' if len(summary) > 200 else ''}</p>
-                            <a href="{url}" target="_blank" style="color: #FF6B6B; text-decoration: none; font-weight: bold;">
-                                Read full article →
-                            </a>
-                        </div>
-                        """, unsafe_allow_html=True)
+            render_news(stock_symbol, company_name)
 
 # Footer with a more colorful design
 st.markdown("---")
@@ -1522,3 +1818,63 @@ st.markdown("""
 st.markdown("""
 <div style="width: 100%; height: 5px; background: linear-gradient(to right, #FF6B6B, #4ECDC4, #FFE66D, #FF6B6B);"></div>
 """, unsafe_allow_html=True)
+
+
+# Diagnostics for the whole server process; drawn last so it includes this run's timings
+@st.fragment
+def render_diagnostics():
+    panel = st.expander("🩺 Diagnostics", key="diagnostics_panel", on_change="rerun")
+    if not panel.open:
+        return
+
+    with panel:
+        stats = metrics.summary()
+
+        st.markdown("**Operations**")
+        if stats['operations']:
+            st.dataframe(
+                pd.DataFrame(stats['operations']).drop(columns='total_s').rename(columns={
+                    'operation': 'Operation', 'calls': 'Calls', 'errors': 'Errors', 'p50_ms': 'p50 (ms)',
+                    'p95_ms': 'p95 (ms)', 'avg_payload_kb': 'Avg Payload (KB)'
+                }).style.format(precision=1, na_rep='-'),
+                hide_index=True
+            )
+        else:
+            st.caption("Nothing measured yet")
+
+        st.markdown("**Caches**")
+        if stats['caches']:
+            st.dataframe(
+                pd.DataFrame(stats['caches']).rename(columns={
+                    'cache': 'Cache', 'hit': 'Hits', 'miss': 'Misses', 'wait': 'Waits', 'hit_rate_pct': 'Hit Rate (%)'
+                }).style.format(precision=1, na_rep='-'),
+                hide_index=True
+            )
+
+        st.markdown("**Upstream (Yahoo Finance)**")
+        if stats['upstream']:
+            st.dataframe(
+                pd.DataFrame(stats['upstream']).rename(columns={
+                    'endpoint': 'Endpoint', 'requests': 'Requests', 'errors': 'Errors', 'error_rate_pct': 'Error Rate (%)',
+                    'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)', 'received_kb': 'Received (KB)'
+                }).style.format(precision=1, na_rep='-'),
+                hide_index=True
+            )
+        else:
+            st.caption("No upstream requests yet")
+
+        st.download_button(
+            "📥 Prometheus metrics",
+            data=metrics.render_prometheus,
+            file_name="metrics.prom",
+            mime="text/plain",
+            on_click="ignore"
+        )
+        st.caption(f"Also written every {metrics.TEXTFILE_INTERVAL}s to {get_metrics_writer().path}")
+        if st.button("Reset counters", key="reset_metrics"):
+            metrics.get_registry().reset()
+            st.rerun(scope="fragment")
+
+
+with st.sidebar:
+    render_diagnostics()
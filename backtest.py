@@ -0,0 +1,274 @@
+"""
+Vectorized backtests of simple signal strategies on daily OHLCV histories.
+
+Each strategy turns a history into a 0/1 position array (long or flat) with
+whole-array operations; positions act on the next bar, so a signal seen at a
+close is traded at that close and earns the following bar's return. Returns,
+trading costs, the equity curve and the summary statistics are computed the
+same way, with no loop over bars.
+
+Parameter sweeps evaluate every combination in a grid. Indicators are
+memoized per history, so combinations sharing a moving-average window or RSI
+period reuse it, and large grids are split across a process pool that
+receives the price arrays once per worker. Workers are spawned rather than
+forked, because the caller is usually the multithreaded Streamlit server.
+"""
+import itertools
+import math
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+TRADING_DAYS = 252
+
+# Cost of each buy or sell, in basis points of the traded value
+DEFAULT_COST_BPS = 10
+
+# Grids smaller than this run in the calling process; a pool costs more to start
+POOL_MIN_COMBINATIONS = 200
+
+STAT_COLUMNS = ['total_return_pct', 'cagr_pct', 'sharpe', 'max_drawdown_pct', 'trades', 'exposure_pct']
+
+
+class Bars:
+    """
+    Price arrays of one history with memoized indicators
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV data with Close, High and Low columns
+    """
+
+    def __init__(self, hist):
+        self.index = hist.index
+        self.close = hist['Close'].to_numpy(dtype=float)
+        self.high = hist['High'].to_numpy(dtype=float)
+        self.low = hist['Low'].to_numpy(dtype=float)
+        self.returns = np.concatenate([[0.0], np.diff(self.close) / self.close[:-1]])
+        self._cache = {}
+
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def sma(self, window):
+        """Simple moving average of the close (NaN until the window fills)"""
+        def compute():
+            sums = np.cumsum(self.close)
+            sums[window:] = sums[window:] - sums[:-window].copy()
+            values = sums / window
+            values[:window - 1] = np.nan
+            return values
+        return self._memo(('sma', window), compute)
+
+    def rsi(self, period):
+        """Wilder's RSI of the close"""
+        return self._memo(('rsi', period),
+                          lambda: indicators.rsi(pd.Series(self.close), period).to_numpy())
+
+    def prior_high(self, window):
+        """Highest high of the previous ``window`` bars (excluding the current one)"""
+        return self._memo(('prior_high', window),
+                          lambda: pd.Series(self.high).rolling(window).max().shift(1).to_numpy())
+
+    def prior_low(self, window):
+        """Lowest low of the previous ``window`` bars (excluding the current one)"""
+        return self._memo(('prior_low', window),
+                          lambda: pd.Series(self.low).rolling(window).min().shift(1).to_numpy())
+
+
+def _hold(entries, exits):
+    """
+    Turn entry/exit signals into a position that is held between them
+
+    Parameters:
+    entries (numpy.ndarray): True where a long position is opened
+    exits (numpy.ndarray): True where it is closed (exits win over entries on the same bar)
+
+    Returns:
+    numpy.ndarray: 1.0 while long, 0.0 while flat
+    """
+    state = np.where(exits, 0.0, np.where(entries, 1.0, np.nan))
+    # Forward-fill the last signal
+    last = np.where(np.isnan(state), 0, np.arange(len(state)))
+    np.maximum.accumulate(last, out=last)
+    held = state[last]
+    return np.nan_to_num(held, nan=0.0)
+
+
+def ma_crossover(bars, fast=5, slow=20):
+    """Long while the fast moving average is above the slow one"""
+    with np.errstate(invalid='ignore'):
+        return (bars.sma(fast) > bars.sma(slow)).astype(float)
+
+
+def rsi_threshold(bars, period=14, lower=30, upper=70):
+    """Buy when RSI falls below ``lower``, sell when it rises above ``upper``"""
+    values = bars.rsi(period)
+    with np.errstate(invalid='ignore'):
+        return _hold(values < lower, values > upper)
+
+
+def breakout(bars, entry_window=20, exit_window=10):
+    """Buy on a close above the prior ``entry_window`` high, sell on a close below the prior ``exit_window`` low"""
+    with np.errstate(invalid='ignore'):
+        return _hold(bars.close > bars.prior_high(entry_window), bars.close < bars.prior_low(exit_window))
+
+
+# signal function, display label, default parameters, default sweep grid, parameter check
+Strategy = namedtuple('Strategy', ['signal', 'label', 'defaults', 'grid', 'valid'])
+
+STRATEGIES = {
+    'ma_crossover': Strategy(
+        ma_crossover, "Moving Average Crossover",
+        {'fast': 5, 'slow': 20},
+        {'fast': range(2, 51), 'slow': range(10, 201, 5)},
+        lambda p: p['fast'] < p['slow'],
+    ),
+    'rsi_threshold': Strategy(
+        rsi_threshold, "RSI Thresholds",
+        {'period': 14, 'lower': 30, 'upper': 70},
+        {'period': range(5, 31), 'lower': range(15, 46, 5), 'upper': range(55, 91, 5)},
+        lambda p: p['lower'] < p['upper'],
+    ),
+    'breakout': Strategy(
+        breakout, "Channel Breakout",
+        {'entry_window': 20, 'exit_window': 10},
+        {'entry_window': range(5, 121, 5), 'exit_window': range(5, 61, 5)},
+        lambda p: True,
+    ),
+}
+
+
+def _performance(position, returns, cost):
+    """Return (strategy returns, statistics) for a 0/1 position array"""
+    # Trade at the signal bar's close: the position earns the next bar's return
+    held = np.concatenate([[0.0], position[:-1]])
+    turnover = np.abs(np.diff(held, prepend=0.0))
+    strategy_returns = held * returns - turnover * cost
+
+    equity = np.cumprod(1 + strategy_returns)
+    years = len(returns) / TRADING_DAYS
+    volatility = strategy_returns.std()
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    stats = {
+        'total_return_pct': float(equity[-1] - 1) * 100,
+        'cagr_pct': float(equity[-1] ** (1 / years) - 1) * 100 if years > 0 and equity[-1] > 0 else np.nan,
+        'sharpe': float(strategy_returns.mean() / volatility) * math.sqrt(TRADING_DAYS) if volatility > 0 else np.nan,
+        'max_drawdown_pct': float(drawdown.min()) * 100,
+        'trades': int(np.count_nonzero(np.diff(held, prepend=0.0) > 0)),
+        'exposure_pct': float(held.mean()) * 100,
+    }
+    return strategy_returns, stats
+
+
+def run_backtest(hist, strategy='ma_crossover', cost_bps=DEFAULT_COST_BPS, **params):
+    """
+    Backtest one strategy with one set of parameters
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV history
+    strategy (str): Key of STRATEGIES
+    cost_bps (float): Cost per buy or sell in basis points
+    **params: Strategy parameters (defaults are used for any not given)
+
+    Returns:
+    tuple: (statistics dict, DataFrame with Position, Strategy and Buy & Hold equity curves)
+    """
+    spec = STRATEGIES[strategy]
+    bars = Bars(hist)
+    position = spec.signal(bars, **{**spec.defaults, **params})
+    strategy_returns, stats = _performance(position, bars.returns, cost_bps / 10_000)
+
+    curves = pd.DataFrame({
+        'Position': position,
+        'Strategy': np.cumprod(1 + strategy_returns),
+        'Buy & Hold': bars.close / bars.close[0],
+    }, index=bars.index)
+    return stats, curves
+
+
+def param_grid(strategy, **ranges):
+    """
+    Build every valid parameter combination for a strategy
+
+    Parameters:
+    strategy (str): Key of STRATEGIES
+    **ranges: Values to try per parameter (the strategy's default grid fills in the rest)
+
+    Returns:
+    list: Parameter dicts
+    """
+    spec = STRATEGIES[strategy]
+    grid = {**spec.grid, **ranges}
+    names = list(grid)
+    combos = (dict(zip(names, values)) for values in itertools.product(*grid.values()))
+    return [params for params in combos if spec.valid(params)]
+
+
+# Per-process state for pool workers, set once by _init_worker
+_worker_bars = None
+
+
+def _init_worker(hist):
+    global _worker_bars
+    _worker_bars = Bars(hist)
+
+
+def _evaluate(bars, strategy, combos, cost):
+    signal = STRATEGIES[strategy].signal
+    return [{**params, **_performance(signal(bars, **params), bars.returns, cost)[1]} for params in combos]
+
+
+def _evaluate_in_worker(strategy, combos, cost):
+    return _evaluate(_worker_bars, strategy, combos, cost)
+
+
+def sweep(hist, strategy='ma_crossover', grid=None, cost_bps=DEFAULT_COST_BPS, max_workers=None,
+          sort_by='sharpe'):
+    """
+    Backtest every parameter combination in a grid
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV history
+    strategy (str): Key of STRATEGIES
+    grid (list): Parameter dicts (defaults to param_grid(strategy))
+    cost_bps (float): Cost per buy or sell in basis points
+    max_workers (int): Worker processes (1 runs in this process; None uses every CPU
+                       for grids of POOL_MIN_COMBINATIONS or more)
+    sort_by (str): Statistic to sort the results by, best first
+
+    Returns:
+    pandas.DataFrame: One row per combination with its parameters and statistics
+    """
+    grid = param_grid(strategy) if grid is None else list(grid)
+    cost = cost_bps / 10_000
+    workers = max_workers or (os.cpu_count() or 1)
+    if max_workers is None and len(grid) < POOL_MIN_COMBINATIONS:
+        workers = 1
+
+    if workers == 1 or len(grid) < 2:
+        rows = _evaluate(Bars(hist), strategy, grid, cost)
+    else:
+        # A few chunks per worker keeps them busy without pickling every combination separately
+        chunk_size = max(1, math.ceil(len(grid) / (workers * 4)))
+        chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+        price_columns = hist[['Close', 'High', 'Low']]
+        # Forking a process that runs threads (server, prefetcher, HTTP pools) can copy held locks
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(price_columns,)) as pool:
+            rows = [row for chunk_rows in pool.map(_evaluate_in_worker, itertools.repeat(strategy),
+                                                   chunks, itertools.repeat(cost))
+                    for row in chunk_rows]
+
+    results = pd.DataFrame(rows)
+    if sort_by and not results.empty:
+        results = results.sort_values(sort_by, ascending=False, na_position='last', ignore_index=True)
+    return results
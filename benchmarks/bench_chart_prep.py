@@ -0,0 +1,71 @@
+"""
+Benchmark the chart data preparation against the previous row-by-row path.
+
+Usage:
+    python benchmarks/bench_chart_prep.py [--sizes 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chart_prep  # noqa: E402
+
+
+def make_history(n_bars, seed=0):
+    """Build a synthetic OHLCV frame with n_bars daily bars"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close) * (1 + rng.random(n_bars) * 0.01)
+    low = np.minimum(open_, close) * (1 - rng.random(n_bars) * 0.01)
+    volume = rng.integers(1_000, 1_000_000, n_bars)
+    index = pd.date_range("2000-01-01", periods=n_bars, freq="D", name="Date")
+    return pd.DataFrame(
+        {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+        index=index
+    )
+
+
+def legacy_prepare(hist):
+    """The chart preparation as it was done inline in app.py"""
+    hist = hist.copy()
+    hist['MA5'] = hist['Close'].rolling(window=5).mean()
+    hist['MA20'] = hist['Close'].rolling(window=20).mean()
+    colors = ['#26A69A' if row['Close'] >= row['Open'] else '#EF5350' for _, row in hist.iterrows()]
+    display_hist = hist.reset_index()
+    display_hist['Change'] = display_hist['Close'] - display_hist['Open']
+    display_hist['Change %'] = (display_hist['Change'] / display_hist['Open'] * 100)
+    return colors, display_hist
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'bars':>8} {'legacy (ms)':>12} {'vectorized (ms)':>16} {'speedup':>8}")
+    for size in args.sizes:
+        hist = make_history(size)
+
+        # Both paths must agree on the derived series
+        colors, display_hist = legacy_prepare(hist)
+        prepared = chart_prep.prepare_chart_data(hist)
+        assert list(prepared['VolumeColor']) == colors
+        np.testing.assert_allclose(prepared['Change %'].to_numpy(), display_hist['Change %'].to_numpy())
+
+        # The row loop is slow, so time it fewer times on large frames
+        legacy_runs = 1 if size > 20_000 else args.repeat
+        legacy = min(timeit.repeat(lambda: legacy_prepare(hist), number=1, repeat=legacy_runs))
+        vectorized = min(timeit.repeat(lambda: chart_prep.prepare_chart_data(hist), number=1, repeat=args.repeat))
+        print(f"{size:>8} {legacy * 1000:>12.1f} {vectorized * 1000:>16.2f} {legacy / vectorized:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark the comparison statistics against pandas' pairwise implementations.
+
+Usage:
+    python benchmarks/bench_comparison.py [--symbols 10 100 300] [--days 1250] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import comparison  # noqa: E402
+
+
+def make_panel(n_symbols, n_days, seed=0):
+    """Build a synthetic close panel of n_symbols stocks plus the benchmark, with some gaps"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, n_days)
+    returns = market[:, None] * rng.uniform(0.5, 1.5, n_symbols) + rng.normal(0, 0.01, (n_days, n_symbols))
+    closes = pd.DataFrame(
+        100 * np.cumprod(1 + returns, axis=0),
+        index=pd.bdate_range("2020-01-01", periods=n_days),
+        columns=[f"STOCK{i}.NS" for i in range(n_symbols)]
+    )
+    closes[comparison.BENCHMARK] = 100 * np.cumprod(1 + market)
+
+    # A late listing and a suspension exercise the pairwise handling
+    closes.iloc[:n_days // 4, 0] = np.nan
+    closes.iloc[n_days // 2:n_days // 2 + 10, 1 % n_symbols] = np.nan
+    return closes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--days", type=int, default=1250)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    window = comparison.ROLLING_WINDOW
+    min_periods = comparison.MIN_PERIODS
+
+    print(f"{'symbols':>8} {'statistic':<22} {'pandas (ms)':>12} {'panel (ms)':>11} {'speedup':>8}")
+    for n_symbols in args.symbols:
+        returns = comparison.daily_returns(make_panel(n_symbols, args.days))
+        stocks, benchmark = returns.drop(columns=comparison.BENCHMARK), returns[comparison.BENCHMARK]
+
+        # Both paths must agree
+        np.testing.assert_allclose(comparison.correlation_matrix(returns).to_numpy(),
+                                   returns.corr(min_periods=min_periods).to_numpy(), atol=1e-9)
+        rolling_corr, _ = comparison.rolling_vs_benchmark(stocks, benchmark, window)
+        np.testing.assert_allclose(rolling_corr.to_numpy(),
+                                   stocks.rolling(window, min_periods=min_periods).corr(benchmark).to_numpy(),
+                                   atol=1e-9)
+
+        cases = [
+            ("correlation matrix",
+             lambda: returns.corr(min_periods=min_periods),
+             lambda: comparison.correlation_matrix(returns)),
+            ("rolling corr + beta",
+             lambda: (stocks.rolling(window, min_periods=min_periods).corr(benchmark),
+                      stocks.rolling(window, min_periods=min_periods).cov(benchmark)),
+             lambda: comparison.rolling_vs_benchmark(stocks, benchmark, window)),
+        ]
+        for name, reference, panel in cases:
+            reference_time = min(timeit.repeat(reference, number=1, repeat=args.repeat))
+            panel_time = min(timeit.repeat(panel, number=1, repeat=args.repeat))
+            print(f"{n_symbols:>8} {name:<22} {reference_time * 1000:>12.1f} {panel_time * 1000:>11.1f} "
+                  f"{reference_time / panel_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Benchmark the data and render pipeline against a local fake Yahoo backend.
+
+Times load_stock_data, get_watchlist_data, get_penny_stocks,
+search_stock_symbols and the chart/table build path at several history and
+universe sizes. Every Yahoo request is served by benchmarks/fake_yahoo.py
+after a simulated latency, and the history store lives in a temporary
+directory, so runs are repeatable offline. Results are printed as a table and
+can be written as JSON for trend tracking.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--latency 0.05] [--periods 1mo 1y 5y] [--watchlist 5 20 50]
+                                        [--universe 100 500 2000] [--bars 250 1250 20000]
+                                        [--repeat 5] [--fixtures DIR] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_yahoo  # noqa: E402  (also puts the repository on sys.path)
+import chart_prep  # noqa: E402
+import history_store  # noqa: E402
+import indicators  # noqa: E402
+import market_data  # noqa: E402
+import quote_cache  # noqa: E402
+import screener  # noqa: E402
+
+
+def measure(func, repeat, setup=None):
+    """Run func ``repeat`` times (calling setup untimed before each run) and return the timings in seconds"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def build_view(hist):
+    """The chart and table build path of the analysis view, up to the serialized figure"""
+    import plotly.graph_objects as go
+
+    chart_data = chart_prep.prepare_chart_data(hist)
+    price_data, volume_data = chart_prep.downsample_for_chart(chart_data, "Candlestick Chart")
+    chart_prep.downsample_for_chart(chart_data, "Line Chart")
+    indicator_data = indicators.compute_indicators(hist)
+    chart_prep.thin_for_chart(indicator_data[['RSI14']], 'RSI14')
+
+    display_hist = chart_data.drop(columns=['VolumeColor', 'MA5', 'MA20']).rename_axis('Date').reset_index()
+    display_hist.round({column: 2 for column in display_hist.select_dtypes('number').columns})
+
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(x=price_data.index, open=price_data['Open'], high=price_data['High'],
+                                 low=price_data['Low'], close=price_data['Close']))
+    fig.add_trace(go.Bar(x=volume_data.index, y=volume_data['Volume'], yaxis='y2',
+                         marker=dict(color=volume_data['VolumeColor'])))
+    return fig.to_json()
+
+
+def write_universe(path, size):
+    """Write a synthetic symbol universe CSV with ``size`` symbols and return the symbols"""
+    symbols = [f"BENCH{i:05d}.NS" for i in range(size)]
+    pd.DataFrame({
+        'symbol': symbols,
+        'name': [f"Bench Company {i}" for i in range(size)],
+        'exchange': 'NSE',
+        'sector': [["Technology", "Energy", "Financial Services", "Healthcare"][i % 4] for i in range(size)],
+        'description': '',
+    }).to_csv(path, index=False)
+    return symbols
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=fake_yahoo.ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Runner:
+    """Collects benchmark results against one fake backend and scratch directory"""
+
+    def __init__(self, backend, scratch, repeat):
+        self.backend = backend
+        self.scratch = scratch
+        self.repeat = repeat
+        self.results = []
+        self._stores = 0
+
+    def fresh_store(self):
+        """Point the data layer at a new, empty history store"""
+        self._stores += 1
+        history_store._default_store = history_store.HistoryStore(
+            os.path.join(self.scratch, f"history-{self._stores}.sqlite")
+        )
+
+    def run(self, name, params, state, func, setup=None, warmup=0):
+        for _ in range(warmup):
+            func()
+        self.backend.reset_calls()
+        timings = measure(func, self.repeat, setup)
+        calls = {endpoint: count / self.repeat for endpoint, count in sorted(self.backend.calls.items())}
+        result = {
+            'benchmark': name,
+            'params': params,
+            'state': state,
+            'repeat': self.repeat,
+            'median_ms': statistics.median(timings) * 1000,
+            'min_ms': min(timings) * 1000,
+            'max_ms': max(timings) * 1000,
+            'requests_per_run': calls,
+        }
+        self.results.append(result)
+        described = ", ".join(f"{key}={value}" for key, value in params.items())
+        print(f"{name:<22} {described:<22} {state:<12} {result['median_ms']:>12.1f} {result['min_ms']:>10.1f} "
+              f"{sum(calls.values()):>9.1f}")
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake Yahoo request")
+    parser.add_argument("--periods", nargs="+", default=["1mo", "1y", "5y"])
+    parser.add_argument("--watchlist", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--universe", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--bars", type=int, nargs="+", default=[250, 1250, 20000])
+    parser.add_argument("--queries", nargs="+", default=["bench", "company 1", "zzz"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fixtures", help="directory of recorded fixtures (see fake_yahoo.py record)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    fixtures = fake_yahoo.Fixtures.load(args.fixtures) if args.fixtures else fake_yahoo.Fixtures()
+    backend = fake_yahoo.FakeYahoo(fixtures, latency=args.latency)
+    # Recorded symbols first, padded with synthetic ones up to the largest watchlist
+    symbols = list(fixtures.histories) + [f"BENCH{i:05d}.NS" for i in range(max(args.watchlist))]
+    for symbol in symbols:
+        fixtures.info_for(symbol)
+
+    print(f"{'benchmark':<22} {'params':<22} {'state':<12} {'median (ms)':>12} {'min (ms)':>10} {'requests':>9}")
+    with tempfile.TemporaryDirectory() as scratch, backend.install():
+        runner = Runner(backend, scratch, args.repeat)
+        quotes = quote_cache.get_quote_cache("quotes")
+        screens = quote_cache.get_quote_cache("screens")
+
+        for period in args.periods:
+            symbol = symbols[0]
+            bars = len(fixtures.history(symbol).loc[history_store.period_start(period).tz_localize('Asia/Kolkata'):])
+            params = {'period': period, 'bars': bars}
+            runner.run("load_stock_data", params, "cold",
+                       lambda: market_data.load_stock_data(symbol, period), setup=runner.fresh_store)
+            runner.run("load_stock_data", params, "warm", lambda: market_data.load_stock_data(symbol, period))
+
+        for size in args.watchlist:
+            watchlist = symbols[:size]
+            runner.run("get_watchlist_data", {'symbols': size}, "cold",
+                       lambda: market_data.get_watchlist_data(watchlist), setup=quotes.clear)
+            runner.run("get_watchlist_data", {'symbols': size}, "cached",
+                       lambda: market_data.get_watchlist_data(watchlist))
+
+        saved_universe = screener.DEFAULT_UNIVERSE_FILE
+        try:
+            for size in args.universe:
+                screener.DEFAULT_UNIVERSE_FILE = os.path.join(scratch, f"universe-{size}.csv")
+                for symbol in write_universe(screener.DEFAULT_UNIVERSE_FILE, size):
+                    # Build synthetic fixtures up front so their generation is not timed
+                    fixtures.history(symbol)
+
+                def cold():
+                    runner.fresh_store()
+                    screens.clear()
+
+                runner.run("get_penny_stocks", {'universe': size}, "cold", market_data.get_penny_stocks, setup=cold)
+                runner.run("get_penny_stocks", {'universe': size}, "warm store", market_data.get_penny_stocks,
+                           setup=screens.clear)
+                runner.run("get_penny_stocks", {'universe': size}, "cached", market_data.get_penny_stocks)
+        finally:
+            screener.DEFAULT_UNIVERSE_FILE = saved_universe
+
+        for query in args.queries:
+            runner.run("search_stock_symbols", {'query': query}, "uncached",
+                       lambda: market_data.search_stock_symbols(query), warmup=1)
+
+        for n_bars in args.bars:
+            hist = fake_yahoo.synthetic_history("BENCH.NS", n_bars)
+            runner.run("chart_table_build", {'bars': n_bars}, "in-memory", lambda: build_view(hist), warmup=1)
+
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'git_commit': git_commit(),
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'latency_s': args.latency,
+                'fixtures': args.fixtures or "synthetic",
+            },
+            'results': runner.results,
+        }
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Wrote {len(runner.results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark FIFO lot matching and portfolio revaluation.
+
+Usage:
+    python benchmarks/bench_portfolio.py [--lots 100 500 5000] [--symbols 60] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import portfolio  # noqa: E402
+
+
+def make_transactions(n_lots, n_symbols, seed=0):
+    """Build n_lots buys spread over five years, with a partial sell of every third symbol"""
+    rng = np.random.default_rng(seed)
+    symbols = [f"STOCK{i}.NS" for i in range(n_symbols)]
+    buys = pd.DataFrame({
+        'date': pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1800, n_lots), unit='D'),
+        'symbol': rng.choice(symbols, n_lots),
+        'side': 'BUY',
+        'quantity': rng.integers(1, 100, n_lots).astype(float),
+        'price': rng.uniform(10, 3000, n_lots),
+        'fees': 20.0,
+    })
+    held = buys.groupby('symbol')['quantity'].sum()
+    sells = pd.DataFrame({
+        'date': pd.Timestamp("2025-06-01"),
+        'symbol': held.index[::3],
+        'side': 'SELL',
+        'quantity': (held.iloc[::3] // 2).clip(lower=1).to_numpy(),
+        'price': rng.uniform(10, 3000, len(held.index[::3])),
+        'fees': 20.0,
+    })
+    prices = {symbol: rng.uniform(10, 3000) for symbol in symbols}
+    return pd.concat([buys, sells], ignore_index=True), prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lots", type=int, nargs="+", default=[100, 500, 5000])
+    parser.add_argument("--symbols", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'lots':>6} {'match lots (ms)':>16} {'revalue (ms)':>13}")
+    for n_lots in args.lots:
+        transactions, prices = make_transactions(n_lots, args.symbols)
+        book = portfolio.Portfolio(transactions)
+
+        match = min(timeit.repeat(lambda: portfolio.match_lots(book.transactions), number=1, repeat=args.repeat))
+        book.lots()
+        revalue = min(timeit.repeat(lambda: book.valuation(prices), number=1, repeat=args.repeat))
+        print(f"{n_lots:>6} {match * 1000:>16.2f} {revalue * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
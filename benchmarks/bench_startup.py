@@ -0,0 +1,58 @@
+"""
+Measure the cold-start cost of importing the data layer and the app's dependencies.
+
+Each measurement runs in a fresh interpreter so nothing is already imported.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should not be loaded just by importing the data layer
+HEAVY_MODULES = ("yfinance", "plotly", "streamlit", "pandas_datareader", "curl_cffi")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat):
+    """Import a module in fresh interpreters and return (timings, heavy modules loaded)"""
+    timings, loaded = [], set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded.update(result["loaded"])
+    return timings, sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modules", nargs="+", default=["market_data", "streamlit", "plotly.graph_objects"])
+    args = parser.parse_args()
+
+    print(f"{'module':<22} {'median (ms)':>12} {'min (ms)':>10}  heavy modules loaded")
+    for module in args.modules:
+        timings, loaded = measure(module, args.repeat)
+        print(f"{module:<22} {statistics.median(timings) * 1000:>12.1f} {min(timings) * 1000:>10.1f}  "
+              f"{', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Local stand-in for the Yahoo Finance backend, for benchmarks.
+
+FakeYahoo replaces ``http_session.yf_ticker`` (history, info, fast_info and
+news), ``yfinance.download`` and the search endpoint behind
+``http_session.get_session()`` with in-process fakes that serve fixtures
+after a configurable latency, so the data layer can be timed without the
+network. Fixtures are either synthetic (deterministic per symbol) or recorded
+from Yahoo once with:
+
+    python benchmarks/fake_yahoo.py record FIXTURE_DIR RELIANCE.NS TCS.NS --query tata
+
+Recorded histories are shifted so their last bar falls on today, which keeps
+the period arithmetic of the history store meaningful on any day.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import http_session  # noqa: E402
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# Business days of daily history generated for synthetic symbols
+DEFAULT_BARS = 1500
+
+
+def _seed(symbol):
+    # crc32 rather than hash(), which changes between interpreter runs
+    return zlib.crc32(symbol.encode())
+
+
+def synthetic_history(symbol, n_bars=DEFAULT_BARS, end=None):
+    """
+    Build a deterministic daily OHLCV history for a symbol
+
+    Parameters:
+    symbol (str): Stock ticker symbol
+    n_bars (int): Number of business-day bars
+    end (pandas.Timestamp): Date of the last bar (defaults to today)
+
+    Returns:
+    pandas.DataFrame: OHLCV history indexed by a tz-aware Date index
+    """
+    rng = np.random.default_rng(_seed(symbol))
+    start_price = rng.uniform(5, 3000)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.015, n_bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, n_bars))
+    index = pd.bdate_range(end=pd.Timestamp(end or pd.Timestamp.now()).normalize(), periods=n_bars, name='Date')
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + rng.random(n_bars) * 0.01),
+        'Low': np.minimum(open_, close) * (1 - rng.random(n_bars) * 0.01),
+        'Close': close,
+        'Volume': rng.integers(10_000, 5_000_000, n_bars),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index.tz_localize('Asia/Kolkata'))
+
+
+def synthetic_info(symbol, hist):
+    """Build a Ticker.info-like dictionary for a symbol"""
+    rng = np.random.default_rng(_seed(symbol) + 1)
+    close = hist['Close']
+    return {
+        'symbol': symbol,
+        'longName': f"{symbol.split('.')[0].title()} Ltd",
+        'sector': ["Technology", "Financial Services", "Energy", "Healthcare", "Industrials"][_seed(symbol) % 5],
+        'industry': "Synthetic",
+        'exchange': "NSI",
+        'currentPrice': float(close.iloc[-1]),
+        'previousClose': float(close.iloc[-2]) if len(close) > 1 else float(close.iloc[-1]),
+        'volume': int(hist['Volume'].iloc[-1]),
+        'marketCap': int(rng.uniform(1e9, 1e13)),
+        'trailingPE': round(float(rng.uniform(5, 80)), 2),
+        'fiftyTwoWeekHigh': float(close.iloc[-252:].max()),
+        'fiftyTwoWeekLow': float(close.iloc[-252:].min()),
+        'longBusinessSummary': f"{symbol} is a synthetic company used for benchmarks.",
+    }
+
+
+def synthetic_news(symbol, count=10):
+    """Build a list of Ticker.news-like items for a symbol"""
+    now = int(time.time())
+    return [
+        {'uuid': f"{symbol}-{i}", 'title': f"{symbol} headline {i}", 'publisher': "Benchmark Wire",
+         'link': f"https://example.com/{symbol}/{i}", 'providerPublishTime': now - i * 3600}
+        for i in range(count)
+    ]
+
+
+class Fixtures:
+    """
+    Histories, info, news and search responses served by FakeYahoo
+
+    Symbols without a recorded fixture get synthetic data, so any universe can be served.
+
+    Parameters:
+    histories (dict): Symbol -> OHLCV DataFrame
+    info (dict): Symbol -> Ticker.info dictionary
+    news (dict): Symbol -> list of news items
+    search (dict): Query -> list of search-endpoint quote dictionaries
+    n_bars (int): Length of synthetic histories
+    """
+
+    def __init__(self, histories=None, info=None, news=None, search=None, n_bars=DEFAULT_BARS):
+        self.histories = dict(histories or {})
+        self.info = dict(info or {})
+        self.news = dict(news or {})
+        self.search = dict(search or {})
+        self.n_bars = n_bars
+        self._lock = threading.Lock()
+
+    def history(self, symbol):
+        with self._lock:
+            if symbol not in self.histories:
+                self.histories[symbol] = synthetic_history(symbol, self.n_bars)
+            return self.histories[symbol]
+
+    def info_for(self, symbol):
+        if symbol not in self.info:
+            self.info[symbol] = synthetic_info(symbol, self.history(symbol))
+        return self.info[symbol]
+
+    def news_for(self, symbol):
+        if symbol not in self.news:
+            self.news[symbol] = synthetic_news(symbol)
+        return self.news[symbol]
+
+    def search_for(self, query, count):
+        if query in self.search:
+            return self.search[query][:count]
+        # Match against every symbol and name served so far
+        query = query.lower()
+        return [
+            {'symbol': symbol, 'shortname': self.info_for(symbol)['longName'], 'quoteType': 'EQUITY',
+             'exchange': 'NSI'}
+            for symbol in list(self.histories)
+            if query in symbol.lower() or query in self.info_for(symbol)['longName'].lower()
+        ][:count]
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load recorded fixtures, shifting each history so it ends today
+
+        Parameters:
+        path (str): Directory written by record()
+
+        Returns:
+        Fixtures: The loaded fixtures
+        """
+        histories = {}
+        history_dir = os.path.join(path, "history")
+        today = pd.Timestamp.now().normalize()
+        for name in sorted(os.listdir(history_dir)) if os.path.isdir(history_dir) else []:
+            hist = pd.read_csv(os.path.join(history_dir, name), index_col='Date')
+            hist.index = pd.to_datetime(hist.index, utc=True).tz_convert('Asia/Kolkata')
+            shift = today - hist.index[-1].tz_localize(None).normalize()
+            hist.index = (hist.index + shift).rename('Date')
+            histories[name[:-len('.csv')]] = hist.reindex(columns=BAR_COLUMNS).fillna(0)
+
+        def read(name):
+            file = os.path.join(path, name)
+            if not os.path.exists(file):
+                return {}
+            with open(file) as handle:
+                return json.load(handle)
+
+        return cls(histories, read("info.json"), read("news.json"), read("search.json"))
+
+
+def record(path, symbols, queries=(), period="5y"):
+    """
+    Record real Yahoo responses as fixtures (needs network access)
+
+    Parameters:
+    path (str): Directory to write
+    symbols (list): Symbols whose history, info and news are recorded
+    queries (list): Search queries whose responses are recorded
+    period (str): History period to record
+    """
+    os.makedirs(os.path.join(path, "history"), exist_ok=True)
+    info, news, search = {}, {}, {}
+    for symbol in symbols:
+        ticker = http_session.yf_ticker(symbol)
+        ticker.history(period=period, actions=True).to_csv(os.path.join(path, "history", f"{symbol}.csv"))
+        info[symbol] = ticker.info
+        news[symbol] = ticker.news
+    for query in queries:
+        response = http_session.get_session().get(
+            "https://query1.finance.yahoo.com/v1/finance/search",
+            params={'q': query, 'quotesCount': 20, 'newsCount': 0}
+        )
+        search[query] = response.json().get('quotes', [])
+
+    for name, data in (("info.json", info), ("news.json", news), ("search.json", search)):
+        with open(os.path.join(path, name), "w") as handle:
+            json.dump(data, handle, default=str)
+
+
+class _FakeTicker:
+    def __init__(self, backend, symbol):
+        self._backend = backend
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        self._backend.wait("info")
+        return dict(self._backend.fixtures.info_for(self.symbol))
+
+    @property
+    def fast_info(self):
+        self._backend.wait("quote")
+        close = self._backend.fixtures.history(self.symbol)['Close']
+        return {'lastPrice': float(close.iloc[-1]), 'previousClose': float(close.iloc[-2])}
+
+    @property
+    def news(self):
+        self._backend.wait("news")
+        return list(self._backend.fixtures.news_for(self.symbol))
+
+    def history(self, period=None, start=None, interval='1d', **kwargs):
+        self._backend.wait("history")
+        return self._backend.slice(self.symbol, period, start, interval)
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class _FakeSession:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def get(self, url, params=None, **kwargs):
+        self._backend.wait("search")
+        params = params or {}
+        quotes = self._backend.fixtures.search_for(params.get('q', ''), params.get('quotesCount', 20))
+        return _FakeResponse({'quotes': quotes, 'news': []})
+
+
+class FakeYahoo:
+    """
+    In-process Yahoo Finance backend serving fixtures with simulated latency
+
+    Parameters:
+    fixtures (Fixtures): Data to serve (defaults to synthetic fixtures)
+    latency (float): Seconds added to every request
+    latencies (dict): Per-endpoint overrides ("history", "download", "info", "quote", "news", "search")
+    """
+
+    def __init__(self, fixtures=None, latency=0.0, latencies=None):
+        self.fixtures = fixtures or Fixtures()
+        self.latency = latency
+        self.latencies = dict(latencies or {})
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def wait(self, endpoint):
+        """Count a request to an endpoint and sleep for its latency"""
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        delay = self.latencies.get(endpoint, self.latency)
+        if delay:
+            time.sleep(delay)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = {}
+
+    def slice(self, symbol, period=None, start=None, interval='1d'):
+        """Return a symbol's daily bars from ``start`` (or for ``period``); intraday is not served"""
+        hist = self.fixtures.history(symbol)
+        if interval != '1d':
+            return hist.iloc[:0]
+        if start is not None:
+            start = pd.Timestamp(start)
+            start = start.tz_localize(hist.index.tz) if start.tz is None else start
+            return hist[hist.index >= start]
+        if period and period not in ("max", "ytd"):
+            import history_store
+            first = history_store.period_start(period).tz_localize(hist.index.tz)
+            return hist[hist.index >= first]
+        return hist
+
+    def download(self, symbols, period=None, start=None, interval='1d', **kwargs):
+        """Stand-in for yfinance.download with group_by="ticker" """
+        self.wait("download")
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        frames = {symbol: self.slice(symbol, period, start, interval) for symbol in symbols}
+        return pd.concat(frames, axis=1)
+
+    @contextmanager
+    def install(self):
+        """Route the data layer to this backend until the block exits"""
+        import yfinance
+
+        saved = (http_session.yf_ticker, http_session.get_session, http_session.get_yf_session, yfinance.download)
+        http_session.yf_ticker = lambda symbol: _FakeTicker(self, symbol)
+        http_session.get_session = lambda: _FakeSession(self)
+        http_session.get_yf_session = lambda: None
+        yfinance.download = self.download
+        try:
+            yield self
+        finally:
+            (http_session.yf_ticker, http_session.get_session,
+             http_session.get_yf_session, yfinance.download) = saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record Yahoo Finance fixtures for the fake backend")
+    commands = parser.add_subparsers(dest="command", required=True)
+    recorder = commands.add_parser("record", help="record history, info and news for symbols")
+    recorder.add_argument("path")
+    recorder.add_argument("symbols", nargs="+")
+    recorder.add_argument("--query", action="append", default=[], help="search query to record")
+    recorder.add_argument("--period", default="5y")
+    args = parser.parse_args()
+
+    record(args.path, args.symbols, args.query, args.period)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Market breadth and sector performance over the local symbol universe.
+
+Everything is derived from one bulk snapshot: a wide DataFrame of daily
+closes for the whole universe (one column per symbol), loaded through the
+history store in batched downloads. Advance/decline counts, the share of
+stocks above their 50- and 200-day moving averages, 52-week highs and lows,
+and the per-sector aggregates for the heatmap are all array operations and
+groupbys over that snapshot, so a refresh needs no per-symbol ``.info``
+calls.
+"""
+import numpy as np
+import pandas as pd
+
+import screener
+
+# Moving averages a stock's last close is compared against
+MA_WINDOWS = (50, 200)
+
+# Trading days that define a new high or low (52 weeks)
+HIGH_LOW_WINDOW = 252
+
+# History loaded for the snapshot: enough for the longest window
+SNAPSHOT_PERIOD = "2y"
+
+
+def _moving_average(values, window):
+    """Mean of the last ``window`` rows of every column, NaN where any of them is missing"""
+    tail = values[-window:]
+    valid = np.count_nonzero(~np.isnan(tail), axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.nansum(tail, axis=0) / valid
+    return np.where(valid >= window, mean, np.nan)
+
+
+def stock_breadth(closes, universe):
+    """
+    Compute the per-stock breadth flags from a snapshot of closes
+
+    Parameters:
+    closes (pandas.DataFrame): Daily closes, one column per symbol (see screener.load_closes)
+    universe (pandas.DataFrame): Universe returned by screener.load_universe
+
+    Returns:
+    pandas.DataFrame: One row per symbol with name, sector, price, change_pct, above_ma<N>,
+                      new_high and new_low (flags are NaN-free booleans; MAs need a full window)
+    """
+    values = closes.ffill().to_numpy(dtype=float)
+    price = values[-1]
+    previous = values[-2] if len(values) > 1 else np.full_like(price, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change_pct = (price - previous) / previous * 100
+
+    details = universe.reindex(closes.columns)
+    stocks = pd.DataFrame({
+        'name': details['name'].fillna(pd.Series(closes.columns, index=closes.columns)).to_numpy(),
+        'sector': details['sector'].fillna('Other').to_numpy(),
+        'price': price,
+        'change_pct': change_pct,
+    }, index=pd.Index(closes.columns, name='symbol'))
+
+    for window in MA_WINDOWS:
+        with np.errstate(invalid='ignore'):
+            stocks[f'above_ma{window}'] = price > _moving_average(values, window)
+
+    # A close at the top (bottom) of the window, given at least a quarter of it as history
+    window = values[-HIGH_LOW_WINDOW:]
+    enough = np.count_nonzero(~np.isnan(window), axis=0) >= HIGH_LOW_WINDOW // 4
+    with np.errstate(invalid='ignore'):
+        # fmax/fmin skip NaN without warning about columns that are entirely missing
+        stocks['new_high'] = enough & (price >= np.fmax.reduce(window, axis=0))
+        stocks['new_low'] = enough & (price <= np.fmin.reduce(window, axis=0))
+
+    # Stocks without a close on the last two days carry no breadth signal
+    return stocks[np.isfinite(price) & np.isfinite(change_pct)]
+
+
+def sector_breadth(stocks):
+    """
+    Aggregate per-stock breadth by sector
+
+    Parameters:
+    stocks (pandas.DataFrame): Output of stock_breadth
+
+    Returns:
+    pandas.DataFrame: Per sector: stocks, advances, declines, avg_change_pct,
+                      pct_above_ma<N>, new_highs and new_lows
+    """
+    frame = stocks.assign(advancing=stocks['change_pct'] > 0, declining=stocks['change_pct'] < 0)
+    aggregations = {
+        'stocks': ('price', 'size'),
+        'advances': ('advancing', 'sum'),
+        'declines': ('declining', 'sum'),
+        'avg_change_pct': ('change_pct', 'mean'),
+        **{f'pct_above_ma{window}': (f'above_ma{window}', 'mean') for window in MA_WINDOWS},
+        'new_highs': ('new_high', 'sum'),
+        'new_lows': ('new_low', 'sum'),
+    }
+    sectors = frame.groupby('sector').agg(**aggregations)
+    for window in MA_WINDOWS:
+        sectors[f'pct_above_ma{window}'] *= 100
+    return sectors.sort_values('avg_change_pct', ascending=False)
+
+
+def summarize(stocks):
+    """
+    Market-wide breadth figures
+
+    Parameters:
+    stocks (pandas.DataFrame): Output of stock_breadth
+
+    Returns:
+    dict: stocks, advances, declines, unchanged, ad_ratio, pct_above_ma<N>, new_highs and new_lows
+    """
+    change = stocks['change_pct']
+    advances, declines = int((change > 0).sum()), int((change < 0).sum())
+    summary = {
+        'stocks': len(stocks),
+        'advances': advances,
+        'declines': declines,
+        'unchanged': len(stocks) - advances - declines,
+        'ad_ratio': advances / declines if declines else float('inf') if advances else np.nan,
+        'new_highs': int(stocks['new_high'].sum()),
+        'new_lows': int(stocks['new_low'].sum()),
+    }
+    for window in MA_WINDOWS:
+        summary[f'pct_above_ma{window}'] = float(stocks[f'above_ma{window}'].mean() * 100) if len(stocks) else np.nan
+    return summary
+
+
+def compute_breadth(closes, universe):
+    """
+    Compute market breadth from a snapshot of closes
+
+    Parameters:
+    closes (pandas.DataFrame): Daily closes, one column per symbol
+    universe (pandas.DataFrame): Universe returned by screener.load_universe
+
+    Returns:
+    dict: 'summary' (see summarize), 'sectors' (see sector_breadth), 'stocks' (see stock_breadth)
+          and 'as_of' (date of the last close)
+    """
+    stocks = stock_breadth(closes, universe)
+    return {
+        'summary': summarize(stocks),
+        'sectors': sector_breadth(stocks),
+        'stocks': stocks,
+        'as_of': closes.index[-1] if len(closes.index) else None,
+    }
+
+
+def load_breadth(universe=None, store=None):
+    """
+    Load a closes snapshot for the whole universe and compute its breadth
+
+    Parameters:
+    universe (pandas.DataFrame): Universe to scan (defaults to screener.load_universe())
+    store (HistoryStore): History store to read from
+
+    Returns:
+    dict: See compute_breadth, or None if no closes could be loaded
+    """
+    universe = screener.load_universe() if universe is None else universe
+    closes = screener.load_closes(universe.index, SNAPSHOT_PERIOD, store=store)
+    if closes.empty or len(closes) < 2:
+        return None
+    return compute_breadth(closes, universe)
@@ -0,0 +1,170 @@
+"""
+Chart data preparation for the price chart and historical data table.
+
+All derived series are computed with vectorized pandas/NumPy operations in a
+single pass over the OHLCV frame returned by ``load_stock_data``. Long
+histories are downsampled before figure construction (LTTB for lines, bucketed
+OHLC re-aggregation for candlesticks and volume) so the number of points sent
+to the browser is bounded by the chart width rather than the history length.
+"""
+import numpy as np
+import pandas as pd
+
+# Colours used for rising and falling bars
+UP_COLOR = '#26A69A'
+DOWN_COLOR = '#EF5350'
+
+# Moving average windows drawn on the line chart
+MA_WINDOWS = (5, 20)
+
+# Approximate rendered width of the price chart in pixels
+CHART_WIDTH_PX = 800
+
+# Point budget per pixel of chart width for line traces, and pixels per candle/volume bar
+LINE_POINTS_PER_PIXEL = 1
+PIXELS_PER_BAR = 4
+
+
+def prepare_chart_data(hist):
+    """
+    Compute every series derived from the OHLCV history for charting
+
+    The input frame is not modified, so cached histories stay untouched.
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV history
+
+    Returns:
+    pandas.DataFrame: Copy of the history with VolumeColor, MA columns, Change and Change %
+    """
+    close = hist['Close'].to_numpy(dtype=float)
+    open_ = hist['Open'].to_numpy(dtype=float)
+
+    derived = {
+        'VolumeColor': np.where(close >= open_, UP_COLOR, DOWN_COLOR),
+    }
+    for window in MA_WINDOWS:
+        derived[f'MA{window}'] = hist['Close'].rolling(window=window).mean().to_numpy()
+
+    change = close - open_
+    derived['Change'] = change
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived['Change %'] = change / open_ * 100
+
+    return hist.assign(**derived)
+
+
+def lttb_indices(y, n_out, x=None):
+    """
+    Select points with the Largest-Triangle-Three-Buckets algorithm
+
+    Parameters:
+    y (array-like): Series values (must not contain NaN)
+    n_out (int): Number of points to keep
+    x (array-like): Series positions (defaults to 0..n-1)
+
+    Returns:
+    numpy.ndarray: Sorted indices of the points to keep
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        # Keep the point forming the largest triangle with the previous pick and the next bucket's average
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def resample_ohlc(hist, max_bars):
+    """
+    Re-aggregate consecutive bars into at most max_bars OHLCV buckets
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV history
+    max_bars (int): Maximum number of bars to return
+
+    Returns:
+    pandas.DataFrame: Aggregated OHLCV frame with VolumeColor, indexed by each bucket's first date
+    """
+    n = len(hist)
+    if n <= max_bars or max_bars < 1:
+        return hist
+
+    size = -(-n // max_bars)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+
+    open_ = hist['Open'].to_numpy(dtype=float)[starts]
+    close = hist['Close'].to_numpy(dtype=float)[ends]
+    resampled = pd.DataFrame(
+        {
+            'Open': open_,
+            'High': np.fmax.reduceat(hist['High'].to_numpy(dtype=float), starts),
+            'Low': np.fmin.reduceat(hist['Low'].to_numpy(dtype=float), starts),
+            'Close': close,
+            'Volume': np.add.reduceat(np.nan_to_num(hist['Volume'].to_numpy(dtype=float)), starts),
+            'VolumeColor': np.where(close >= open_, UP_COLOR, DOWN_COLOR),
+        },
+        index=hist.index[starts]
+    )
+    return resampled
+
+
+def downsample_for_chart(chart_data, chart_type, width_px=CHART_WIDTH_PX):
+    """
+    Reduce prepared chart data to a point count bounded by the chart width
+
+    Parameters:
+    chart_data (pandas.DataFrame): Output of prepare_chart_data
+    chart_type (str): "Line Chart" or "Candlestick Chart"
+    width_px (int): Rendered chart width in pixels
+
+    Returns:
+    tuple: (price_data, volume_data) frames to plot
+    """
+    max_bars = max(width_px // PIXELS_PER_BAR, 1)
+    volume_data = resample_ohlc(chart_data, max_bars)
+
+    if chart_type == "Candlestick Chart":
+        return volume_data, volume_data
+
+    # Moving averages were computed on the full history, so sampling keeps them exact
+    close = chart_data['Close'].ffill().bfill().to_numpy(dtype=float)
+    indices = lttb_indices(close, width_px * LINE_POINTS_PER_PIXEL)
+    return chart_data.iloc[indices], volume_data
+
+
+def thin_for_chart(frame, column, width_px=CHART_WIDTH_PX):
+    """
+    Reduce a frame of line series to a point count bounded by the chart width
+
+    Parameters:
+    frame (pandas.DataFrame): Series to plot, one per column
+    column (str): Column whose shape decides which points are kept (LTTB)
+    width_px (int): Rendered chart width in pixels
+
+    Returns:
+    pandas.DataFrame: Selected rows of ``frame``
+    """
+    values = frame[column].ffill().bfill().fillna(0).to_numpy(dtype=float)
+    return frame.iloc[lttb_indices(values, width_px * LINE_POINTS_PER_PIXEL)]
@@ -0,0 +1,104 @@
+"""
+Command-line access to the market data layer, without Streamlit.
+
+Usage:
+    python cli.py indices
+    python cli.py quote RELIANCE.NS TCS.NS
+    python cli.py history RELIANCE.NS --period 5y
+    python cli.py history RELIANCE.NS --period 5d --interval 5m
+    python cli.py penny
+    python cli.py breadth --sectors
+    python cli.py news INFY.NS
+    python cli.py search tata
+Add --json to any command for machine-readable output.
+"""
+import argparse
+import json
+
+import pandas as pd
+
+import intraday_store
+import market_data
+import symbol_index
+
+
+def _print(data, as_json):
+    if as_json:
+        if isinstance(data, pd.DataFrame):
+            print(data.to_json(orient='records', date_format='iso'))
+        else:
+            print(json.dumps(data, default=str))
+    elif isinstance(data, pd.DataFrame):
+        # Snapshots carry the symbol as a column; only show a meaningful index
+        print(data.to_string(index=not isinstance(data.index, pd.RangeIndex)))
+    else:
+        print(pd.DataFrame(data).to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indian stock market data from the command line")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("indices", help="current values of the market overview indices")
+
+    quote = commands.add_parser("quote", help="current prices for one or more symbols")
+    quote.add_argument("symbols", nargs="+")
+
+    history = commands.add_parser("history", help="daily or intraday OHLCV history for a symbol")
+    history.add_argument("symbol")
+    history.add_argument("--period", help="defaults to 1y for daily bars and 1d for intraday bars")
+    history.add_argument("--interval", default="1d", choices=["1d"] + list(intraday_store.INTERVALS))
+
+    commands.add_parser("penny", help="penny stocks from the local symbol universe")
+
+    breadth = commands.add_parser("breadth", help="advance/decline, moving-average and 52-week breadth")
+    breadth.add_argument("--sectors", action="store_true", help="show the per-sector breakdown")
+
+    news = commands.add_parser("news", help="latest news for a symbol")
+    news.add_argument("symbol")
+    news.add_argument("--count", type=int, default=5)
+    news.add_argument("--feed", action="store_true", help="include sector peer and market headlines")
+
+    search = commands.add_parser("search", help="search the local symbol index")
+    search.add_argument("query")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "indices":
+        symbols = tuple(symbol for _, symbol in market_data.MARKET_INDICES)
+        snapshot = market_data.get_index_snapshot(symbols)
+        data = [
+            {'index': label, 'symbol': symbol, 'price': snapshot[symbol][0],
+             'change': snapshot[symbol][1], 'pct_change': snapshot[symbol][2]}
+            for label, symbol in market_data.MARKET_INDICES
+        ]
+    elif args.command == "quote":
+        data = market_data.get_watchlist_data([symbol.upper() for symbol in args.symbols])
+    elif args.command == "history":
+        period = args.period or ("1y" if args.interval == "1d" else "1d")
+        _, data = market_data.load_stock_data(args.symbol.upper(), period, args.interval)
+        if data is None:
+            parser.exit(1, f"No data for {args.symbol}\n")
+    elif args.command == "penny":
+        data = market_data.get_penny_stocks()
+    elif args.command == "breadth":
+        result = market_data.get_market_breadth()
+        if result is None:
+            parser.exit(1, "Market breadth is unavailable\n")
+        data = result['sectors'].reset_index() if args.sectors else [result['summary']]
+    elif args.command == "news":
+        data = [
+            {'title': item.get('title'), 'publisher': item.get('publisher'), 'link': item.get('link')}
+            for item in (market_data.get_news_feed if args.feed else market_data.get_stock_news)(
+                args.symbol.upper(), args.count
+            )
+        ]
+    else:
+        data = symbol_index.get_index().search(args.query)
+
+    _print(data, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Multi-symbol comparison over one date-aligned price panel.
+
+Every statistic here is computed from the same wide frame of daily closes
+(one column per symbol) with whole-array operations: the correlation matrix
+comes from a handful of matrix products and the rolling statistics (the
+pairwise correlation matrix over a trailing window, and correlation and beta
+against the benchmark) from windowed cumulative sums, so the cost grows with
+the panel size rather than with a Python loop over symbol pairs. Missing values (holidays, symbols listed
+part-way through the period) are handled pairwise.
+"""
+import numpy as np
+import pandas as pd
+
+import screener
+
+BENCHMARK = "^NSEI"
+
+# Trading days in the default rolling window (about three months)
+ROLLING_WINDOW = 60
+
+# Fewest overlapping returns needed before a correlation or beta is reported
+MIN_PERIODS = 20
+
+
+def load_panel(symbols, period='1y', benchmark=BENCHMARK, store=None):
+    """
+    Load daily closes for several symbols and the benchmark into one aligned panel
+
+    Parameters:
+    symbols (list): Stock ticker symbols
+    period (str): Time period for historical data
+    benchmark (str): Benchmark index symbol (None to leave it out)
+    store (HistoryStore): History store to read from (defaults to the shared store)
+
+    Returns:
+    pandas.DataFrame: Closes with one row per date and one column per symbol
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if benchmark and benchmark not in symbols:
+        symbols.append(benchmark)
+    closes = screener.load_closes(symbols, period, store=store)
+    return closes.reindex(columns=[symbol for symbol in symbols if symbol in closes])
+
+
+def daily_returns(closes):
+    """
+    Compute daily simple returns for every column of a close panel
+
+    Parameters:
+    closes (pandas.DataFrame): Close panel
+
+    Returns:
+    pandas.DataFrame: Returns, NaN where either close is missing
+    """
+    return closes.pct_change(fill_method=None).iloc[1:]
+
+
+def normalized_performance(closes, base=100):
+    """
+    Rebase every column so its first available close equals ``base``
+
+    Parameters:
+    closes (pandas.DataFrame): Close panel
+    base (float): Starting value
+
+    Returns:
+    pandas.DataFrame: Rebased closes
+    """
+    first = closes.bfill().iloc[0]
+    return closes.div(first) * base
+
+
+def correlation_matrix(returns, min_periods=MIN_PERIODS):
+    """
+    Pairwise-complete correlation matrix of all columns
+
+    Parameters:
+    returns (pandas.DataFrame): Return panel
+    min_periods (int): Fewest overlapping observations for a pair to get a value
+
+    Returns:
+    pandas.DataFrame: Symmetric correlation matrix
+    """
+    values = returns.to_numpy(dtype=float)
+    valid = (~np.isnan(values)).astype(float)
+    x = np.where(valid > 0, values, 0.0)
+
+    # Sums over the dates where both columns of each pair are present
+    n = valid.T @ valid
+    sum_x = x.T @ valid            # [i, j]: sum of column i where j is also present
+    sum_xx = (x * x).T @ valid
+    sum_xy = x.T @ x
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * sum_xy - sum_x * sum_x.T
+        var = n * sum_xx - sum_x ** 2
+        corr = cov / np.sqrt(var * var.T)
+    corr[n < min_periods] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(n) >= min_periods, 1.0, np.nan))
+
+    return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+
+
+def _window_sums(values, window):
+    """Sum each column over a trailing window using cumulative sums"""
+    sums = np.cumsum(values, axis=0)
+    sums[window:] = sums[window:] - sums[:-window].copy()
+    return sums
+
+
+def rolling_vs_benchmark(returns, benchmark_returns, window=ROLLING_WINDOW, min_periods=MIN_PERIODS):
+    """
+    Rolling correlation and beta of every column against a benchmark
+
+    Parameters:
+    returns (pandas.DataFrame): Return panel
+    benchmark_returns (pandas.Series): Benchmark returns on the same dates
+    window (int): Trailing window in rows
+    min_periods (int): Fewest overlapping observations in a window for a value
+
+    Returns:
+    tuple: (correlation DataFrame, beta DataFrame), both shaped like returns
+    """
+    x = returns.to_numpy(dtype=float)
+    y = benchmark_returns.reindex(returns.index).to_numpy(dtype=float)[:, None]
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+
+    n = _window_sums(valid.astype(float), window)
+    sum_x, sum_y = _window_sums(x, window), _window_sums(y, window)
+    sum_xx, sum_yy = _window_sums(x * x, window), _window_sums(y * y, window)
+    sum_xy = _window_sums(x * y, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * sum_xy - sum_x * sum_y
+        var_x = n * sum_xx - sum_x ** 2
+        var_y = n * sum_yy - sum_y ** 2
+        corr = cov / np.sqrt(var_x * var_y)
+        beta = cov / var_y
+
+    too_few = n < min_periods
+    corr[too_few] = np.nan
+    beta[too_few] = np.nan
+
+    return (pd.DataFrame(corr, index=returns.index, columns=returns.columns),
+            pd.DataFrame(beta, index=returns.index, columns=returns.columns))
+
+
+def rolling_correlation_matrix(returns, window=ROLLING_WINDOW, min_periods=MIN_PERIODS):
+    """
+    Pairwise-complete correlation matrix of all columns over a trailing window
+
+    Parameters:
+    returns (pandas.DataFrame): Return panel
+    window (int): Trailing window in rows
+    min_periods (int): Fewest overlapping observations in a window for a pair to get a value
+
+    Returns:
+    pandas.DataFrame: One matrix per date, indexed by (date, symbol) with a column per symbol
+
+    Memory grows with dates x symbols^2, so this is meant for a handful of symbols
+    rather than a whole screener universe.
+    """
+    values = returns.to_numpy(dtype=float)
+    valid = (~np.isnan(values)).astype(float)
+    x = np.where(valid > 0, values, 0.0)
+
+    # Same sums as correlation_matrix, but per date over the trailing window
+    n = _window_sums(valid[:, :, None] * valid[:, None, :], window)
+    sum_x = _window_sums(x[:, :, None] * valid[:, None, :], window)
+    sum_xx = _window_sums((x * x)[:, :, None] * valid[:, None, :], window)
+    sum_xy = _window_sums(x[:, :, None] * x[:, None, :], window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = n * sum_xy - sum_x * sum_x.transpose(0, 2, 1)
+        var = n * sum_xx - sum_x ** 2
+        corr = cov / np.sqrt(var * var.transpose(0, 2, 1))
+    corr[n < min_periods] = np.nan
+    diagonal = np.arange(returns.shape[1])
+    corr[:, diagonal, diagonal] = np.where(n[:, diagonal, diagonal] >= min_periods, 1.0, np.nan)
+
+    index = pd.MultiIndex.from_product([returns.index, returns.columns])
+    return pd.DataFrame(corr.reshape(-1, returns.shape[1]), index=index, columns=returns.columns)
+
+
+def betas(returns, benchmark_returns, min_periods=MIN_PERIODS):
+    """
+    Beta of every column against a benchmark over the whole panel
+
+    Parameters:
+    returns (pandas.DataFrame): Return panel
+    benchmark_returns (pandas.Series): Benchmark returns on the same dates
+    min_periods (int): Fewest overlapping observations for a value
+
+    Returns:
+    pandas.Series: Beta per symbol
+    """
+    _, beta = rolling_vs_benchmark(returns, benchmark_returns, window=len(returns), min_periods=min_periods)
+    return beta.iloc[-1] if len(beta) else pd.Series(np.nan, index=returns.columns)
+
+
+def compare(closes, benchmark=BENCHMARK, window=ROLLING_WINDOW):
+    """
+    Compute every comparison statistic from one close panel
+
+    Parameters:
+    closes (pandas.DataFrame): Close panel (may include the benchmark column)
+    benchmark (str): Benchmark column name
+    window (int): Rolling window in rows
+
+    Returns:
+    dict: normalized, returns, correlation, rolling_correlation, rolling_beta and
+          summary (total return, annualized volatility and beta per symbol)
+    """
+    returns = daily_returns(closes)
+    result = {
+        'normalized': normalized_performance(closes),
+        'returns': returns,
+        'correlation': correlation_matrix(returns),
+    }
+
+    first, last = closes.bfill().iloc[0], closes.ffill().iloc[-1]
+    summary = pd.DataFrame({
+        'total_return_pct': (last / first - 1) * 100,
+        'volatility_pct': returns.std() * np.sqrt(252) * 100,
+    })
+
+    if benchmark in closes:
+        stocks = returns.drop(columns=benchmark)
+        rolling_corr, rolling_beta = rolling_vs_benchmark(stocks, returns[benchmark], window)
+        result['rolling_correlation'] = rolling_corr
+        result['rolling_beta'] = rolling_beta
+        summary['beta'] = betas(returns, returns[benchmark])
+
+    result['summary'] = summary
+    return result
@@ -0,0 +1,209 @@
+"""
+Export DataFrames and symbol histories as CSV, Parquet or Excel files.
+
+Writers take a binary file object and write in chunks, so nothing is built
+up as one big string: CSV is written a block of rows at a time and Parquet
+one row group at a time. Several frames can be streamed straight into the
+members of one zip archive built in memory.
+
+Parquet needs pyarrow and Excel needs openpyxl or xlsxwriter; formats whose
+library is not installed are left out of ``available_formats()``.
+"""
+import importlib.util
+import io
+import zipfile
+
+import pandas as pd
+
+import history_store
+import intraday_store
+
+# Rows written per CSV block / Parquet row group
+CHUNK_ROWS = 50_000
+
+# format -> (label, file extension, MIME type, modules that can write it)
+FORMATS = {
+    'csv': ("CSV", ".csv", "text/csv", ()),
+    'parquet': ("Parquet", ".parquet", "application/vnd.apache.parquet", ("pyarrow",)),
+    'xlsx': ("Excel", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+             ("openpyxl", "xlsxwriter")),
+}
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def available_formats():
+    """
+    List the export formats that can be written in this environment
+
+    Returns:
+    list: Format keys of FORMATS, CSV first
+    """
+    return [fmt for fmt, (_, _, _, modules) in FORMATS.items()
+            if not modules or any(_installed(module) for module in modules)]
+
+
+def file_name(name, fmt):
+    """Return ``name`` with the extension for a format"""
+    return f"{name}{FORMATS[fmt][1]}"
+
+
+def mime_type(fmt):
+    """Return the MIME type for a format"""
+    return FORMATS[fmt][2]
+
+
+def write_csv(df, fileobj, index=False, chunk_rows=CHUNK_ROWS):
+    """
+    Write a DataFrame as UTF-8 CSV, one block of rows at a time
+
+    Parameters:
+    df (pandas.DataFrame): Data to write
+    fileobj: Binary file object
+    index (bool): Whether to write the index
+    chunk_rows (int): Rows per block
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='', write_through=True)
+    try:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(text, index=index, header=start == 0)
+        text.flush()
+    finally:
+        # Leave the caller's file object open
+        text.detach()
+
+
+def write_parquet(df, fileobj, index=False, chunk_rows=CHUNK_ROWS):
+    """
+    Write a DataFrame as Parquet, one row group at a time (requires pyarrow)
+
+    Parameters:
+    df (pandas.DataFrame): Data to write
+    fileobj: Binary file object
+    index (bool): Whether to write the index
+    chunk_rows (int): Rows per row group
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=index)
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=index))
+
+
+def _excel_safe(df):
+    """Excel cannot store timezones: convert tz-aware columns and index to naive local times"""
+    df = df.copy(deep=False)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.DatetimeTZDtype):
+            df[column] = df[column].dt.tz_localize(None)
+    if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    return df
+
+
+def write_xlsx(df, fileobj, index=False, sheet_name="Data"):
+    """
+    Write a DataFrame as an Excel workbook (requires openpyxl or xlsxwriter)
+
+    Parameters:
+    df (pandas.DataFrame): Data to write
+    fileobj: Binary file object
+    index (bool): Whether to write the index
+    sheet_name (str): Worksheet name
+    """
+    engine = "xlsxwriter" if _installed("xlsxwriter") else "openpyxl"
+    with pd.ExcelWriter(fileobj, engine=engine) as writer:
+        _excel_safe(df).to_excel(writer, sheet_name=sheet_name[:31], index=index)
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'xlsx': write_xlsx}
+
+
+def write(df, fmt, fileobj, index=False):
+    """
+    Write a DataFrame in the given format
+
+    Parameters:
+    df (pandas.DataFrame): Data to write
+    fmt (str): Key of FORMATS
+    fileobj: Binary file object
+    index (bool): Whether to write the index
+    """
+    if fmt not in available_formats():
+        raise ValueError(f"{fmt} export is not available; install {' or '.join(FORMATS[fmt][3])}")
+    WRITERS[fmt](df, fileobj, index=index)
+
+
+def to_bytes(df, fmt, index=False):
+    """
+    Serialize a DataFrame to bytes in the given format
+
+    Parameters:
+    df (pandas.DataFrame): Data to write
+    fmt (str): Key of FORMATS
+    index (bool): Whether to write the index
+
+    Returns:
+    bytes: File contents
+    """
+    buffer = io.BytesIO()
+    write(df, fmt, buffer, index=index)
+    return buffer.getvalue()
+
+
+def write_archive(frames, fmt, fileobj, index=False):
+    """
+    Write several DataFrames into one zip archive, one file each
+
+    Parameters:
+    frames (iterable): (name, DataFrame) pairs; frames are consumed one at a time
+    fmt (str): Key of FORMATS
+    fileobj: Binary file object
+    index (bool): Whether to write the index
+    """
+    # Excel and Parquet files are already compressed
+    compression = zipfile.ZIP_DEFLATED if fmt == 'csv' else zipfile.ZIP_STORED
+    with zipfile.ZipFile(fileobj, 'w', compression=compression) as archive:
+        for name, df in frames:
+            if fmt == 'csv':
+                # Stream CSV straight into the archive member
+                with archive.open(file_name(name, fmt), 'w', force_zip64=True) as member:
+                    write(df, fmt, member, index=index)
+            else:
+                # Parquet and Excel writers need a seekable target
+                archive.writestr(file_name(name, fmt), to_bytes(df, fmt, index=index))
+
+
+def export_histories(symbols, period, fmt, interval='1d', store=None):
+    """
+    Export the stored history of several symbols as one zip archive
+
+    Parameters:
+    symbols (list): Stock ticker symbols
+    period (str): Time period for historical data
+    fmt (str): Key of FORMATS
+    interval (str): Bar interval, "1d" or one of intraday_store.INTERVALS
+    store (HistoryStore or IntradayStore): Store to read from (defaults to the shared store for the interval)
+
+    Returns:
+    bytes: Zip archive contents
+    """
+    if interval in intraday_store.INTERVALS:
+        store = store or intraday_store.get_store()
+        histories = {symbol: store.get_history(symbol, interval, period) for symbol in dict.fromkeys(symbols)}
+        histories = {symbol: hist for symbol, hist in histories.items() if not hist.empty}
+    else:
+        store = store or history_store.get_store()
+        histories = store.get_many(list(symbols), period)
+
+    archive = io.BytesIO()
+    write_archive(
+        ((symbol, histories[symbol].reset_index()) for symbol in symbols if symbol in histories),
+        fmt, archive
+    )
+    return archive.getvalue()
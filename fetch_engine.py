@@ -0,0 +1,264 @@
+"""
+Batched, concurrent fetching helpers for Yahoo Finance data.
+
+Price history for many symbols is requested with a single multi-symbol
+download, while per-symbol metadata (``Ticker.info``) is fetched on a bounded
+thread pool with per-symbol timeouts so that one slow symbol never blocks the
+rest of the results.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+import http_session
+
+# Defaults used by the dashboard
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 10  # seconds allowed for each individual call
+POLL_INTERVAL = 0.05
+
+# Columns of a quote snapshot, in the order of the row tuples from fetch_quote_rows
+QUOTE_COLUMNS = ['symbol', 'name', 'price', 'change', 'pct_change', 'volume', 'market_cap']
+
+
+def run_concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+    """
+    Call a function for every item on a bounded thread pool
+
+    Each call gets its own timeout, measured from the moment it starts
+    running. Calls that fail or time out are reported in the errors
+    dictionary instead of aborting the whole batch.
+
+    Parameters:
+    func (callable): Function taking a single item
+    items (iterable): Items to process (duplicates are processed once)
+    max_workers (int): Maximum number of concurrent calls
+    timeout (float): Seconds allowed for each call
+
+    Returns:
+    tuple: (results, errors) dictionaries keyed by item
+    """
+    items = list(dict.fromkeys(items))
+    results, errors = {}, {}
+    if not items:
+        return results, errors
+
+    workers = max(1, min(max_workers, len(items)))
+    started = {}
+
+    def _call(item):
+        started[item] = time.monotonic()
+        return func(item)
+
+    # Guard against every worker being stuck on a timed-out call
+    rounds = -(-len(items) // workers)
+    overall_deadline = time.monotonic() + timeout * rounds + timeout
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(_call, item): item for item in items}
+        pending = set(futures)
+
+        while pending:
+            done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item = futures[future]
+                try:
+                    results[item] = future.result()
+                except Exception as e:
+                    errors[item] = e
+
+            now = time.monotonic()
+            for future in list(pending):
+                item = futures[future]
+                start = started.get(item)
+                expired = start is not None and now - start > timeout
+                if expired or now > overall_deadline:
+                    future.cancel()
+                    pending.discard(future)
+                    errors[item] = TimeoutError(f"{item} did not respond within {timeout}s")
+    finally:
+        # Do not wait for calls that have already timed out
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, errors
+
+
+def download_history(symbols, period="5d", interval="1d", start=None, auto_adjust=False,
+                     actions=False, timeout=DEFAULT_TIMEOUT):
+    """
+    Download price history for several symbols in one request
+
+    Parameters:
+    symbols (list): List of stock symbols
+    period (str): Time period for historical data (ignored when start is given)
+    interval (str): Bar interval
+    start (str or datetime): First date to download
+    auto_adjust (bool): Adjust prices for splits and dividends
+    actions (bool): Include Dividends and Stock Splits columns
+    timeout (float): Request timeout in seconds
+
+    Returns:
+    dict: Mapping of symbol to its OHLCV DataFrame (symbols without data are omitted)
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+
+    # Imported on first use to keep module import cheap
+    import yfinance as yf
+
+    data = yf.download(
+        symbols,
+        period=None if start is not None else period,
+        start=start,
+        interval=interval,
+        group_by="ticker",
+        auto_adjust=auto_adjust,
+        actions=actions,
+        threads=True,
+        progress=False,
+        timeout=timeout,
+        session=http_session.get_yf_session(),
+    )
+    return split_download(data, symbols)
+
+
+def split_download(data, symbols):
+    """
+    Split a multi-symbol download into one DataFrame per symbol
+
+    Parameters:
+    data (pandas.DataFrame): Result of ``yf.download`` grouped by ticker
+    symbols (list): Symbols that were requested
+
+    Returns:
+    dict: Mapping of symbol to its OHLCV DataFrame
+    """
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        # Older yfinance versions return flat columns for a single symbol
+        data = pd.concat({symbols[0]: data}, axis=1)
+
+    available = set(data.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol not in available:
+            continue
+        frame = data[symbol].dropna(how="all")
+        if not frame.empty and 'Close' in frame.columns:
+            frames[symbol] = frame
+
+    return frames
+
+
+def fetch_info(symbols, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetch ``Ticker.info`` metadata for several symbols concurrently
+
+    Parameters:
+    symbols (list): List of stock symbols
+    max_workers (int): Maximum number of concurrent requests
+    timeout (float): Seconds allowed for each symbol
+
+    Returns:
+    tuple: (info, errors) dictionaries keyed by symbol
+    """
+    return run_concurrently(lambda symbol: http_session.yf_ticker(symbol).info or {}, symbols,
+                            max_workers=max_workers, timeout=timeout)
+
+
+def _fast_quote(symbol):
+    """Read the last price and previous close from the lightweight ``fast_info`` endpoint"""
+    fast_info = http_session.yf_ticker(symbol).fast_info
+    return fast_info['lastPrice'], fast_info['previousClose']
+
+
+def fetch_quotes(symbols, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetch the last price and previous close for several symbols concurrently
+
+    Parameters:
+    symbols (list): List of stock or index symbols
+    max_workers (int): Maximum number of concurrent requests
+    timeout (float): Seconds allowed for each symbol
+
+    Returns:
+    tuple: (quotes, errors) where quotes maps symbol to (price, previous close)
+    """
+    return run_concurrently(_fast_quote, symbols, max_workers=max_workers, timeout=timeout)
+
+
+def fetch_quote_rows(symbols, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetch current price data for several stocks
+
+    Prices come from one batched download; names, volume and market cap come
+    from concurrent ``Ticker.info`` lookups that run while the download is in
+    flight, so a refresh takes as long as the slower of the two rather than
+    their sum. A slow or failed lookup still yields a price row.
+
+    Parameters:
+    symbols (list): List of stock symbols
+    max_workers (int): Maximum number of concurrent metadata requests
+    timeout (float): Seconds allowed for each symbol
+
+    Returns:
+    dict: Mapping of symbol to a row tuple in QUOTE_COLUMNS order (symbols without prices are omitted)
+    """
+    with ThreadPoolExecutor(max_workers=1) as download_pool:
+        download = download_pool.submit(download_history, symbols, period="5d", timeout=timeout)
+        infos, _ = fetch_info(symbols, max_workers=max_workers, timeout=timeout)
+        histories = download.result()
+
+    rows = {}
+    for symbol in symbols:
+        hist = histories.get(symbol)
+        if hist is None:
+            continue
+
+        closes = hist['Close'].dropna()
+        if closes.empty:
+            continue
+
+        info = infos.get(symbol, {})
+        current_price = closes.iloc[-1]
+        fallback_close = closes.iloc[-2] if len(closes) > 1 else current_price
+        prev_close = info.get('previousClose') or fallback_close
+        change = current_price - prev_close
+        pct_change = (change / prev_close) * 100 if prev_close else 0
+
+        rows[symbol] = (
+            symbol,
+            info.get('longName', symbol),
+            current_price,
+            change,
+            pct_change,
+            info.get('volume', hist['Volume'].iloc[-1] if 'Volume' in hist.columns else 0),
+            info.get('marketCap', 0)
+        )
+
+    return rows
+
+
+def quote_snapshot(rows):
+    """
+    Build a columnar quote snapshot from row tuples
+
+    Parameters:
+    rows (list): Row tuples in QUOTE_COLUMNS order (see fetch_quote_rows)
+
+    Returns:
+    pandas.DataFrame: One typed column per field of QUOTE_COLUMNS, one row per symbol
+    """
+    # Transpose the rows once and type each column directly (missing numbers become NaN)
+    columns = list(zip(*rows)) or [()] * len(QUOTE_COLUMNS)
+    return pd.DataFrame({
+        name: pd.array(values, dtype='str') if name in ('symbol', 'name') else np.array(values, dtype=float)
+        for name, values in zip(QUOTE_COLUMNS, columns)
+    })
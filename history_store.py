@@ -0,0 +1,303 @@
+"""
+Persistent on-disk store for daily OHLCV history.
+
+Bars are kept in a local SQLite database keyed by symbol and date. Each
+request only downloads the bars that are missing since the last stored date
+and any requested period ("1mo" ... "5y") is sliced out of the stored data,
+so repeat analyses of the same symbol are served locally.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+import fetch_engine
+import http_session
+import metrics
+
+# Location of the local cache (override with the STOCK_CACHE_DIR environment variable)
+CACHE_DIR = os.environ.get(
+    "STOCK_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+DEFAULT_DB_PATH = os.path.join(CACHE_DIR, "history.sqlite")
+
+# Seconds before the latest stored bars are topped up again
+REFRESH_INTERVAL = 900
+
+# Columns stored for every bar, in the order returned by Ticker.history()
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# Offsets used to slice Yahoo Finance periods out of the stored history
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1),
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL,
+    volume REAL, dividends REAL, splits REAL,
+    PRIMARY KEY (symbol, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT PRIMARY KEY,
+    start TEXT,
+    timezone TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def period_start(period, today=None):
+    """
+    Convert a Yahoo Finance period string to the first date it covers
+
+    Parameters:
+    period (str): Time period such as "1mo", "1y" or "max"
+    today (pandas.Timestamp): Reference date (defaults to today)
+
+    Returns:
+    pandas.Timestamp: First date of the period, or None for "max"
+    """
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return today.replace(month=1, day=1)
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported period: {period}")
+    return today - PERIOD_OFFSETS[period]
+
+
+class HistoryStore:
+    """
+    SQLite-backed store of daily bars with incremental top-up
+
+    Parameters:
+    path (str): Database file (defaults to DEFAULT_DB_PATH)
+    refresh_interval (float): Seconds before stored bars are topped up again
+    """
+
+    def __init__(self, path=None, refresh_interval=REFRESH_INTERVAL):
+        self.path = path or DEFAULT_DB_PATH
+        self.refresh_interval = refresh_interval
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _lock(self, symbol):
+        # One lock per symbol so concurrent reruns don't download the same bars twice
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _coverage(self, conn, symbol):
+        row = conn.execute(
+            "SELECT start, timezone, fetched_at FROM coverage WHERE symbol = ?", (symbol,)
+        ).fetchone()
+        return row
+
+    def _last_date(self, conn, symbol):
+        row = conn.execute("SELECT MAX(date) FROM bars WHERE symbol = ?", (symbol,)).fetchone()
+        return row[0] if row else None
+
+    def _plan(self, conn, symbol, start):
+        """Return the date to download from, or None when the stored bars are fresh"""
+        coverage = self._coverage(conn, symbol)
+        if coverage is None:
+            return start, True
+
+        covered_from, _, fetched_at = coverage
+        needs_backfill = covered_from is not None and (start is None or start < pd.Timestamp(covered_from))
+        if needs_backfill:
+            return start, True
+
+        if time.time() - fetched_at < self.refresh_interval:
+            return None, False
+
+        # Re-download the last stored bar too, since it may have been a partial session
+        last_date = self._last_date(conn, symbol)
+        return (pd.Timestamp(last_date) if last_date else start), False
+
+    def _write(self, conn, symbol, hist, start, full):
+        """Store downloaded bars; a full download replaces everything stored for the symbol"""
+        hist = hist.reindex(columns=BAR_COLUMNS)
+        timezone = str(hist.index.tz) if getattr(hist.index, 'tz', None) is not None else None
+        dates = hist.index.tz_localize(None) if timezone else hist.index
+        coverage = self._coverage(conn, symbol)
+
+        if full:
+            conn.execute("DELETE FROM bars WHERE symbol = ?", (symbol,))
+            covered_from = start
+        else:
+            covered_from = pd.Timestamp(coverage[0]) if coverage and coverage[0] else None
+
+        rows = zip(
+            [symbol] * len(hist),
+            dates.strftime('%Y-%m-%d'),
+            *(hist[column].astype(float) for column in BAR_COLUMNS)
+        )
+        conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)",
+            (
+                symbol,
+                covered_from.strftime('%Y-%m-%d') if covered_from is not None else None,
+                timezone or (coverage[1] if coverage else None),
+                time.time()
+            )
+        )
+
+    def _adjustments_changed(self, hist, since):
+        """Dividends or splits after ``since`` re-adjust every earlier price"""
+        if since is None or hist.empty:
+            return False
+        recent = hist[hist.index.tz_localize(None) > since] if hist.index.tz is not None else hist[hist.index > since]
+        actions = recent.reindex(columns=['Dividends', 'Stock Splits']).fillna(0)
+        return bool((actions != 0).to_numpy().any())
+
+    def _read(self, conn, symbol, start):
+        query = "SELECT date, open, high, low, close, volume, dividends, splits FROM bars WHERE symbol = ?"
+        params = [symbol]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(start.strftime('%Y-%m-%d'))
+        query += " ORDER BY date"
+
+        rows = conn.execute(query, params).fetchall()
+        hist = pd.DataFrame(rows, columns=['Date'] + BAR_COLUMNS)
+        hist['Date'] = pd.to_datetime(hist['Date'])
+        hist = hist.set_index('Date')
+        hist['Volume'] = hist['Volume'].fillna(0).astype('int64')
+
+        coverage = self._coverage(conn, symbol)
+        if coverage and coverage[1]:
+            hist.index = hist.index.tz_localize(coverage[1])
+        return hist
+
+    def get_history(self, symbol, period='1y'):
+        """
+        Get daily bars for a symbol, downloading only what is missing locally
+
+        Parameters:
+        symbol (str): Stock ticker symbol
+        period (str): Time period for historical data
+
+        Returns:
+        pandas.DataFrame: OHLCV history (empty if the symbol has no data)
+        """
+        start = period_start(period)
+        with self._lock(symbol), self._connect() as conn:
+            fetch_from, full = self._plan(conn, symbol, start)
+            stale = fetch_from is not None or full
+            metrics.record_cache("history_store", hits=int(not stale), misses=int(stale))
+            if stale:
+                hist = self._download(symbol, fetch_from)
+                if not full and self._adjustments_changed(hist, pd.Timestamp(self._last_date(conn, symbol))):
+                    full = True
+                    coverage = self._coverage(conn, symbol)
+                    fetch_from = pd.Timestamp(coverage[0]) if coverage[0] else None
+                    hist = self._download(symbol, fetch_from)
+                if not hist.empty:
+                    self._write(conn, symbol, hist, fetch_from, full)
+            return self._read(conn, symbol, start)
+
+    def get_many(self, symbols, period='1y'):
+        """
+        Get daily bars for several symbols using batched downloads for missing bars
+
+        Parameters:
+        symbols (list): Stock ticker symbols
+        period (str): Time period for historical data
+
+        Returns:
+        dict: Mapping of symbol to OHLCV DataFrame (symbols without data are omitted)
+        """
+        start = period_start(period)
+        symbols = list(dict.fromkeys(symbols))
+
+        with self._connect() as conn:
+            # Symbols without enough history share one full download; stale
+            # symbols share one top-up download from the oldest last-stored date
+            full_group, top_up_group, top_up_from = [], [], None
+            for symbol in symbols:
+                fetch_from, full = self._plan(conn, symbol, start)
+                if full:
+                    full_group.append(symbol)
+                elif fetch_from is not None:
+                    top_up_group.append(symbol)
+                    top_up_from = fetch_from if top_up_from is None else min(top_up_from, fetch_from)
+            stale = len(full_group) + len(top_up_group)
+            metrics.record_cache("history_store", hits=len(symbols) - stale, misses=stale)
+
+            if full_group:
+                frames = fetch_engine.download_history(
+                    full_group, period="max", start=start, auto_adjust=True, actions=True
+                )
+                for symbol, hist in frames.items():
+                    self._write(conn, symbol, hist, start, True)
+
+            if top_up_group:
+                frames = fetch_engine.download_history(
+                    top_up_group, start=top_up_from, auto_adjust=True, actions=True
+                )
+                for symbol, hist in frames.items():
+                    if self._adjustments_changed(hist, pd.Timestamp(self._last_date(conn, symbol))):
+                        # Earlier prices were re-adjusted, so replace the stored history
+                        coverage = self._coverage(conn, symbol)
+                        covered_from = pd.Timestamp(coverage[0]) if coverage[0] else None
+                        hist = self._download(symbol, covered_from)
+                        if not hist.empty:
+                            self._write(conn, symbol, hist, covered_from, True)
+                    else:
+                        self._write(conn, symbol, hist, None, False)
+
+            histories = {}
+            for symbol in symbols:
+                hist = self._read(conn, symbol, start)
+                if not hist.empty:
+                    histories[symbol] = hist
+            return histories
+
+    def _download(self, symbol, start):
+        if start is None:
+            return http_session.yf_ticker(symbol).history(period="max")
+        return http_session.yf_ticker(symbol).history(start=start.strftime('%Y-%m-%d'))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide history store, creating it on first use"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = HistoryStore()
+        return _default_store
@@ -0,0 +1,226 @@
+"""
+Shared, connection-pooled HTTP sessions for every Yahoo Finance call.
+
+One session per process is shared by all dashboard users. Requests go
+through a per-host concurrency limit and a token-bucket rate limiter, and
+429/5xx responses are retried with jittered exponential backoff (honouring
+Retry-After), so concurrent sessions don't multiply outbound connections or
+trip Yahoo's throttling.
+"""
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# Default request timeout in seconds
+DEFAULT_TIMEOUT = 10
+
+# Outbound limits shared by the whole process
+MAX_CONCURRENT_PER_HOST = 8
+RATE_PER_SECOND = 10
+BURST = 20
+
+# Retry policy for throttled or failed requests
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+USER_AGENT = 'Mozilla/5.0'
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Parameters:
+    rate (float): Tokens added per second
+    capacity (int): Maximum number of stored tokens (burst size)
+    """
+
+    def __init__(self, rate=RATE_PER_SECOND, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """
+    Caps the number of in-flight requests per host
+
+    Parameters:
+    max_concurrent (int): Maximum concurrent requests to one host
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_PER_HOST):
+        self.max_concurrent = max_concurrent
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            return self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_concurrent))
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Seconds to wait before a retry: Retry-After if given, otherwise full-jitter exponential backoff
+
+    Parameters:
+    attempt (int): Number of the retry (0 for the first retry)
+    retry_after (str): Value of the Retry-After response header
+
+    Returns:
+    float: Delay in seconds
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def endpoint_label(url):
+    """Host and the first three path segments of a URL, e.g. 'query1.finance.yahoo.com/v8/finance/chart'"""
+    parts = urlsplit(url)
+    return parts.netloc + "/".join(parts.path.split("/")[:4])
+
+
+def _response_size(response, streamed):
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit():
+        return int(length)
+    # A streamed body is left for the caller to read
+    return None if streamed else len(response.content)
+
+
+class _LimitedRequestMixin:
+    """Adds rate limiting, per-host concurrency limits and retries to a session's request()"""
+
+    retry_exceptions = (requests.ConnectionError, requests.Timeout)
+
+    def _init_limits(self, bucket, host_limiter, max_retries):
+        self._bucket = bucket
+        self._host_limiter = host_limiter
+        self._max_retries = max_retries
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            started = time.perf_counter()
+            try:
+                with self._host_limiter(url):
+                    response = super().request(method, url, *args, **kwargs)
+            except Exception as e:
+                metrics.record_upstream(endpoint_label(url), time.perf_counter() - started, None)
+                if not isinstance(e, self.retry_exceptions) or attempt >= self._max_retries:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            metrics.record_upstream(endpoint_label(url), time.perf_counter() - started, response.status_code,
+                                    _response_size(response, kwargs.get('stream', False)))
+            if response.status_code not in RETRY_STATUSES or attempt >= self._max_retries:
+                return response
+            time.sleep(backoff_delay(attempt, response.headers.get('Retry-After')))
+            attempt += 1
+
+
+class LimitedSession(_LimitedRequestMixin, requests.Session):
+    """
+    requests.Session with keep-alive pooling, rate limiting and retries
+
+    Parameters:
+    bucket (TokenBucket): Rate limiter shared with other sessions
+    host_limiter (HostLimiter): Per-host concurrency limiter shared with other sessions
+    max_retries (int): Retries for 429/5xx responses and connection errors
+    """
+
+    def __init__(self, bucket, host_limiter, max_retries=MAX_RETRIES):
+        super().__init__()
+        self._init_limits(bucket, host_limiter, max_retries)
+        self.headers['User-Agent'] = USER_AGENT
+
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=host_limiter.max_concurrent)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+
+_bucket = TokenBucket()
+_host_limiter = HostLimiter()
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide requests session used for direct HTTP calls"""
+    with _sessions_lock:
+        if 'requests' not in _sessions:
+            _sessions['requests'] = LimitedSession(_bucket, _host_limiter)
+        return _sessions['requests']
+
+
+def _make_yf_session():
+    # Recent yfinance releases only accept curl_cffi sessions; older ones take requests sessions
+    try:
+        from curl_cffi import requests as curl_requests
+    except ImportError:
+        return LimitedSession(_bucket, _host_limiter)
+
+    class LimitedCurlSession(_LimitedRequestMixin, curl_requests.Session):
+        retry_exceptions = (curl_requests.RequestsError,)
+
+        def __init__(self):
+            super().__init__(impersonate="chrome")
+            self._init_limits(_bucket, _host_limiter, MAX_RETRIES)
+
+    return LimitedCurlSession()
+
+
+def get_yf_session():
+    """Return the process-wide session passed to yfinance (shares limits with get_session())"""
+    with _sessions_lock:
+        if 'yfinance' not in _sessions:
+            _sessions['yfinance'] = _make_yf_session()
+        return _sessions['yfinance']
+
+
+def yf_ticker(symbol):
+    """
+    Create a yfinance Ticker that uses the shared session
+
+    Parameters:
+    symbol (str): Stock ticker symbol
+
+    Returns:
+    yfinance.Ticker: Ticker object
+    """
+    # Imported on first use to keep module import cheap
+    import yfinance as yf
+
+    return yf.Ticker(symbol, session=get_yf_session())
@@ -0,0 +1,327 @@
+"""
+Technical indicators computed vectorized over OHLCV frames.
+
+Provides EMA, SMA, RSI, MACD, Bollinger Bands, ATR and VWAP. The
+IndicatorEngine keeps the recursive state (EMA values, Wilder averages,
+cumulative VWAP sums) of its last computation so that when new bars are
+appended to a history only those bars are computed, instead of the whole
+series on every rerun.
+"""
+import numpy as np
+import pandas as pd
+
+# MACD_FAST and MACD_SLOW must be listed in EMA_SPANS
+EMA_SPANS = (12, 26, 50, 200)
+SMA_WINDOWS = (5, 20, 50)
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW, BB_STD = 20, 2
+
+# Bars of history needed before a new bar to compute the rolling indicators
+LOOKBACK = max(SMA_WINDOWS + (BB_WINDOW,)) - 1
+
+INDICATOR_COLUMNS = (
+    [f'EMA{span}' for span in EMA_SPANS]
+    + [f'MA{window}' for window in SMA_WINDOWS]
+    + [f'RSI{RSI_PERIOD}', 'MACD', 'MACD_Signal', 'MACD_Hist',
+       'BB_Middle', 'BB_Upper', 'BB_Lower', f'ATR{ATR_PERIOD}', 'VWAP']
+)
+
+# Recursive state carried between incremental updates
+_STATE_COLUMNS = ['_avg_gain', '_avg_loss', '_atr', '_cum_pv', '_cum_vol', '_session']
+
+
+def _ewm(values, alpha, seed=np.nan):
+    """Exponentially weighted mean (adjust=False), optionally continuing from a previous value"""
+    values = np.asarray(values, dtype=float)
+    if np.isnan(seed):
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)
+    seeded = np.concatenate(([seed], values))
+    return pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)[1:]
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+    return np.where(np.isnan(avg_gain) | np.isnan(avg_loss), np.nan, rsi)
+
+
+def _is_intraday(index):
+    """True if the bars have a time component (VWAP then resets every session)"""
+    return len(index) > 0 and bool((index != index.normalize()).any())
+
+
+def _session_keys(index, intraday):
+    if not intraday:
+        return np.zeros(len(index), dtype=np.int64)
+    # Small integers (one per local calendar day) survive the float round-trip of the state row
+    local = index.tz_localize(None) if index.tz is not None else index
+    return local.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def ema(close, span):
+    """
+    Exponential moving average
+
+    Parameters:
+    close (pandas.Series): Price series
+    span (int): EMA span
+
+    Returns:
+    pandas.Series: EMA values
+    """
+    return pd.Series(_ewm(close, 2 / (span + 1)), index=close.index)
+
+
+def sma(close, window):
+    """
+    Simple moving average
+
+    Parameters:
+    close (pandas.Series): Price series
+    window (int): Number of bars
+
+    Returns:
+    pandas.Series: SMA values
+    """
+    return close.rolling(window=window).mean()
+
+
+def _compute(hist, prev=None, lookback=None, offset=0, intraday=False):
+    """
+    Compute indicators for a block of bars
+
+    Parameters:
+    hist (pandas.DataFrame): Bars to compute
+    prev (pandas.Series): Indicator row of the bar just before ``hist`` (None for a fresh start)
+    lookback (pandas.DataFrame): Up to LOOKBACK bars preceding ``hist``
+    offset (int): Position of the first bar of ``hist`` in the whole history
+    intraday (bool): Reset VWAP at every session
+
+    Returns:
+    pandas.DataFrame: Indicator and state columns indexed like ``hist``
+    """
+    close = hist['Close'].to_numpy(dtype=float)
+    high = hist['High'].to_numpy(dtype=float)
+    low = hist['Low'].to_numpy(dtype=float)
+    volume = np.nan_to_num(hist['Volume'].to_numpy(dtype=float))
+    positions = offset + np.arange(len(hist))
+
+    def seed(column):
+        return prev[column] if prev is not None else np.nan
+
+    lookback_close = lookback['Close'].to_numpy(dtype=float) if lookback is not None else np.array([])
+    prev_close = lookback_close[-1] if len(lookback_close) else np.nan
+    out = {}
+
+    # Exponential averages and MACD
+    for span in EMA_SPANS:
+        out[f'EMA{span}'] = _ewm(close, 2 / (span + 1), seed(f'EMA{span}'))
+    out['MACD'] = out[f'EMA{MACD_FAST}'] - out[f'EMA{MACD_SLOW}']
+    out['MACD_Signal'] = _ewm(out['MACD'], 2 / (MACD_SIGNAL + 1), seed('MACD_Signal'))
+    out['MACD_Hist'] = out['MACD'] - out['MACD_Signal']
+
+    # Wilder's RSI
+    delta = np.diff(np.concatenate(([prev_close], close)))
+    out['_avg_gain'] = _ewm(np.clip(delta, 0, None), 1 / RSI_PERIOD, seed('_avg_gain'))
+    out['_avg_loss'] = _ewm(np.clip(-delta, 0, None), 1 / RSI_PERIOD, seed('_avg_loss'))
+    rsi = _rsi_from_averages(out['_avg_gain'], out['_avg_loss'])
+    out[f'RSI{RSI_PERIOD}'] = np.where(positions < RSI_PERIOD, np.nan, rsi)
+
+    # Wilder's ATR
+    previous_closes = np.concatenate(([prev_close], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_closes), np.abs(low - previous_closes)))
+    out['_atr'] = _ewm(true_range, 1 / ATR_PERIOD, seed('_atr'))
+    out[f'ATR{ATR_PERIOD}'] = np.where(positions < ATR_PERIOD - 1, np.nan, out['_atr'])
+
+    # Rolling windows only need the last LOOKBACK bars before this block
+    window_close = pd.Series(np.concatenate((lookback_close, close)))
+    skip = len(lookback_close)
+    for window in SMA_WINDOWS:
+        out[f'MA{window}'] = window_close.rolling(window=window).mean().to_numpy()[skip:]
+    rolling = window_close.rolling(window=BB_WINDOW)
+    middle = rolling.mean().to_numpy()[skip:]
+    std = rolling.std(ddof=0).to_numpy()[skip:]
+    out['BB_Middle'] = middle
+    out['BB_Upper'] = middle + BB_STD * std
+    out['BB_Lower'] = middle - BB_STD * std
+
+    # VWAP, cumulative within each session (or over the whole history for daily bars)
+    sessions = _session_keys(hist.index, intraday)
+    price_volume = (high + low + close) / 3 * volume
+    cum_pv = pd.Series(price_volume).groupby(sessions).cumsum().to_numpy()
+    cum_vol = pd.Series(volume).groupby(sessions).cumsum().to_numpy()
+    if prev is not None:
+        continues = sessions == prev['_session']
+        cum_pv = cum_pv + np.where(continues, prev['_cum_pv'], 0)
+        cum_vol = cum_vol + np.where(continues, prev['_cum_vol'], 0)
+    out['_cum_pv'], out['_cum_vol'], out['_session'] = cum_pv, cum_vol, sessions
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out['VWAP'] = np.where(cum_vol > 0, cum_pv / cum_vol, np.nan)
+
+    return pd.DataFrame(out, index=hist.index)[INDICATOR_COLUMNS + _STATE_COLUMNS]
+
+
+def compute_indicators(hist):
+    """
+    Compute every indicator over a full OHLCV history
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV history
+
+    Returns:
+    pandas.DataFrame: Indicator columns (see INDICATOR_COLUMNS) indexed like ``hist``
+    """
+    return _compute(hist, intraday=_is_intraday(hist.index))[INDICATOR_COLUMNS]
+
+
+def rsi(close, period=RSI_PERIOD):
+    """
+    Wilder's Relative Strength Index
+
+    Parameters:
+    close (pandas.Series): Price series
+    period (int): Smoothing period
+
+    Returns:
+    pandas.Series: RSI values (0-100)
+    """
+    delta = close.diff().to_numpy()
+    avg_gain = _ewm(np.clip(delta, 0, None), 1 / period)
+    avg_loss = _ewm(np.clip(-delta, 0, None), 1 / period)
+    values = _rsi_from_averages(avg_gain, avg_loss)
+    values[:period] = np.nan
+    return pd.Series(values, index=close.index)
+
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    """
+    Moving Average Convergence Divergence
+
+    Parameters:
+    close (pandas.Series): Price series
+    fast (int): Fast EMA span
+    slow (int): Slow EMA span
+    signal (int): Signal line span
+
+    Returns:
+    pandas.DataFrame: MACD, MACD_Signal and MACD_Hist columns
+    """
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return pd.DataFrame({'MACD': line, 'MACD_Signal': signal_line, 'MACD_Hist': line - signal_line})
+
+
+def bollinger_bands(close, window=BB_WINDOW, num_std=BB_STD):
+    """
+    Bollinger Bands
+
+    Parameters:
+    close (pandas.Series): Price series
+    window (int): Moving average window
+    num_std (float): Band width in standard deviations
+
+    Returns:
+    pandas.DataFrame: BB_Middle, BB_Upper and BB_Lower columns
+    """
+    rolling = close.rolling(window=window)
+    middle = rolling.mean()
+    std = rolling.std(ddof=0)
+    return pd.DataFrame({'BB_Middle': middle, 'BB_Upper': middle + num_std * std, 'BB_Lower': middle - num_std * std})
+
+
+def atr(hist, period=ATR_PERIOD):
+    """
+    Wilder's Average True Range
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV history
+    period (int): Smoothing period
+
+    Returns:
+    pandas.Series: ATR values
+    """
+    high, low = hist['High'].to_numpy(dtype=float), hist['Low'].to_numpy(dtype=float)
+    previous_close = hist['Close'].shift().to_numpy(dtype=float)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    values = _ewm(true_range, 1 / period)
+    values[:period - 1] = np.nan
+    return pd.Series(values, index=hist.index)
+
+
+def vwap(hist):
+    """
+    Volume-weighted average price, reset every session for intraday bars
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV history
+
+    Returns:
+    pandas.Series: VWAP values
+    """
+    sessions = _session_keys(hist.index, _is_intraday(hist.index))
+    volume = hist['Volume'].fillna(0)
+    price_volume = (hist['High'] + hist['Low'] + hist['Close']) / 3 * volume
+    cum_vol = volume.groupby(sessions).cumsum()
+    return price_volume.groupby(sessions).cumsum() / cum_vol.where(cum_vol > 0)
+
+
+class IndicatorEngine:
+    """
+    Keeps indicator results for one history and updates them incrementally
+
+    Call update() with the latest history on every rerun. If the new history
+    extends the previous one, only the last previously seen bar (which may
+    have been a partial session) and the appended bars are computed.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._close = None
+        self._frame = None
+        self._intraday = False
+
+    def _resume_position(self, hist):
+        """Position from which to recompute, or None if a full computation is needed"""
+        if self._frame is None:
+            return None
+        n = len(self._frame)
+        if n < 2 or len(hist) < n:
+            return None
+        if not hist.index[:n - 1].equals(self._index[:n - 1]):
+            return None
+        # A changed close before the resume point means prices were re-adjusted
+        if not np.array_equal(hist['Close'].to_numpy(dtype=float)[n - 2:n - 1], self._close[n - 2:n - 1], equal_nan=True):
+            return None
+        return n - 1
+
+    def update(self, hist):
+        """
+        Compute indicators for a history, reusing the previous results where possible
+
+        Parameters:
+        hist (pandas.DataFrame): OHLCV history
+
+        Returns:
+        pandas.DataFrame: Indicator columns (see INDICATOR_COLUMNS) indexed like ``hist``
+        """
+        position = self._resume_position(hist)
+        if position is None:
+            self._intraday = _is_intraday(hist.index)
+            frame = _compute(hist, intraday=self._intraday)
+        else:
+            block = _compute(
+                hist.iloc[position:],
+                prev=self._frame.iloc[position - 1],
+                lookback=hist.iloc[max(0, position - LOOKBACK):position],
+                offset=position,
+                intraday=self._intraday,
+            )
+            frame = pd.concat([self._frame.iloc[:position], block])
+
+        self._index = hist.index
+        self._close = hist['Close'].to_numpy(dtype=float)
+        self._frame = frame
+        return frame[INDICATOR_COLUMNS]
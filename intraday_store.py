@@ -0,0 +1,385 @@
+"""
+Tiered store for intraday (1m/5m/15m) bars.
+
+Today's bars are kept in memory, in a fixed-size ring buffer per symbol and
+interval that is topped up from Yahoo at most once per bar. Completed
+sessions live on disk in a SQLite database next to the daily history store,
+so earlier days are downloaded once and then served locally. When a new
+session starts, yesterday's ring is moved to disk if it holds the whole
+session and is dropped otherwise (the next top-up downloads it complete).
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import history_store
+import http_session
+import quote_cache
+
+DEFAULT_DB_PATH = os.path.join(history_store.CACHE_DIR, "intraday.sqlite")
+
+# Supported bar intervals and their pandas frequency
+INTERVALS = {'1m': '1min', '5m': '5min', '15m': '15min'}
+
+# Calendar days back that Yahoo Finance serves for each interval
+MAX_LOOKBACK_DAYS = {'1m': 7, '5m': 59, '15m': 59}
+
+# Offsets used to slice periods out of the stored bars ("1d" falls back to the
+# last completed session before the open, at weekends and on holidays)
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=0),
+    "5d": pd.offsets.BDay(4),
+    "1mo": pd.DateOffset(months=1),
+}
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Minutes in the regular NSE/BSE session, which sizes the ring buffers
+SESSION_MINUTES = (
+    (quote_cache.MARKET_CLOSE.hour * 60 + quote_cache.MARKET_CLOSE.minute)
+    - (quote_cache.MARKET_OPEN.hour * 60 + quote_cache.MARKET_OPEN.minute)
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (symbol, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start TEXT NOT NULL,
+    complete_through TEXT NOT NULL,
+    timezone TEXT,
+    PRIMARY KEY (symbol, interval)
+);
+"""
+
+
+def bar_seconds(interval):
+    """Return the length of one bar of an interval in seconds"""
+    return int(pd.Timedelta(INTERVALS[interval]).total_seconds())
+
+
+def supported_periods(interval):
+    """
+    List the periods that fit in Yahoo's lookback limit for an interval
+
+    Parameters:
+    interval (str): Key of INTERVALS
+
+    Returns:
+    list: Keys of PERIOD_OFFSETS
+    """
+    reference = pd.Timestamp("2024-01-31")
+    return [period for period, offset in PERIOD_OFFSETS.items()
+            if (reference - (reference - offset)).days <= MAX_LOOKBACK_DAYS[interval]]
+
+
+def period_start(period, interval, today):
+    """
+    First session date covered by a period, limited to what Yahoo serves
+
+    Parameters:
+    period (str): Key of PERIOD_OFFSETS
+    interval (str): Key of INTERVALS
+    today (pandas.Timestamp): Midnight of the current session date
+
+    Returns:
+    pandas.Timestamp: Midnight of the first session date
+    """
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported intraday period: {period}")
+    start = today - PERIOD_OFFSETS[period]
+    return max(start, today - pd.Timedelta(days=MAX_LOOKBACK_DAYS[interval]))
+
+
+def last_session(hist):
+    """
+    Keep only the bars of the latest session date in a frame
+
+    Parameters:
+    hist (pandas.DataFrame): OHLCV bars indexed by Datetime
+
+    Returns:
+    pandas.DataFrame: Bars of the last session (the frame itself if it is empty)
+    """
+    if hist.empty:
+        return hist
+    days = hist.index.normalize()
+    return hist[days == days[-1]]
+
+
+class BarRing:
+    """
+    Fixed-capacity ring buffer of OHLCV bars in time order
+
+    Once full, appending a bar overwrites the oldest one, so memory stays
+    bounded however often the buffer is topped up.
+
+    Parameters:
+    capacity (int): Maximum number of bars kept
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._times = np.zeros(capacity, dtype=np.int64)
+        self._values = np.zeros((capacity, len(BAR_COLUMNS)))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _order(self):
+        return (self._start + np.arange(self._size)) % self.capacity
+
+    def last_time(self):
+        """Return the time of the newest bar in nanoseconds since the epoch, or None"""
+        if not self._size:
+            return None
+        return int(self._times[(self._start + self._size - 1) % self.capacity])
+
+    def extend(self, hist):
+        """
+        Append bars newer than the newest stored one (which is replaced, as it may have been partial)
+
+        Parameters:
+        hist (pandas.DataFrame): OHLCV bars with a tz-aware DatetimeIndex
+        """
+        times = hist.index.as_unit('ns').asi8
+        values = hist.reindex(columns=BAR_COLUMNS).to_numpy(dtype=float)
+
+        last = self.last_time()
+        if last is not None:
+            keep = times >= last
+            times, values = times[keep], values[keep]
+            if len(times) and times[0] == last:
+                self._size -= 1
+        if not len(times):
+            return
+
+        times, values = times[-self.capacity:], values[-self.capacity:]
+        positions = (self._start + self._size + np.arange(len(times))) % self.capacity
+        self._times[positions] = times
+        self._values[positions] = values
+
+        overflow = max(0, self._size + len(times) - self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+        self._size = min(self._size + len(times), self.capacity)
+
+    def to_frame(self, tz):
+        """
+        Return the stored bars as an OHLCV DataFrame
+
+        Parameters:
+        tz (str): Timezone for the index
+
+        Returns:
+        pandas.DataFrame: Bars indexed by Datetime
+        """
+        order = self._order()
+        index = pd.DatetimeIndex(pd.to_datetime(self._times[order], utc=True), name='Datetime').tz_convert(tz)
+        frame = pd.DataFrame(self._values[order], index=index, columns=BAR_COLUMNS)
+        frame['Volume'] = frame['Volume'].fillna(0).astype('int64')
+        return frame
+
+
+class IntradayStore:
+    """
+    Intraday bars served from an in-memory ring (today) and SQLite (completed sessions)
+
+    Parameters:
+    path (str): Database file (defaults to DEFAULT_DB_PATH)
+    timezone (str): Exchange timezone that defines the session date
+    clock (callable): Function returning the current time as a Unix timestamp
+    """
+
+    def __init__(self, path=None, timezone=str(quote_cache.IST), clock=time.time):
+        self.path = path or DEFAULT_DB_PATH
+        self.timezone = timezone
+        self._clock = clock
+        self._rings = {}    # (symbol, interval) -> [session date, BarRing, fetched_at]
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _now(self):
+        return pd.Timestamp(self._clock(), unit='s', tz='UTC').tz_convert(self.timezone)
+
+    def _session_close(self, day):
+        close = quote_cache.MARKET_CLOSE
+        return day + pd.Timedelta(hours=close.hour, minutes=close.minute)
+
+    def _coverage(self, conn, symbol, interval):
+        return conn.execute(
+            "SELECT start, complete_through, timezone FROM coverage WHERE symbol = ? AND interval = ?",
+            (symbol, interval)
+        ).fetchone()
+
+    def _write(self, conn, symbol, interval, hist, start, complete_through, replace):
+        """Store bars of completed sessions and record the dates they cover"""
+        if replace:
+            conn.execute("DELETE FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval))
+        hist = hist.reindex(columns=BAR_COLUMNS)
+        rows = zip(
+            [symbol] * len(hist),
+            [interval] * len(hist),
+            (hist.index.as_unit('ns').asi8 // 10**9).tolist(),
+            *(hist[column].astype(float) for column in BAR_COLUMNS)
+        )
+        conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?)",
+            (symbol, interval, start.strftime('%Y-%m-%d'), complete_through.strftime('%Y-%m-%d'),
+             str(hist.index.tz) if hist.index.tz is not None else self.timezone)
+        )
+
+    def _read(self, conn, symbol, interval, start, end):
+        rows = conn.execute(
+            "SELECT ts, open, high, low, close, volume FROM bars "
+            "WHERE symbol = ? AND interval = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (symbol, interval, int(start.timestamp()), int(end.timestamp()))
+        ).fetchall()
+        coverage = self._coverage(conn, symbol, interval)
+        tz = coverage[2] if coverage and coverage[2] else self.timezone
+
+        hist = pd.DataFrame(rows, columns=['Datetime'] + BAR_COLUMNS)
+        hist['Datetime'] = pd.to_datetime(hist['Datetime'], unit='s', utc=True).dt.tz_convert(tz)
+        hist = hist.set_index('Datetime')
+        hist['Volume'] = hist['Volume'].fillna(0).astype('int64')
+        return hist
+
+    def _ring(self, symbol, interval, today):
+        """Return the ring entry for today's session, new if there is none"""
+        entry = self._rings.get((symbol, interval))
+        if entry is None or entry[0] != today:
+            capacity = math.ceil(SESSION_MINUTES * 60 / bar_seconds(interval)) + 1
+            entry = [today, BarRing(capacity), None]
+            self._rings[(symbol, interval)] = entry
+        return entry
+
+    def _roll(self, conn, symbol, interval, today):
+        """Move a previous session's ring to disk if it was fetched after that session closed"""
+        entry = self._rings.get((symbol, interval))
+        if entry is None or entry[0] == today:
+            return
+        day, ring, fetched_at = entry
+        coverage = self._coverage(conn, symbol, interval)
+        fetched_after_close = fetched_at is not None and fetched_at >= self._session_close(day)
+        if coverage and len(ring) and fetched_after_close and pd.Timestamp(coverage[1]) == day.tz_localize(None) - pd.Timedelta(days=1):
+            self._write(conn, symbol, interval, ring.to_frame(self.timezone),
+                        pd.Timestamp(coverage[0]), day.tz_localize(None), False)
+        del self._rings[(symbol, interval)]
+
+    def _download(self, symbol, interval, start):
+        hist = http_session.yf_ticker(symbol).history(interval=interval, start=start)
+        if hist.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], tz=self.timezone))
+        if hist.index.tz is None:
+            hist.index = hist.index.tz_localize(self.timezone)
+        return hist.reindex(columns=BAR_COLUMNS).dropna(subset=['Close'])
+
+    def get_history(self, symbol, interval='5m', period='1d'):
+        """
+        Get intraday bars for a symbol, downloading only what is missing
+
+        Parameters:
+        symbol (str): Stock ticker symbol
+        interval (str): Key of INTERVALS
+        period (str): Key of PERIOD_OFFSETS
+
+        Returns:
+        pandas.DataFrame: OHLCV bars indexed by Datetime (empty if the symbol has no data)
+        """
+        now = self._now()
+        today = now.normalize()
+        start = period_start(period, interval, today)
+        yesterday = (today - pd.Timedelta(days=1)).tz_localize(None)
+
+        with self._lock((symbol, interval)), self._connect() as conn:
+            self._roll(conn, symbol, interval, today)
+            entry = self._ring(symbol, interval, today)
+            ring = entry[1]
+
+            # Completed sessions missing on disk share one download with today's bars
+            fetch_from, replace = None, False
+            coverage = self._coverage(conn, symbol, interval)
+            if start < today:
+                if coverage is None or start.tz_localize(None) < pd.Timestamp(coverage[0]):
+                    fetch_from, replace = start, True
+                elif pd.Timestamp(coverage[1]) < yesterday:
+                    fetch_from = pd.Timestamp(coverage[1]).tz_localize(self.timezone) + pd.Timedelta(days=1)
+
+            fetched_at = entry[2]
+            ring_stale = fetched_at is None or (
+                (now - fetched_at).total_seconds() >= bar_seconds(interval)
+                and fetched_at < self._session_close(today)
+            )
+
+            if fetch_from is not None:
+                hist = self._download(symbol, interval, fetch_from.strftime('%Y-%m-%d'))
+                if hist.empty:
+                    # Nothing to record yet; try again after the next bar
+                    entry[2] = now
+                    return ring.to_frame(self.timezone)
+                covered_from = start if replace else pd.Timestamp(coverage[0]).tz_localize(self.timezone)
+                self._write(conn, symbol, interval, hist[hist.index < today],
+                            covered_from.tz_localize(None), yesterday, replace)
+                ring.extend(hist[hist.index >= today])
+                entry[2] = now
+            elif ring_stale:
+                last = ring.last_time()
+                since = pd.Timestamp(last, tz='UTC').tz_convert(self.timezone) if last is not None else today
+                ring.extend(self._download(symbol, interval, since))
+                entry[2] = now
+
+            completed = self._read(conn, symbol, interval, start, today) if start < today else None
+            # Read the ring under the lock so a concurrent top-up cannot tear it
+            today_bars = ring.to_frame(self.timezone)
+
+        if period == '1d' and today_bars.empty:
+            # No bars yet today: show the last completed session from disk instead
+            return last_session(self.get_history(symbol, interval, '5d'))
+        if completed is None or completed.empty:
+            return today_bars
+        return pd.concat([completed, today_bars.tz_convert(completed.index.tz)])
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide intraday store, creating it on first use"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = IntradayStore()
+        return _default_store
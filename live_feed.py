@@ -0,0 +1,326 @@
+"""
+Live quote feeds that deliver price changes as a stream of ticks.
+
+A feed keeps one shared, append-only log of ticks. Each reader holds a cursor
+and asks for ``updates(cursor)``, getting back only the ticks it has not seen,
+so the dashboard can append them to what it already shows instead of
+re-fetching history.
+
+``PollingFeed`` polls Yahoo quotes for the subscribed symbols at most once per
+interval, no matter how many sessions are reading, and only logs a tick when a
+price changes. It only polls while the market is open, so no ticks (and no
+bars built from them) are dated outside a session. A symbol stays subscribed
+while some reader keeps asking for it and is dropped SUBSCRIPTION_TTL seconds
+after the last request. ``ReplayFeed`` plays back recorded ticks (a CSV or a
+history frame) against the clock, so streaming can be exercised without a
+network.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import fetch_engine
+import quote_cache
+
+# Seconds between upstream polls
+POLL_INTERVAL = 5
+
+# Ticks kept in memory per feed; older ones are discarded
+MAX_TICKS = 20000
+
+# Seconds a symbol keeps being polled after the last subscribe call for it
+SUBSCRIPTION_TTL = 60
+
+TICK_COLUMNS = ['symbol', 'time', 'price', 'prev_close']
+
+Tick = namedtuple('Tick', TICK_COLUMNS)
+
+
+class Feed(ABC):
+    """
+    Base class holding the shared tick log
+
+    Subclasses implement ``_poll(now, symbols)`` returning new ticks. Only one
+    poll runs at a time and it runs without the lock held, so readers never
+    wait for the upstream fetch: they get the ticks logged so far.
+
+    Parameters:
+    interval (float): Minimum seconds between polls
+    clock (callable): Time source in seconds
+    """
+
+    def __init__(self, interval=POLL_INTERVAL, clock=time.time):
+        self.interval = interval
+        self._clock = clock
+        self._ticks = []
+        self._offset = 0          # cursor value of self._ticks[0]
+        self._last_poll = None
+        self._polling = False
+        self._symbols = {}        # symbol -> time of the last subscribe call
+        self._lock = threading.Lock()
+
+    def subscribe(self, symbols):
+        """
+        Add symbols to the set being streamed, or keep them in it
+
+        Readers call this each time they read; symbols nobody has asked for in
+        SUBSCRIPTION_TTL seconds stop being polled.
+
+        Parameters:
+        symbols (list): Stock symbols
+        """
+        now = self._clock()
+        with self._lock:
+            self._symbols.update(dict.fromkeys(symbols, now))
+
+    def unsubscribe(self, symbols):
+        """
+        Stop streaming symbols
+
+        Parameters:
+        symbols (list): Stock symbols
+        """
+        with self._lock:
+            for symbol in symbols:
+                self._symbols.pop(symbol, None)
+
+    @property
+    def symbols(self):
+        """Symbols currently being streamed"""
+        with self._lock:
+            return sorted(self._symbols)
+
+    def _expire(self, now):
+        """Drop symbols nobody has subscribed to recently (call with the lock held)"""
+        for symbol, subscribed in list(self._symbols.items()):
+            if now - subscribed > SUBSCRIPTION_TTL:
+                del self._symbols[symbol]
+
+    @abstractmethod
+    def _poll(self, now, symbols):
+        """Return the ticks that are new at time now for the subscribed symbols"""
+
+    def _append(self, ticks):
+        self._ticks.extend(ticks)
+        overflow = len(self._ticks) - MAX_TICKS
+        if overflow > 0:
+            del self._ticks[:overflow]
+            self._offset += overflow
+
+    def updates(self, cursor=0, symbols=None):
+        """
+        Poll if the interval has passed, then return ticks after the cursor
+
+        Parameters:
+        cursor (int): Position returned by the previous call (0 for everything retained)
+        symbols (list): Only return ticks for these symbols (all if None)
+
+        Returns:
+        tuple: (list of Tick, new cursor)
+        """
+        now = self._clock()
+        with self._lock:
+            due = not self._polling and (self._last_poll is None or now - self._last_poll >= self.interval)
+            if due:
+                self._polling = True
+                self._last_poll = now
+                self._expire(now)
+                subscribed = sorted(self._symbols)
+
+        if due:
+            # The upstream fetch runs unlocked; concurrent readers skip polling meanwhile
+            polled = []
+            try:
+                polled = self._poll(now, subscribed)
+            finally:
+                with self._lock:
+                    self._append(polled)
+                    self._polling = False
+
+        with self._lock:
+            start = max(cursor - self._offset, 0)
+            ticks = self._ticks[start:]
+            new_cursor = self._offset + len(self._ticks)
+
+        if symbols is not None:
+            wanted = set(symbols)
+            ticks = [tick for tick in ticks if tick.symbol in wanted]
+        return ticks, new_cursor
+
+
+class PollingFeed(Feed):
+    """
+    Feed that polls current Yahoo quotes and logs a tick whenever a price changes
+
+    Outside market hours nothing is polled: quotes do not move then, and a
+    tick would start a bar for a day with no session.
+
+    Parameters:
+    fetch (callable): Function taking a list of symbols and returning
+                      ({symbol: (price, prev_close)}, errors)
+    interval (float): Minimum seconds between polls
+    clock (callable): Time source in seconds
+    """
+
+    def __init__(self, fetch=fetch_engine.fetch_quotes, interval=POLL_INTERVAL, clock=time.time):
+        super().__init__(interval=interval, clock=clock)
+        self._fetch = fetch
+        self._last_price = {}
+
+    def _poll(self, now, symbols):
+        # Forget prices of dropped symbols so a new subscription starts with a fresh tick
+        for symbol in set(self._last_price) - set(symbols):
+            del self._last_price[symbol]
+        if not symbols or not quote_cache.is_market_open(datetime.fromtimestamp(now, quote_cache.IST)):
+            return []
+
+        quotes, _ = self._fetch(symbols)
+        timestamp = pd.Timestamp(now, unit='s', tz='UTC')
+        ticks = []
+        for symbol, (price, prev_close) in quotes.items():
+            if price is None or self._last_price.get(symbol) == price:
+                continue
+            self._last_price[symbol] = price
+            ticks.append(Tick(symbol, timestamp, price, prev_close))
+        return ticks
+
+
+class ReplayFeed(Feed):
+    """
+    Feed that replays recorded ticks, advancing through them in real time
+
+    Parameters:
+    ticks (pandas.DataFrame): Columns symbol, time, price and optionally prev_close
+    speed (float): Replay speed; 60 plays one recorded minute per second
+    loop (bool): Start again from the beginning when the recording ends
+    interval (float): Minimum seconds between polls
+    clock (callable): Time source in seconds
+    """
+
+    def __init__(self, ticks, speed=1.0, loop=False, interval=0, clock=time.time):
+        super().__init__(interval=interval, clock=clock)
+        ticks = ticks.copy()
+        ticks['time'] = pd.to_datetime(ticks['time'], utc=True, format='ISO8601')
+        if 'prev_close' not in ticks:
+            ticks['prev_close'] = ticks.groupby('symbol')['price'].transform('first')
+        self._recorded = ticks[TICK_COLUMNS].sort_values('time', kind='stable').reset_index(drop=True)
+        self._elapsed = (self._recorded['time'] - self._recorded['time'].iloc[0]).dt.total_seconds().to_numpy()
+        self.speed = speed
+        self.loop = loop
+        self._started = None
+        self._position = 0
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        """Create a replay feed from a CSV file with symbol, time and price columns"""
+        return cls(pd.read_csv(path), **kwargs)
+
+    @classmethod
+    def from_history(cls, hist, symbol, **kwargs):
+        """Create a replay feed that plays back the closes of a history frame as ticks"""
+        ticks = pd.DataFrame({'symbol': symbol, 'time': hist.index, 'price': hist['Close'].to_numpy()})
+        ticks['prev_close'] = ticks['price'].shift(1).fillna(ticks['price'])
+        return cls(ticks, **kwargs)
+
+    def _poll(self, now, symbols):
+        if self._started is None:
+            self._started = now
+
+        # Recorded seconds that have been played so far
+        played = (now - self._started) * self.speed
+        if self.loop and self._position == len(self._recorded) and played > self._elapsed[-1]:
+            self._position = 0
+            self._started = now
+            played = 0
+
+        end = int(self._elapsed.searchsorted(played, side='right'))
+        if end <= self._position:
+            return []
+
+        batch = self._recorded.iloc[self._position:end]
+        self._position = end
+        if symbols:
+            batch = batch[batch['symbol'].isin(symbols)]
+        # Replayed ticks are stamped with the time they were played, like live ones
+        timestamp = pd.Timestamp(now, unit='s', tz='UTC')
+        return [Tick(symbol, timestamp, price, prev_close)
+                for symbol, price, prev_close in zip(batch['symbol'], batch['price'], batch['prev_close'])]
+
+
+def ticks_to_frame(ticks):
+    """
+    Convert ticks to a DataFrame indexed by time
+
+    Parameters:
+    ticks (list): Tick tuples
+
+    Returns:
+    pandas.DataFrame: Columns symbol, price and prev_close
+    """
+    frame = pd.DataFrame(ticks, columns=TICK_COLUMNS)
+    return frame.set_index('time')
+
+
+def apply_ticks(quotes, ticks):
+    """
+    Update a watchlist quote snapshot with the latest tick for each symbol
+
+    Parameters:
+    quotes (pandas.DataFrame): Quote snapshot with symbol, price, change and pct_change columns
+    ticks (list): Tick tuples, oldest first
+
+    Returns:
+    pandas.DataFrame: A new snapshot; symbols without ticks keep their values
+    """
+    latest = {tick.symbol: tick for tick in ticks}
+    if not latest or quotes.empty:
+        return quotes
+    price = quotes['symbol'].map({symbol: tick.price for symbol, tick in latest.items()})
+    prev_close = quotes['symbol'].map({symbol: tick.prev_close for symbol, tick in latest.items() if tick.prev_close})
+    price = price.fillna(quotes['price'])
+    change = (price - prev_close).where(prev_close.notna(), quotes['change'])
+    pct_change = (change / prev_close * 100).where(prev_close.notna(), quotes['pct_change'])
+    return quotes.assign(price=price, change=change, pct_change=pct_change)
+
+
+def merge_ticks(hist, ticks, freq=None):
+    """
+    Fold ticks into daily or intraday OHLCV bars
+
+    Ticks in a bar period that already has a bar extend its high/low and set
+    its close; ticks in a new period start a new bar. Volume is left unchanged
+    (ticks carry none).
+
+    Parameters:
+    hist (pandas.DataFrame): Bars indexed by their start time
+    ticks (list): Tick tuples for the symbol in hist
+    freq (str): Bar length as a pandas frequency such as "5min" (None for daily bars)
+
+    Returns:
+    pandas.DataFrame: New frame with the ticks applied
+    """
+    if not ticks:
+        return hist
+
+    prices = ticks_to_frame(ticks)['price']
+    tz = hist.index.tz
+    times = prices.index.tz_convert(tz) if tz is not None else prices.index.tz_convert(None)
+    bars = prices.groupby(times.floor(freq) if freq else times.normalize()).agg(['first', 'max', 'min', 'last'])
+    bars.columns = ['Open', 'High', 'Low', 'Close']
+
+    merged = hist.reindex(hist.index.union(bars.index))
+    merged.index.name = hist.index.name
+    merged.loc[bars.index, 'High'] = np.fmax(bars['High'], merged.loc[bars.index, 'High'])
+    merged.loc[bars.index, 'Low'] = np.fmin(bars['Low'], merged.loc[bars.index, 'Low'])
+    merged.loc[bars.index, 'Close'] = bars['Close']
+    new_bars = merged['Open'].isna()
+    merged.loc[new_bars, 'Open'] = bars['Open']
+    merged = merged.fillna({column: 0 for column in merged.columns if column not in bars.columns})
+    if 'Volume' in merged:
+        merged['Volume'] = merged['Volume'].astype(hist['Volume'].dtype)
+    return merged
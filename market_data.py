@@ -0,0 +1,406 @@
+"""
+Headless market data access for the dashboard, batch jobs and the CLI.
+
+Nothing here depends on Streamlit. The app wraps these functions with
+``st.cache_data``; scripts can import and call them directly. Importing this
+module loads pandas, numpy, requests and the data-layer modules (stores,
+caches, screener, news, breadth, metrics); only yfinance is deferred until
+the first Yahoo call, and plotly is never imported here.
+"""
+import logging
+
+import pandas as pd
+
+import breadth
+import fetch_engine
+import history_store
+import http_session
+import intraday_store
+import metrics
+import news
+import quote_cache
+import screener
+
+logger = logging.getLogger(__name__)
+
+# Indices shown in the Market Overview strip as (label, Yahoo symbol).
+# Add entries here (e.g. ("FIN NIFTY", "NIFTY_FIN_SERVICE.NS") or
+# ("NIFTY MIDCAP 50", "^NSEMDCP50")) - they are all fetched concurrently.
+MARKET_INDICES = [
+    ("NIFTY 50", "^NSEI"),
+    ("SENSEX", "^BSESN"),
+    ("NIFTY BANK", "^NSEBANK"),
+    ("NIFTY IT", "NIFTYIT.NS"),
+]
+
+# Seconds a penny-stock screen stays valid (it is built from daily closes)
+PENNY_MARKET_HOURS_TTL = 900
+PENNY_OFF_HOURS_TTL = 86400
+
+
+def _penny_ttl():
+    if quote_cache.is_market_open():
+        return PENNY_MARKET_HOURS_TTL
+    return PENNY_OFF_HOURS_TTL
+
+
+def _index_cache():
+    return quote_cache.get_quote_cache("indices")
+
+
+def _watchlist_cache():
+    return quote_cache.get_quote_cache("quotes")
+
+
+def _screen_cache():
+    return quote_cache.get_quote_cache("screens", ttl=_penny_ttl)
+
+
+def _index_change(price, prev_close):
+    """Return (current, change, pct_change) for an index quote"""
+    change = price - prev_close
+    pct_change = (change / prev_close) * 100 if prev_close else 0
+    return price, change, pct_change
+
+
+# Function to get current index data
+@metrics.instrument("get_index_data")
+def get_index_data(ticker):
+    """
+    Get the current value of one index
+
+    Parameters:
+    ticker (str): Index symbol
+
+    Returns:
+    tuple: (current, change, pct_change), zeros if the index could not be fetched
+    """
+    try:
+        price, prev_close = fetch_engine.fetch_quotes([ticker])[0][ticker]
+        return _index_change(price or 0, prev_close or 0)
+    except Exception:
+        metrics.record_error("get_index_data")
+        return 0, 0, 0
+
+
+def _load_index_quotes(tickers):
+    return fetch_engine.fetch_quotes(tickers)[0]
+
+
+# Function to get a snapshot of several indices at once
+@metrics.instrument("get_index_snapshot")
+def get_index_snapshot(tickers):
+    """
+    Get current values for several indices concurrently
+
+    Quotes come from a process-wide cache that the background prefetcher keeps warm.
+
+    Parameters:
+    tickers (tuple): Index symbols
+
+    Returns:
+    dict: Mapping of symbol to (current, change, pct_change); failed symbols map to zeros
+    """
+    quotes = _index_cache().get_many(tickers, _load_index_quotes)
+    snapshot = {}
+    for ticker in tickers:
+        price, prev_close = quotes.get(ticker, (0, 0))
+        snapshot[ticker] = _index_change(price or 0, prev_close or 0)
+    return snapshot
+
+
+def refresh_indices(tickers):
+    """
+    Fetch index quotes and store them in the shared cache
+
+    Parameters:
+    tickers (list): Index symbols
+
+    Returns:
+    int: Number of indices refreshed
+    """
+    quotes = _load_index_quotes(tickers)
+    _index_cache().put_many(quotes)
+    return len(quotes)
+
+
+# Function to get stock data
+@metrics.instrument("load_stock_data")
+def load_stock_data(ticker, period='1y', interval='1d'):
+    """
+    Load stock data for the given ticker symbol
+
+    Parameters:
+    ticker (str): Stock ticker symbol
+    period (str): Time period for historical data
+    interval (str): Bar interval, "1d" or one of intraday_store.INTERVALS
+
+    Returns:
+    tuple: Stock information and historical data, (None, None) if unavailable
+    """
+    try:
+        # Get stock information
+        stock = http_session.yf_ticker(ticker)
+        info = stock.info
+
+        # Get historical market data (served from the local stores, topping up missing bars)
+        if interval in intraday_store.INTERVALS:
+            hist = intraday_store.get_store().get_history(ticker, interval, period)
+        else:
+            hist = history_store.get_store().get_history(ticker, period)
+
+        # Check if data was retrieved
+        if hist.empty:
+            return None, None
+
+        return info, hist
+    except Exception as e:
+        logger.warning("Error retrieving data for %s: %s", ticker, e)
+        metrics.record_error("load_stock_data")
+        return None, None
+
+
+@metrics.instrument("search_stock_symbols")
+def search_stock_symbols(query):
+    """
+    Query the Yahoo Finance search endpoint for stock symbols
+
+    Parameters:
+    query (str): Search query
+
+    Returns:
+    list: List of dictionaries containing stock symbols and company names
+    """
+    try:
+        # Yahoo Finance API endpoint for symbol suggestions
+        url = "https://query1.finance.yahoo.com/v1/finance/search"
+        params = {'q': query, 'quotesCount': 20, 'newsCount': 0}
+        response = http_session.get_session().get(url, params=params)
+
+        if response.status_code == 200:
+            data = response.json()
+            if 'quotes' in data and len(data['quotes']) > 0:
+                results = []
+                for quote in data['quotes']:
+                    # Only include equities, not currencies, futures, etc.
+                    if 'symbol' in quote and 'shortname' in quote and 'quoteType' in quote:
+                        if quote['quoteType'] in ['EQUITY', 'ETF']:
+                            results.append({
+                                'symbol': quote['symbol'],
+                                'name': quote['shortname'],
+                                'exchange': quote.get('exchange', '')
+                            })
+                return results
+            return []
+        metrics.record_error("search_stock_symbols")
+        return []
+    except Exception:
+        # Silently fail and return empty list
+        metrics.record_error("search_stock_symbols")
+        return []
+
+
+# Function to get news for a stock
+@metrics.instrument("get_stock_news")
+def get_stock_news(ticker, num_items=5):
+    """
+    Get latest news for a stock
+
+    Parameters:
+    ticker (str): Stock ticker symbol
+    num_items (int): Number of news items to retrieve
+
+    Returns:
+    list: List of news items
+    """
+    try:
+        return news.aggregate([ticker], num_items)
+    except Exception:
+        # Silently fail
+        metrics.record_error("get_stock_news")
+        return []
+
+
+# Function to get market news (general)
+@metrics.instrument("get_market_news")
+def get_market_news(num_items=5):
+    """
+    Get general market news
+
+    Parameters:
+    num_items (int): Number of news items to retrieve
+
+    Returns:
+    list: List of news items
+    """
+    # NIFTY 50 and SENSEX news covers the broad market
+    try:
+        return news.aggregate(news.MARKET_SYMBOLS, num_items)
+    except Exception:
+        metrics.record_error("get_market_news")
+        return []
+
+
+# Function to get one merged feed for a stock, its sector peers and the market
+@metrics.instrument("get_news_feed")
+def get_news_feed(ticker, num_items=10, include_peers=True):
+    """
+    Get a merged, newest-first news feed for a stock, its sector peers and the market indices
+
+    Every feed is fetched concurrently within news.LATENCY_BUDGET, and feeds
+    and articles are cached for the whole process.
+
+    Parameters:
+    ticker (str): Stock ticker symbol
+    num_items (int): Number of news items to retrieve
+    include_peers (bool): Include headlines of other stocks in the same sector
+
+    Returns:
+    list: News items, each with the 'symbols' whose feeds carried it
+    """
+    try:
+        peers = news.sector_peers(ticker) if include_peers else []
+        return news.aggregate([ticker, *peers, *news.MARKET_SYMBOLS], num_items)
+    except Exception as e:
+        logger.warning("News feed for %s failed: %s", ticker, e)
+        metrics.record_error("get_news_feed")
+        return []
+
+
+# Function to get data for multiple stocks (watchlist)
+@metrics.instrument("get_watchlist_data")
+def get_watchlist_data(symbols):
+    """
+    Get current price data for multiple stocks
+
+    Quotes are cached per symbol in a cache shared by every session, so
+    overlapping watchlists reuse each other's fetches and concurrent requests
+    for the same symbol trigger a single upstream call.
+
+    Parameters:
+    symbols (list): List of stock symbols
+
+    Returns:
+    pandas.DataFrame: Quote snapshot (see fetch_engine.quote_snapshot) in watchlist order
+    """
+    rows = _watchlist_cache().get_many(symbols, fetch_engine.fetch_quote_rows)
+    return fetch_engine.quote_snapshot(rows[symbol] for symbol in symbols if symbol in rows)
+
+
+def refresh_watchlist(symbols):
+    """
+    Fetch watchlist rows and store them in the shared cache
+
+    Parameters:
+    symbols (list): Stock symbols
+
+    Returns:
+    int: Number of symbols refreshed
+    """
+    rows = fetch_engine.fetch_quote_rows(list(symbols))
+    _watchlist_cache().put_many(rows)
+    return len(rows)
+
+
+def _screen_penny_stocks():
+    """Run the penny stock screen, returning None if the scan fails"""
+    try:
+        # One bulk scan of a month of closes, filtered column-wise
+        results = screener.run_screen(period="1mo", max_price=screener.PENNY_MAX_PRICE)
+
+        # If nothing matched, return at least two stocks we know exist (major Indian stocks)
+        if results.empty:
+            universe = screener.load_universe()
+            defaults = universe.loc[universe.index.intersection(["RELIANCE.NS", "TCS.NS"])]
+            results = screener.run_screen(defaults, period="1mo", max_price=None)
+
+        # Sorted once per scan so every view can use the cached snapshot as is
+        return results.sort_values('price', ignore_index=True)
+    except Exception as e:
+        # Don't fail the caller if the scan fails
+        logger.warning("Penny stock scan failed: %s", e)
+        metrics.record_error("get_penny_stocks")
+        return None
+
+
+# Function to get the sector of every known symbol
+@metrics.instrument("get_sectors")
+def get_sectors():
+    """
+    Look up sectors from the local symbol universe (no Yahoo calls)
+
+    Returns:
+    dict: Sector per symbol
+    """
+    return screener.load_universe()['sector'].to_dict()
+
+
+# Function to get penny stocks data
+@metrics.instrument("get_penny_stocks")
+def get_penny_stocks():
+    """
+    Screen the local NSE/BSE symbol universe for penny stocks (price < ₹100)
+
+    The screen is cached for the whole process and kept warm by the background prefetcher.
+
+    Returns:
+    pandas.DataFrame: Penny stocks sorted by price (see screener.screen), empty if the scan failed
+    """
+    results = _screen_cache().get("penny", lambda _: _screen_penny_stocks())
+    if results is None:
+        return pd.DataFrame(columns=screener.SCREEN_COLUMNS)
+    # A shallow copy: copy-on-write keeps the cached snapshot unchanged
+    return results.copy(deep=False)
+
+
+def refresh_penny_stocks():
+    """
+    Re-run the penny stock screen and store it in the shared cache
+
+    Returns:
+    int: Number of penny stocks found
+    """
+    results = _screen_penny_stocks()
+    if results is None:
+        raise RuntimeError("penny stock scan failed")
+    _screen_cache().put_many({"penny": results})
+    return len(results)
+
+
+def _load_market_breadth():
+    """Compute market breadth, returning None if the snapshot cannot be loaded"""
+    try:
+        return breadth.load_breadth()
+    except Exception as e:
+        logger.warning("Market breadth snapshot failed: %s", e)
+        metrics.record_error("get_market_breadth")
+        return None
+
+
+# Function to get market breadth for the symbol universe
+@metrics.instrument("get_market_breadth")
+def get_market_breadth():
+    """
+    Advance/decline, moving-average and new high/low breadth for the local symbol universe
+
+    Computed from one bulk snapshot of daily closes, cached for the whole
+    process and kept warm by the background prefetcher.
+
+    Returns:
+    dict: See breadth.compute_breadth, or None if no data is available
+    """
+    return _screen_cache().get("breadth", lambda _: _load_market_breadth())
+
+
+def refresh_market_breadth():
+    """
+    Recompute market breadth and store it in the shared cache
+
+    Returns:
+    int: Number of stocks in the snapshot
+    """
+    result = _load_market_breadth()
+    if result is None:
+        raise RuntimeError("market breadth snapshot failed")
+    _screen_cache().put_many({"breadth": result})
+    return result['summary']['stocks']
@@ -0,0 +1,428 @@
+"""
+Process-wide performance metrics for the data layer and the dashboard.
+
+Four kinds of measurement are collected in one registry shared by every
+session:
+- timing histograms and error counts for fetchers and render steps;
+- payload sizes of what those operations return;
+- hit/miss counts for every cache layer;
+- latency, status and response size of every upstream HTTP request.
+
+The registry is exported in the Prometheus text exposition format, either on
+demand or by a background thread that rewrites a file a local scraper (e.g.
+node_exporter's textfile collector) can read. This module only uses the
+standard library, so the lowest layers can import it.
+"""
+import functools
+import itertools
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Prefix of every exported metric name
+NAMESPACE = "stock_app"
+
+# Histogram bucket upper bounds: seconds for timings, bytes for payloads
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Payload sizes are measured on the first and then every Nth call of an operation, since
+# sizing a DataFrame can cost more than serving it from a cache
+PAYLOAD_SAMPLE_EVERY = 10
+
+# Seconds between rewrites of the metrics file
+TEXTFILE_INTERVAL = 15
+
+_HELP = {
+    'operation_seconds': ("histogram", "Time spent in data-layer fetchers and render steps"),
+    'operation_errors_total': ("counter", "Operations that raised or fell back after an error"),
+    'payload_bytes': ("histogram", "Approximate in-memory size of the data an operation returned"),
+    'cache_requests_total': ("counter", "Cache lookups by cache and result (hit, miss or wait)"),
+    'upstream_requests_total': ("counter", "Upstream HTTP attempts by endpoint and status ('error' if none)"),
+    'upstream_seconds': ("histogram", "Latency of upstream HTTP attempts"),
+    'upstream_response_bytes': ("histogram", "Size of upstream HTTP responses"),
+}
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram
+
+    Parameters:
+    buckets (tuple): Sorted bucket upper bounds (an implicit +Inf bucket is added)
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket, as Prometheus does"""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[position - 1] if position else 0.0
+                if position == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[position] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Registry:
+    """Thread-safe store of counters and histograms keyed by metric name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> Histogram
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=TIME_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def counters(self, name):
+        """Return {labels: value} for one counter, labels being sorted (name, value) pairs"""
+        with self._lock:
+            return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    def histograms(self, name):
+        """Return {labels: (count, sum, p50, p95)} for one histogram"""
+        with self._lock:
+            return {
+                labels: (histogram.count, histogram.sum, histogram.quantile(0.5), histogram.quantile(0.95))
+                for (metric, labels), histogram in self._histograms.items() if metric == name
+            }
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format
+
+        Returns:
+        str: Exposition text
+        """
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                       for _, value in pairs)
+            return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            histograms = [(key, list(h.counts), h.sum, h.count, h.buckets) for key, h in histograms]
+
+        lines, described = [], set()
+        for (name, labels), value in counters:
+            metric = f"{NAMESPACE}_{name}"
+            if name not in described:
+                described.add(name)
+                kind, text = _HELP.get(name, ("counter", name))
+                lines += [f"# HELP {metric} {text}", f"# TYPE {metric} {kind}"]
+            lines.append(f"{metric}{label_text(labels)} {value:g}")
+
+        for (name, labels), counts, total, count, buckets in histograms:
+            metric = f"{NAMESPACE}_{name}"
+            if name not in described:
+                described.add(name)
+                kind, text = _HELP.get(name, ("histogram", name))
+                lines += [f"# HELP {metric} {text}", f"# TYPE {metric} {kind}"]
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f"{metric}_bucket{label_text(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{metric}_sum{label_text(labels)} {total:.6g}")
+            lines.append(f"{metric}_count{label_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = Registry()
+
+
+def get_registry():
+    """Return the process-wide registry"""
+    return _registry
+
+
+def payload_size(value):
+    """
+    Approximate in-memory size of a returned value in bytes
+
+    DataFrames and Series report their column buffers; containers are summed over their items.
+
+    Parameters:
+    value: Any value returned by an operation
+
+    Returns:
+    int: Size in bytes
+    """
+    if value is None:
+        return 0
+    memory_usage = getattr(value, 'memory_usage', None)
+    if callable(memory_usage):
+        usage = memory_usage(index=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(payload_size(key) + payload_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(payload_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def record_error(operation):
+    """Count an error an operation handled itself (e.g. by returning an empty result)"""
+    _registry.inc('operation_errors_total', operation=operation)
+
+
+def record_cache(cache, hits=0, misses=0, waits=0):
+    """
+    Count cache lookups
+
+    Parameters:
+    cache (str): Cache name
+    hits (int): Lookups answered from the cache
+    misses (int): Lookups that loaded the value
+    waits (int): Lookups that waited for another caller's load
+    """
+    for result, count in (('hit', hits), ('miss', misses), ('wait', waits)):
+        if count:
+            _registry.inc('cache_requests_total', count, cache=cache, result=result)
+
+
+def record_upstream(endpoint, seconds, status, size=None):
+    """
+    Record one upstream HTTP attempt
+
+    Parameters:
+    endpoint (str): Host and path prefix of the request
+    seconds (float): Time until the response (or the error)
+    status (int): HTTP status code, or None if the request raised
+    size (int): Response size in bytes, if known
+    """
+    _registry.inc('upstream_requests_total', endpoint=endpoint, status='error' if status is None else str(status))
+    _registry.observe('upstream_seconds', seconds, endpoint=endpoint)
+    if size is not None:
+        _registry.observe('upstream_response_bytes', size, buckets=SIZE_BUCKETS, endpoint=endpoint)
+
+
+@contextmanager
+def timer(operation):
+    """
+    Time a block as one run of an operation; an exception also counts as an error
+
+    Parameters:
+    operation (str): Operation name, e.g. "render:price_chart"
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        record_error(operation)
+        raise
+    finally:
+        _registry.observe('operation_seconds', time.perf_counter() - started, operation=operation)
+
+
+def instrument(operation):
+    """
+    Decorator timing every call of a function and sampling the size of its result (if any)
+
+    Parameters:
+    operation (str): Operation name
+
+    Returns:
+    callable: Decorator
+    """
+    def decorate(func):
+        calls = itertools.count()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(operation):
+                result = func(*args, **kwargs)
+            # Render steps return nothing; there is no payload to measure
+            if next(calls) % PAYLOAD_SAMPLE_EVERY == 0 and result is not None:
+                _registry.observe('payload_bytes', payload_size(result), buckets=SIZE_BUCKETS, operation=operation)
+            return result
+        return wrapper
+    return decorate
+
+
+def count_cache(cache, cache_decorator, func):
+    """
+    Apply a memoizing decorator (e.g. st.cache_data) and count its hits and misses
+
+    A call is a miss when the decorated function actually runs.
+
+    Parameters:
+    cache (str): Cache name
+    cache_decorator (callable): Decorator that memoizes a function
+    func (callable): Function to memoize
+
+    Returns:
+    callable: The memoized function
+    """
+    state = threading.local()
+
+    @functools.wraps(func)
+    def load(*args, **kwargs):
+        state.missed = True
+        return func(*args, **kwargs)
+
+    cached = cache_decorator(load)
+
+    @functools.wraps(func)
+    def lookup(*args, **kwargs):
+        state.missed = False
+        result = cached(*args, **kwargs)
+        if state.missed:
+            record_cache(cache, misses=1)
+        else:
+            record_cache(cache, hits=1)
+        return result
+
+    return lookup
+
+
+def summary():
+    """
+    Per-operation, per-cache and per-endpoint figures, as shown in the diagnostics panel
+
+    Returns:
+    dict: 'operations', 'caches' and 'upstream' lists of row dictionaries
+    """
+    def by(label, values):
+        return {dict(labels)[label]: value for labels, value in values.items()}
+
+    timings = by('operation', _registry.histograms('operation_seconds'))
+    errors = by('operation', _registry.counters('operation_errors_total'))
+    payloads = by('operation', _registry.histograms('payload_bytes'))
+    operations = []
+    for operation in sorted(set(timings) | set(errors)):
+        count, total, p50, p95 = timings.get(operation, (0, 0.0, math.nan, math.nan))
+        payload_count, payload_total = payloads.get(operation, (0, 0.0))[:2]
+        operations.append({
+            'operation': operation, 'calls': count, 'errors': errors.get(operation, 0),
+            'total_s': total, 'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000,
+            'avg_payload_kb': payload_total / payload_count / 1024 if payload_count else math.nan,
+        })
+
+    caches = {}
+    for labels, value in _registry.counters('cache_requests_total').items():
+        labels = dict(labels)
+        caches.setdefault(labels['cache'], {'cache': labels['cache'], 'hit': 0, 'miss': 0, 'wait': 0})
+        caches[labels['cache']][labels['result']] += value
+    for row in caches.values():
+        lookups = row['hit'] + row['miss'] + row['wait']
+        row['hit_rate_pct'] = row['hit'] / lookups * 100 if lookups else math.nan
+
+    latencies = by('endpoint', _registry.histograms('upstream_seconds'))
+    sizes = by('endpoint', _registry.histograms('upstream_response_bytes'))
+    upstream = {}
+    for labels, value in _registry.counters('upstream_requests_total').items():
+        labels = dict(labels)
+        row = upstream.setdefault(labels['endpoint'], {'endpoint': labels['endpoint'], 'requests': 0, 'errors': 0})
+        row['requests'] += value
+        if labels['status'] == 'error' or int(labels['status']) >= 400:
+            row['errors'] += value
+    for endpoint, row in upstream.items():
+        _, _, p50, p95 = latencies.get(endpoint, (0, 0.0, math.nan, math.nan))
+        row.update({
+            'error_rate_pct': row['errors'] / row['requests'] * 100, 'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000,
+            'received_kb': sizes.get(endpoint, (0, 0.0))[1] / 1024,
+        })
+
+    return {
+        'operations': sorted(operations, key=lambda row: row['total_s'], reverse=True),
+        'caches': sorted(caches.values(), key=lambda row: row['cache']),
+        'upstream': sorted(upstream.values(), key=lambda row: row['requests'], reverse=True),
+    }
+
+
+def render_prometheus():
+    """Return every metric in the Prometheus text exposition format"""
+    return _registry.render()
+
+
+def write_textfile(path):
+    """
+    Write the metrics to a file, replacing it atomically so a scraper never reads a partial file
+
+    Parameters:
+    path (str): File to write (conventionally ending in .prom)
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(temp_path, path)
+
+
+class TextfileWriter:
+    """
+    Rewrite the metrics file periodically on a daemon thread
+
+    Parameters:
+    path (str): File to write
+    interval (float): Seconds between writes
+    """
+
+    def __init__(self, path, interval=TEXTFILE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                write_textfile(self.path)
+            except OSError:
+                pass  # the next write tries again
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background thread (no-op if it is already running)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,158 @@
+"""
+News aggregation across a stock, its sector peers and the market indices.
+
+Headlines for every symbol in a request are fetched concurrently within one
+latency budget; symbols that do not answer in time are left out of that feed
+rather than holding it up. Articles are cached individually by ID and each
+symbol's feed only keeps the IDs, so overlapping requests (two stocks in the
+same sector, the market indices shown with every stock) reuse both the feeds
+and the articles. The merged feed is deduplicated by article ID and link and
+sorted newest first.
+"""
+import logging
+from datetime import datetime
+
+import fetch_engine
+import http_session
+import quote_cache
+import screener
+
+logger = logging.getLogger(__name__)
+
+# Index feeds merged into every aggregated feed
+MARKET_SYMBOLS = ("^NSEI", "^BSESN")
+
+# Sector peers whose headlines are included with a stock's own
+MAX_PEERS = 3
+
+# Seconds the whole aggregation may wait for upstream responses
+LATENCY_BUDGET = 4.0
+
+# Seconds a symbol's list of headlines, and a single article, stay cached
+FEED_TTL = 600
+ARTICLE_TTL = 3600
+
+
+def _feed_cache():
+    return quote_cache.get_quote_cache("news_feeds", ttl=lambda: FEED_TTL)
+
+
+def _article_cache():
+    return quote_cache.get_quote_cache("news_articles", ttl=lambda: ARTICLE_TTL)
+
+
+def _timestamp(value):
+    """Convert an epoch number or ISO 8601 string to epoch seconds (0 if unknown)"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str) and value:
+        try:
+            return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+        except ValueError:
+            return 0
+    return 0
+
+
+def normalize_article(item):
+    """
+    Flatten a Yahoo Finance news item into the fields the app displays
+
+    Handles both the flat format of older yfinance releases and the nested
+    ``{'id': ..., 'content': {...}}`` format of newer ones.
+
+    Parameters:
+    item (dict): News item from ``Ticker.news``
+
+    Returns:
+    dict: uuid, title, publisher, link, summary and providerPublishTime, or None without an ID or link
+    """
+    content = item.get('content') or item
+    link = (
+        (content.get('canonicalUrl') or {}).get('url')
+        or (content.get('clickThroughUrl') or {}).get('url')
+        or content.get('link')
+        or item.get('link')
+    )
+    uuid = item.get('uuid') or item.get('id') or content.get('id') or link
+    if not uuid:
+        return None
+
+    provider = content.get('provider')
+    return {
+        'uuid': uuid,
+        'title': content.get('title') or 'No title available',
+        'publisher': (provider or {}).get('displayName') if isinstance(provider, dict) else content.get('publisher'),
+        'link': link or '#',
+        'summary': content.get('summary') or content.get('description') or '',
+        'providerPublishTime': _timestamp(content.get('providerPublishTime') or content.get('pubDate')),
+    }
+
+
+def _fetch_feed(symbol):
+    """Fetch one symbol's headlines, caching the articles and returning their IDs"""
+    articles = [article for article in map(normalize_article, http_session.yf_ticker(symbol).news or [])
+                if article is not None]
+    _article_cache().put_many({article['uuid']: article for article in articles})
+    return [article['uuid'] for article in articles]
+
+
+def _load_feeds(symbols, budget):
+    feeds, errors = fetch_engine.run_concurrently(_fetch_feed, symbols, max_workers=len(symbols), timeout=budget)
+    for symbol, error in errors.items():
+        logger.info("No news for %s: %s", symbol, error)
+    return feeds
+
+
+def sector_peers(symbol, max_peers=MAX_PEERS, universe=None):
+    """
+    Pick other stocks from the same sector of the local symbol universe
+
+    Parameters:
+    symbol (str): Stock ticker symbol
+    max_peers (int): Maximum number of peers
+    universe (pandas.DataFrame): Symbol universe (defaults to screener.load_universe())
+
+    Returns:
+    list: Peer symbols (empty if the symbol is not in the universe)
+    """
+    universe = screener.load_universe() if universe is None else universe
+    if symbol not in universe.index:
+        return []
+    sector = universe.at[symbol, 'sector']
+    peers = universe.index[(universe['sector'] == sector) & (universe.index != symbol)]
+    return list(peers[:max_peers])
+
+
+def aggregate(symbols, limit=10, budget=LATENCY_BUDGET):
+    """
+    Merge the headlines of several symbols into one feed
+
+    Parameters:
+    symbols (list): Symbols in order of priority (an article is attributed to the first that carries it)
+    limit (int): Maximum number of articles returned
+    budget (float): Seconds to wait for feeds that are not cached
+
+    Returns:
+    list: Articles (see normalize_article) with a 'symbols' list, newest first
+    """
+    symbols = list(dict.fromkeys(symbols))
+    feeds = _feed_cache().get_many(symbols, lambda missing: _load_feeds(missing, budget))
+
+    article_ids = list(dict.fromkeys(uuid for symbol in symbols for uuid in feeds.get(symbol, [])))
+    articles = _article_cache().get_many(article_ids, lambda _: {})
+
+    merged, by_link = {}, {}
+    for symbol in symbols:
+        for uuid in feeds.get(symbol, []):
+            article = articles.get(uuid)
+            if article is None:
+                continue
+            # The same story can appear under different IDs in different feeds
+            key = by_link.setdefault(article['link'], uuid) if article['link'] != '#' else uuid
+            if key not in merged:
+                merged[key] = {**article, 'symbols': []}
+            if symbol not in merged[key]['symbols']:
+                merged[key]['symbols'].append(symbol)
+
+    feed = sorted(merged.values(), key=lambda article: article['providerPublishTime'], reverse=True)
+    return feed[:limit]
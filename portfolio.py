@@ -0,0 +1,465 @@
+"""
+Portfolio tracking: transactions, FIFO lots, P&L, sector allocation and XIRR.
+
+The portfolio is a table of buy/sell transactions saved as JSON. Everything
+else is derived from it with column operations: FIFO matching uses each
+symbol's cumulative bought quantity and cost (no loop over lots), and
+valuation maps one batch of current prices onto the open lots, so revaluing
+on every refresh only costs a few array operations.
+
+The file is shared by every session of the dashboard. Changes go through
+``update``, which reloads the file, applies the change and writes it back under
+a lock, so concurrent sessions add to each other's transactions instead of
+overwriting them.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: only sessions of the same process are serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Where the portfolio is saved (override with the STOCK_PORTFOLIO_FILE environment variable)
+DEFAULT_PORTFOLIO_FILE = os.environ.get(
+    "STOCK_PORTFOLIO_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "portfolio.json")
+)
+
+TRANSACTION_COLUMNS = ['date', 'symbol', 'side', 'quantity', 'price', 'fees']
+SIDES = ('BUY', 'SELL')
+
+# Serializes read-modify-write cycles on the portfolio file within this process
+_file_lock = threading.Lock()
+
+LOT_COLUMNS = ['symbol', 'date', 'quantity', 'cost_price', 'cost']
+HOLDING_COLUMNS = ['symbol', 'quantity', 'avg_cost', 'cost', 'price', 'market_value',
+                   'unrealized_pnl', 'unrealized_pct', 'realized_pnl', 'weight_pct']
+
+
+def _empty_transactions():
+    return pd.DataFrame({
+        'date': pd.Series(dtype='datetime64[ns]'), 'symbol': pd.Series(dtype=str),
+        'side': pd.Series(dtype=str), 'quantity': pd.Series(dtype=float),
+        'price': pd.Series(dtype=float), 'fees': pd.Series(dtype=float),
+    })
+
+
+def _normalize(transactions):
+    """Coerce a transaction table to the standard columns, types and order"""
+    transactions = pd.DataFrame(transactions).reindex(columns=TRANSACTION_COLUMNS)
+    transactions['date'] = pd.to_datetime(transactions['date']).dt.normalize()
+    transactions['symbol'] = transactions['symbol'].str.strip().str.upper()
+    transactions['side'] = transactions['side'].str.strip().str.upper()
+    for column in ('quantity', 'price', 'fees'):
+        transactions[column] = pd.to_numeric(transactions[column]).fillna(0.0).astype(float)
+    # Buys before sells on the same day, otherwise in the order entered
+    side_order = (transactions['side'] == 'SELL').astype(int)
+    order = np.lexsort((np.arange(len(transactions)), side_order, transactions['date'].to_numpy()))
+    return transactions.iloc[order].reset_index(drop=True)
+
+
+def _validate(transactions):
+    """Raise ValueError if a transaction is malformed or sells more than is held"""
+    if not transactions['side'].isin(SIDES).all():
+        raise ValueError("side must be BUY or SELL")
+    if (transactions['quantity'] <= 0).any() or (transactions['price'] < 0).any() or (transactions['fees'] < 0).any():
+        raise ValueError("quantity must be positive and price/fees non-negative")
+
+    signed = transactions['quantity'].where(transactions['side'] == 'BUY', -transactions['quantity'])
+    held = signed.groupby(transactions['symbol']).cumsum()
+    if (held < -1e-9).any():
+        symbol = transactions.loc[held.idxmin(), 'symbol']
+        raise ValueError(f"Cannot sell more {symbol} than is held")
+
+
+def match_lots(transactions):
+    """
+    Match sells against buys first-in-first-out
+
+    For each symbol the cost of the first x units bought is a piecewise-linear
+    function of x, so the cost of every sell and the remaining part of every
+    buy lot come from interpolating along the cumulative quantities.
+
+    Parameters:
+    transactions (pandas.DataFrame): Normalized transactions
+
+    Returns:
+    tuple: (open lots DataFrame, realized P&L per symbol as a Series)
+    """
+    buys = transactions[transactions['side'] == 'BUY']
+    sells = transactions[transactions['side'] == 'SELL']
+
+    # Per-unit cost of each buy includes its fees
+    buy_cost = buys['quantity'] * buys['price'] + buys['fees']
+    cum_qty = buys['quantity'].groupby(buys['symbol']).cumsum()
+    cum_cost = buy_cost.groupby(buys['symbol']).cumsum()
+    sold = sells['quantity'].groupby(sells['symbol']).sum().reindex(buys['symbol'].unique(), fill_value=0.0)
+
+    # Remaining quantity of each lot after the total sold is taken from the oldest lots
+    total_sold = buys['symbol'].map(sold).to_numpy()
+    lot_start = (cum_qty - buys['quantity']).to_numpy()
+    remaining = np.clip(cum_qty.to_numpy() - np.maximum(lot_start, total_sold), 0, None)
+    unit_cost = (buy_cost / buys['quantity']).to_numpy()
+
+    lots = pd.DataFrame({
+        'symbol': buys['symbol'].to_numpy(),
+        'date': buys['date'].to_numpy(),
+        'quantity': remaining,
+        'cost_price': unit_cost,
+        'cost': remaining * unit_cost,
+    })
+    lots = lots[lots['quantity'] > 1e-9].reset_index(drop=True)
+
+    # Cost of the units consumed by each sell: C(units sold up to and including it) - C(before it)
+    realized = pd.Series(0.0, index=pd.Index(transactions['symbol'].unique(), name='symbol'))
+    if not sells.empty:
+        sell_cum = sells['quantity'].groupby(sells['symbol']).cumsum()
+        consumed_cost = np.empty(len(sells))
+        for symbol, positions in sells.groupby('symbol').indices.items():
+            in_symbol = (buys['symbol'] == symbol).to_numpy()
+            xs = np.concatenate([[0.0], cum_qty.to_numpy()[in_symbol]])
+            ys = np.concatenate([[0.0], cum_cost.to_numpy()[in_symbol]])
+            cost_through = np.interp(sell_cum.to_numpy()[positions], xs, ys)
+            consumed_cost[positions] = np.diff(cost_through, prepend=0.0)
+        proceeds = (sells['quantity'] * sells['price'] - sells['fees']).to_numpy()
+        realized = realized.add(
+            pd.Series(proceeds - consumed_cost).groupby(sells['symbol'].to_numpy()).sum(), fill_value=0.0
+        )
+
+    return lots, realized
+
+
+def value_holdings(lots, realized, prices):
+    """
+    Value open lots at current prices and aggregate them per symbol
+
+    Parameters:
+    lots (pandas.DataFrame): Open lots from match_lots
+    realized (pandas.Series): Realized P&L per symbol
+    prices (dict): Current price per symbol (missing symbols are valued at cost)
+
+    Returns:
+    pandas.DataFrame: One row per symbol with HOLDING_COLUMNS
+    """
+    # Symbols that were fully sold still carry realized P&L
+    symbols = pd.Index(lots['symbol'].unique()).union(realized.index)
+    codes = symbols.get_indexer(lots['symbol'])
+    n = len(symbols)
+
+    quantity = lots['quantity'].to_numpy()
+    cost_price = lots['cost_price'].to_numpy()
+    symbol_price = np.array([prices.get(symbol, np.nan) for symbol in symbols], dtype=float)
+    lot_price = symbol_price[codes]
+    lot_price = np.where(np.isnan(lot_price), cost_price, lot_price)
+
+    held = np.bincount(codes, weights=quantity, minlength=n)
+    cost = np.bincount(codes, weights=lots['cost'].to_numpy(), minlength=n)
+    market_value = np.bincount(codes, weights=quantity * lot_price, minlength=n)
+    price = np.where(np.isnan(symbol_price) & (held > 0),
+                     np.divide(market_value, held, out=np.zeros(n), where=held > 0), symbol_price)
+    total_value = market_value.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'symbol': symbols,
+            'quantity': held,
+            'avg_cost': np.where(held > 0, cost / held, np.nan),
+            'cost': cost,
+            'price': price,
+            'market_value': market_value,
+            'unrealized_pnl': market_value - cost,
+            'unrealized_pct': np.where(cost > 0, (market_value - cost) / cost * 100, np.nan),
+            'realized_pnl': realized.reindex(symbols, fill_value=0.0).to_numpy(),
+            'weight_pct': market_value / total_value * 100 if total_value else np.zeros(n),
+        })
+
+
+def sector_allocation(holdings, sectors):
+    """
+    Sum market value by sector
+
+    Parameters:
+    holdings (pandas.DataFrame): Output of value_holdings
+    sectors (dict or pandas.Series): Sector per symbol (unknown symbols go to "Other")
+
+    Returns:
+    pandas.DataFrame: sector, market_value and weight_pct, largest first
+    """
+    held = holdings[holdings['market_value'] > 0]
+    sector = [sectors.get(symbol) or 'Other' for symbol in held['symbol']]
+    codes, names = pd.factorize(pd.Index(sector))
+    value = np.bincount(codes, weights=held['market_value'].to_numpy(), minlength=len(names))
+    order = np.argsort(-value, kind='stable')
+    total = value.sum()
+    return pd.DataFrame({
+        'sector': names[order],
+        'market_value': value[order],
+        'weight_pct': value[order] / total * 100 if total else np.zeros(len(names)),
+    })
+
+
+def xirr(dates, amounts, guess=0.1, tolerance=1e-7, max_iterations=100):
+    """
+    Annualized internal rate of return for irregular cash flows
+
+    Parameters:
+    dates (list): Cash flow dates
+    amounts (list): Cash flows (investments negative, proceeds and current value positive)
+    guess (float): Starting rate for Newton's method
+    tolerance (float): Convergence tolerance on the rate
+    max_iterations (int): Newton iterations before falling back to bisection
+
+    Returns:
+    float: Rate as a fraction (0.12 for 12%), NaN if there is no sign change
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    if len(amounts) < 2 or not ((amounts > 0).any() and (amounts < 0).any()):
+        return np.nan
+    days = np.asarray(pd.to_datetime(np.asarray(dates)), dtype='datetime64[D]')
+    years = (days - days.min()).astype(float) / 365.0
+
+    def npv(rate):
+        return np.sum(amounts / (1 + rate) ** years)
+
+    rate = guess
+    for _ in range(max_iterations):
+        growth = (1 + rate) ** years
+        value = np.sum(amounts / growth)
+        slope = np.sum(-years * amounts / (growth * (1 + rate)))
+        if slope == 0 or not np.isfinite(slope):
+            break
+        step = value / slope
+        rate -= step
+        if rate <= -1:
+            break
+        if abs(step) < tolerance:
+            return float(rate)
+
+    # Newton did not converge: bisect on a wide bracket
+    low, high = -0.9999, 100.0
+    if npv(low) * npv(high) > 0:
+        return np.nan
+    for _ in range(200):
+        mid = (low + high) / 2
+        if npv(low) * npv(mid) <= 0:
+            high = mid
+        else:
+            low = mid
+        if high - low < tolerance:
+            break
+    return float((low + high) / 2)
+
+
+def _file_version(path):
+    """Modification time and size of the saved file (None if it does not exist)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@contextmanager
+def _locked(path):
+    """Hold the in-process lock and, where supported, an exclusive lock on a file next to path"""
+    with _file_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class Portfolio:
+    """
+    A set of buy/sell transactions with derived holdings
+
+    Parameters:
+    transactions (pandas.DataFrame): Transactions with TRANSACTION_COLUMNS (empty if None)
+    """
+
+    def __init__(self, transactions=None):
+        transactions = _empty_transactions() if transactions is None or len(transactions) == 0 else transactions
+        self.transactions = _normalize(transactions)
+        _validate(self.transactions)
+        self._lots = None
+        self.version = None    # version of the saved file this portfolio was read from or written to
+
+    @classmethod
+    def load(cls, path=None):
+        """Load a portfolio from JSON (an empty portfolio if the file does not exist or cannot be read)"""
+        path = path or DEFAULT_PORTFOLIO_FILE
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding='utf-8') as f:
+                book = cls(pd.DataFrame(json.load(f).get('transactions', [])))
+        except (ValueError, TypeError, AttributeError) as e:
+            # A truncated or hand-edited file must not stop the dashboard loading; keep a copy
+            # because the next saved transaction replaces it
+            shutil.copyfile(path, f"{path}.corrupt")
+            logger.warning("Could not read portfolio %s (%s); starting empty, copy kept at %s.corrupt", path, e, path)
+            book = cls()
+        book.version = _file_version(path)
+        return book
+
+    def save(self, path=None):
+        """
+        Write the transactions to JSON, replacing the file atomically
+
+        This overwrites changes other sessions saved in the meantime; use
+        ``update`` to change the shared portfolio.
+        """
+        path = path or DEFAULT_PORTFOLIO_FILE
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        records = self.transactions.assign(date=self.transactions['date'].dt.strftime('%Y-%m-%d'))
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'transactions': records.to_dict('records')}, f, indent=2)
+        os.replace(temp_path, path)
+        self.version = _file_version(path)
+
+    def is_current(self, path=None):
+        """Whether the saved file is unchanged since this portfolio read or wrote it"""
+        return _file_version(path or DEFAULT_PORTFOLIO_FILE) == self.version
+
+    def add(self, symbol, side, quantity, price, fees=0.0, on=None):
+        """
+        Record a transaction
+
+        Parameters:
+        symbol (str): Stock ticker symbol
+        side (str): "BUY" or "SELL"
+        quantity (float): Number of shares
+        price (float): Price per share
+        fees (float): Brokerage and taxes for the whole transaction
+        on (date): Trade date (defaults to today)
+
+        Raises:
+        ValueError: If the transaction is invalid or sells more than is held
+        """
+        row = pd.DataFrame([{
+            'date': on or date.today(), 'symbol': symbol, 'side': side,
+            'quantity': quantity, 'price': price, 'fees': fees,
+        }])
+        transactions = _normalize(pd.concat([self.transactions, row], ignore_index=True))
+        _validate(transactions)
+        self.transactions = transactions
+        self._lots = None
+
+    def find(self, transaction):
+        """
+        Row position of the first transaction equal to the given one
+
+        Parameters:
+        transaction (dict or pandas.Series): Values for TRANSACTION_COLUMNS
+
+        Raises:
+        ValueError: If there is no such transaction
+        """
+        wanted = _normalize(pd.DataFrame([dict(transaction)])).iloc[0]
+        matches = (self.transactions[TRANSACTION_COLUMNS] == wanted[TRANSACTION_COLUMNS]).all(axis=1)
+        if not matches.any():
+            raise ValueError("That transaction is no longer in the portfolio")
+        return int(np.argmax(matches.to_numpy()))
+
+    def remove(self, position):
+        """
+        Delete the transaction at a row position
+
+        Raises:
+        ValueError: If removing it would leave a sell without enough shares
+        """
+        transactions = self.transactions.drop(self.transactions.index[position]).reset_index(drop=True)
+        _validate(transactions)
+        self.transactions = transactions
+        self._lots = None
+
+    @property
+    def symbols(self):
+        """Symbols with open positions"""
+        return sorted(self.lots()[0]['symbol'].unique())
+
+    def lots(self):
+        """Return (open lots, realized P&L per symbol), computed once per change"""
+        if self._lots is None:
+            self._lots = match_lots(self.transactions)
+        return self._lots
+
+    def valuation(self, prices, sectors=None, today=None):
+        """
+        Value the portfolio at the given prices
+
+        Parameters:
+        prices (dict): Current price per symbol
+        sectors (dict or pandas.Series): Sector per symbol, for the allocation
+        today (date): Valuation date for XIRR (defaults to today)
+
+        Returns:
+        dict: holdings (DataFrame), allocation (DataFrame) and totals (dict with invested,
+              market_value, unrealized_pnl, realized_pnl and xirr_pct)
+        """
+        lots, realized = self.lots()
+        holdings = value_holdings(lots, realized, prices)
+        market_value = holdings['market_value'].sum()
+
+        # Buys are outflows, sells inflows, and the current value is a final inflow
+        flows = self.transactions
+        gross = flows['quantity'] * flows['price']
+        amounts = np.where(flows['side'] == 'BUY', -(gross + flows['fees']), gross - flows['fees'])
+        rate = xirr(
+            np.append(flows['date'].to_numpy(dtype='datetime64[D]'), np.datetime64(today or date.today(), 'D')),
+            np.append(amounts, market_value)
+        )
+
+        totals = {
+            'invested': holdings['cost'].sum(),
+            'market_value': market_value,
+            'unrealized_pnl': holdings['unrealized_pnl'].sum(),
+            'realized_pnl': holdings['realized_pnl'].sum(),
+            'xirr_pct': rate * 100,
+        }
+        allocation = sector_allocation(holdings, sectors if sectors is not None else {})
+        return {'holdings': holdings, 'allocation': allocation, 'totals': totals}
+
+
+def update(change, path=None):
+    """
+    Apply a change to the saved portfolio and save it
+
+    The latest saved transactions are loaded, changed and written back while a
+    lock is held, so transactions other sessions saved since this session read
+    the file are kept rather than overwritten.
+
+    Parameters:
+    change (callable): Function that modifies the Portfolio it is given (e.g. calls add or remove)
+    path (str): JSON file (defaults to DEFAULT_PORTFOLIO_FILE)
+
+    Returns:
+    Portfolio: The portfolio as saved
+
+    Raises:
+    ValueError: If the change is invalid (nothing is saved)
+    """
+    path = path or DEFAULT_PORTFOLIO_FILE
+    with _locked(path):
+        book = Portfolio.load(path)
+        change(book)
+        book.save(path)
+    return book
@@ -0,0 +1,143 @@
+"""
+Background refresh of watchlist, index, penny-stock and market breadth data.
+
+A single daemon thread re-fetches everything the dashboard shows into the
+shared caches in ``market_data`` shortly before the cached copies expire, so
+page renders read warm data instead of waiting on Yahoo. Refreshes run every
+couple of minutes while the NSE/BSE session is open and far less often when it
+is closed.
+
+Streamlit sessions report the watchlist symbols they display with ``track``;
+symbols nobody has shown for a while stop being refreshed.
+"""
+import logging
+import threading
+import time
+
+import market_data
+import quote_cache
+
+logger = logging.getLogger(__name__)
+
+# Refresh when this fraction of a cache entry's lifetime has passed
+REFRESH_FRACTION = 0.8
+
+# Seconds to wait before retrying a refresh that failed
+RETRY_DELAY = 30
+
+# Seconds a watchlist symbol keeps being refreshed after a session last showed it
+TRACK_EXPIRY = 3600
+
+
+class Prefetcher:
+    """
+    Periodically refresh shared market data caches on a background thread
+
+    Parameters:
+    index_symbols (list): Index symbols shown in the market overview
+    include_penny (bool): Whether to keep the penny-stock screen warm
+    include_breadth (bool): Whether to keep the market breadth snapshot warm
+    clock (callable): Monotonic time source (replaceable for testing)
+    """
+
+    def __init__(self, index_symbols=None, include_penny=True, include_breadth=True, clock=time.monotonic):
+        if index_symbols is None:
+            index_symbols = [symbol for _, symbol in market_data.MARKET_INDICES]
+        self._clock = clock
+        self._tracked = {}     # watchlist symbol -> last time a session showed it
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # name -> (refresh function, TTL function); all jobs are due immediately
+        self._jobs = {
+            "watchlist": (self._refresh_watchlist, quote_cache.current_ttl),
+            "indices": (lambda: market_data.refresh_indices(index_symbols), quote_cache.current_ttl),
+        }
+        if include_penny:
+            self._jobs["penny"] = (market_data.refresh_penny_stocks, market_data._penny_ttl)
+        if include_breadth:
+            self._jobs["breadth"] = (market_data.refresh_market_breadth, market_data._penny_ttl)
+        self._next_run = dict.fromkeys(self._jobs, 0.0)
+        self.last_results = {}  # name -> (finished_at, count or exception)
+
+    def track(self, symbols):
+        """
+        Record that a session is showing these watchlist symbols
+
+        Parameters:
+        symbols (list): Stock symbols
+        """
+        now = self._clock()
+        with self._lock:
+            new = [symbol for symbol in symbols if symbol not in self._tracked]
+            for symbol in symbols:
+                self._tracked[symbol] = now
+        if new:
+            # Pick up new symbols on the next watchlist refresh rather than waiting a full interval
+            with self._lock:
+                self._next_run["watchlist"] = min(self._next_run["watchlist"], now + RETRY_DELAY)
+            self._wake.set()
+
+    def tracked_symbols(self):
+        """Return the watchlist symbols still being refreshed, dropping expired ones"""
+        cutoff = self._clock() - TRACK_EXPIRY
+        with self._lock:
+            for symbol in [s for s, seen in self._tracked.items() if seen < cutoff]:
+                del self._tracked[symbol]
+            return list(self._tracked)
+
+    def _refresh_watchlist(self):
+        symbols = self.tracked_symbols()
+        return market_data.refresh_watchlist(symbols) if symbols else 0
+
+    def run_pending(self):
+        """
+        Run every job that is due and schedule its next run
+
+        Returns:
+        float: Seconds until the next job is due
+        """
+        for name, (refresh, ttl) in self._jobs.items():
+            with self._lock:
+                due = self._next_run[name] <= self._clock()
+            if not due:
+                continue
+
+            try:
+                result = refresh()
+                delay = ttl() * REFRESH_FRACTION
+            except Exception as e:
+                logger.warning("Background refresh of %s failed: %s", name, e)
+                result = e
+                delay = RETRY_DELAY
+
+            now = self._clock()
+            self.last_results[name] = (now, result)
+            with self._lock:
+                self._next_run[name] = now + delay
+
+        with self._lock:
+            return max(min(self._next_run.values()) - self._clock(), 0)
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.run_pending()
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def start(self):
+        """Start the background thread (no-op if it is already running)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="market-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop the background thread after its current refresh"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,171 @@
+"""
+Per-symbol quote cache shared by every Streamlit session in the process.
+
+Entries expire quickly while the Indian market is open and slowly when it is
+closed. Lookups are coalesced: if several sessions ask for the same symbol at
+once, only the first triggers an upstream fetch and the others wait for its
+result (single-flight).
+"""
+import threading
+import time
+from datetime import datetime, time as dt_time
+from zoneinfo import ZoneInfo
+
+import metrics
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# NSE/BSE regular session (Monday to Friday)
+MARKET_OPEN = dt_time(9, 15)
+MARKET_CLOSE = dt_time(15, 30)
+
+# Seconds a cached quote stays valid
+MARKET_HOURS_TTL = 120
+OFF_HOURS_TTL = 3600
+
+
+def is_market_open(now=None):
+    """
+    Check whether the NSE/BSE regular session is in progress (holidays are not considered)
+
+    Parameters:
+    now (datetime): Time to check (defaults to the current time)
+
+    Returns:
+    bool: True during trading hours
+    """
+    now = (now or datetime.now(IST)).astimezone(IST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+
+def current_ttl(now=None):
+    """Return the quote TTL for the current market state"""
+    return MARKET_HOURS_TTL if is_market_open(now) else OFF_HOURS_TTL
+
+
+class QuoteCache:
+    """
+    Thread-safe per-key cache with single-flight loading
+
+    Parameters:
+    ttl (callable): Function returning the TTL in seconds for new entries
+    name (str): Name under which hits and misses are counted in the metrics
+    """
+
+    def __init__(self, ttl=current_ttl, name="quotes"):
+        self._ttl = ttl
+        self.name = name
+        self._entries = {}    # key -> (expires_at, value)
+        self._inflight = {}   # key -> threading.Event set when the fetch finishes
+        self._lock = threading.Lock()
+
+    def _fresh(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry
+        return None
+
+    def get_many(self, keys, loader):
+        """
+        Get values for several keys, loading missing ones in a single batch
+
+        Parameters:
+        keys (list): Keys to look up
+        loader (callable): Function taking a list of keys and returning a dict of values;
+                           keys missing from the result are treated as failures and not cached
+
+        Returns:
+        dict: Values for every key that is cached or was loaded successfully
+        """
+        keys = list(dict.fromkeys(keys))
+        results, to_load, to_wait = {}, [], {}
+
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                entry = self._fresh(key, now)
+                if entry is not None:
+                    results[key] = entry[1]
+                elif key in self._inflight:
+                    to_wait[key] = self._inflight[key]
+                else:
+                    self._inflight[key] = threading.Event()
+                    to_load.append(key)
+        metrics.record_cache(self.name, hits=len(results), misses=len(to_load), waits=len(to_wait))
+
+        if to_load:
+            loaded = {}
+            try:
+                loaded = loader(to_load) or {}
+            finally:
+                with self._lock:
+                    expires_at = time.monotonic() + self._ttl()
+                    for key in to_load:
+                        if key in loaded:
+                            self._entries[key] = (expires_at, loaded[key])
+                        self._inflight.pop(key).set()
+            results.update({key: loaded[key] for key in to_load if key in loaded})
+
+        for key, event in to_wait.items():
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                results[key] = entry[1]
+
+        return results
+
+    def get(self, key, loader):
+        """
+        Get one value, loading it if it is missing or expired
+
+        Parameters:
+        key: Key to look up
+        loader (callable): Function taking the key and returning its value
+
+        Returns:
+        The cached or freshly loaded value, or None if loading failed
+        """
+        def load(keys):
+            value = loader(keys[0])
+            return {} if value is None else {keys[0]: value}
+
+        return self.get_many([key], load).get(key)
+
+    def put_many(self, values):
+        """
+        Store values directly (e.g. from a background refresh)
+
+        Parameters:
+        values (dict): Values keyed by cache key
+        """
+        with self._lock:
+            expires_at = time.monotonic() + self._ttl()
+            for key, value in values.items():
+                self._entries[key] = (expires_at, value)
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_quote_cache(name="quotes", ttl=current_ttl):
+    """
+    Return a cache shared by all sessions in this process
+
+    Parameters:
+    name (str): Cache name; each kind of data (quotes, indices, screens) gets its own
+    ttl (callable): TTL function used when the cache is first created
+
+    Returns:
+    QuoteCache: The shared cache for that name
+    """
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = QuoteCache(ttl=ttl, name=name)
+        return _caches[name]
@@ -0,0 +1,153 @@
+"""
+Penny-stock screener over a local NSE/BSE symbol universe.
+
+The universe is read from a CSV file (``data/symbols.csv`` by default, or the
+file named by the STOCK_UNIVERSE_FILE environment variable). A month of closes
+for every symbol is bulk-loaded through the history store into one wide
+DataFrame, and the price and return filters are applied to whole columns at
+once instead of symbol by symbol.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import history_store
+
+DEFAULT_UNIVERSE_FILE = os.environ.get(
+    "STOCK_UNIVERSE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "symbols.csv")
+)
+
+# Number of symbols requested per bulk download
+BATCH_SIZE = 200
+
+# Default screen: stocks trading under ₹100
+PENNY_MAX_PRICE = 100
+
+# Columns of a screen result; sector is categorical as it repeats across many rows
+SCREEN_COLUMNS = ['symbol', 'name', 'sector', 'description', 'price', 'pct_change_30d']
+
+
+def load_universe(path=None):
+    """
+    Load the symbol universe from a CSV file
+
+    Accepts the bundled format (symbol, name, exchange, sector, description)
+    as well as NSE's EQUITY_L.csv download (SYMBOL, NAME OF COMPANY, ...),
+    whose symbols are given the ``.NS`` suffix.
+
+    Parameters:
+    path (str): CSV file to read (defaults to DEFAULT_UNIVERSE_FILE)
+
+    Returns:
+    pandas.DataFrame: Universe indexed by symbol with name, exchange, sector and description
+    """
+    universe = pd.read_csv(path or DEFAULT_UNIVERSE_FILE, dtype=str, keep_default_na=False)
+    universe.columns = universe.columns.str.strip()
+
+    if 'SYMBOL' in universe.columns:
+        universe = pd.DataFrame({
+            'symbol': universe['SYMBOL'].str.strip() + '.NS',
+            'name': universe.get('NAME OF COMPANY', universe['SYMBOL']).str.strip(),
+            'exchange': 'NSE',
+        })
+
+    for column in ('name', 'exchange', 'sector', 'description'):
+        if column not in universe.columns:
+            universe[column] = ''
+    universe['sector'] = universe['sector'].replace('', 'Other')
+
+    return universe.drop_duplicates('symbol').set_index('symbol')
+
+
+def load_closes(symbols, period='1mo', store=None):
+    """
+    Bulk-load daily closes for many symbols into one date-aligned DataFrame
+
+    Parameters:
+    symbols (list): Stock ticker symbols
+    period (str): Time period for historical data
+    store (HistoryStore): History store to read from (defaults to the shared store)
+
+    Returns:
+    pandas.DataFrame: Closes with one row per date and one column per symbol
+    """
+    store = store or history_store.get_store()
+    symbols = list(symbols)
+
+    closes = {}
+    for i in range(0, len(symbols), BATCH_SIZE):
+        histories = store.get_many(symbols[i:i + BATCH_SIZE], period)
+        for symbol, hist in histories.items():
+            series = hist['Close']
+            # Align on calendar dates regardless of each symbol's timezone
+            dates = series.index.tz_localize(None) if series.index.tz is not None else series.index
+            closes[symbol] = series.set_axis(dates.normalize())
+
+    if not closes:
+        return pd.DataFrame()
+    return pd.DataFrame(closes).sort_index()
+
+
+def screen(closes, universe, min_price=0, max_price=PENNY_MAX_PRICE, min_return=None, max_return=None):
+    """
+    Apply price and return filters to a wide DataFrame of closes
+
+    Parameters:
+    closes (pandas.DataFrame): Closes with one column per symbol
+    universe (pandas.DataFrame): Universe returned by load_universe
+    min_price (float): Minimum last close (exclusive of zero prices)
+    max_price (float): Maximum last close (None for no limit)
+    min_return (float): Minimum return over the window in percent
+    max_return (float): Maximum return over the window in percent
+
+    Returns:
+    pandas.DataFrame: Matching stocks with symbol, name, sector, description, price and pct_change_30d
+    """
+    if closes.empty:
+        return pd.DataFrame(columns=SCREEN_COLUMNS)
+
+    # Last and first valid close of every column in one pass each
+    price = closes.ffill().iloc[-1]
+    first = closes.bfill().iloc[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_change = ((price - first) / first * 100).where(first > 0, 0.0)
+
+    mask = price.notna() & (price > 0) & (price >= min_price)
+    if max_price is not None:
+        mask &= price <= max_price
+    if min_return is not None:
+        mask &= pct_change >= min_return
+    if max_return is not None:
+        mask &= pct_change <= max_return
+
+    matches = price.index[mask.to_numpy()]
+    details = universe.reindex(matches)
+    result = pd.DataFrame({
+        'symbol': matches,
+        'name': details['name'].fillna(pd.Series(matches, index=matches)).to_numpy(),
+        'sector': pd.Categorical(details['sector'].fillna('Other')),
+        'description': details['description'].fillna('').to_numpy(),
+        'price': price[mask].to_numpy(),
+        'pct_change_30d': pct_change[mask].to_numpy(),
+    })
+    return result[SCREEN_COLUMNS]
+
+
+def run_screen(universe=None, period='1mo', store=None, **filters):
+    """
+    Load closes for a whole universe and screen them
+
+    Parameters:
+    universe (pandas.DataFrame): Universe to scan (defaults to load_universe())
+    period (str): Window used for the return filter
+    store (HistoryStore): History store to read from
+    **filters: Keyword arguments passed to screen()
+
+    Returns:
+    pandas.DataFrame: Matching stocks (see screen())
+    """
+    universe = load_universe() if universe is None else universe
+    closes = load_closes(universe.index, period, store=store)
+    return screen(closes, universe, **filters)
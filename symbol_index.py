@@ -0,0 +1,235 @@
+"""
+In-process symbol index for offline typeahead search.
+
+Symbols and company names from the bundled NSE/BSE master file are held in
+sorted prefix arrays (searched with binary search) plus a trigram index for
+fuzzy name matching, so suggestions are answered locally without any network
+call. Yahoo's remote search is only used as a background enrichment step.
+"""
+import bisect
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import screener
+
+# Minimum trigram similarity for a fuzzy name match
+FUZZY_THRESHOLD = 0.3
+
+# Seconds a remote search result stays valid
+REMOTE_TTL = 86400
+
+# Remote search results kept; the least recently used query is dropped first
+MAX_REMOTE_QUERIES = 500
+
+
+def _trigrams(text):
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _root(symbol):
+    """Symbol without its exchange suffix, e.g. RELIANCE for RELIANCE.NS"""
+    return symbol.upper().rsplit('.', 1)[0]
+
+
+class SymbolIndex:
+    """
+    Prefix and trigram index over stock symbols and company names
+
+    Parameters:
+    entries (list): Dictionaries with at least 'symbol' and 'name' keys
+    """
+
+    def __init__(self, entries=()):
+        self._entries = []
+        self._positions = {}
+        self._symbol_keys = []   # sorted (root symbol, entry id)
+        self._word_keys = []     # sorted (name word, entry id)
+        self._trigrams = defaultdict(set)
+        self._lock = threading.Lock()
+        self.add(entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, entries):
+        """
+        Add entries to the index, ignoring symbols that are already present
+
+        Parameters:
+        entries (list): Dictionaries with 'symbol', 'name' and optional 'exchange'
+        """
+        with self._lock:
+            for entry in entries:
+                symbol = entry['symbol'].upper()
+                if symbol in self._positions:
+                    continue
+
+                entry_id = len(self._entries)
+                name = entry.get('name') or symbol
+                self._entries.append({'symbol': symbol, 'name': name, 'exchange': entry.get('exchange', '')})
+                self._positions[symbol] = entry_id
+
+                bisect.insort(self._symbol_keys, (_root(symbol), entry_id))
+                for word in set(name.lower().split()):
+                    bisect.insort(self._word_keys, (word, entry_id))
+                for trigram in _trigrams(name) | _trigrams(_root(symbol)):
+                    self._trigrams[trigram].add(entry_id)
+
+    @staticmethod
+    def _prefix_matches(keys, prefix):
+        start = bisect.bisect_left(keys, (prefix,))
+        end = bisect.bisect_left(keys, (prefix + '\uffff',))
+        return [entry_id for _, entry_id in keys[start:end]]
+
+    def search(self, query, limit=10):
+        """
+        Find symbols matching a query by symbol prefix, name-word prefix, then fuzzy name
+
+        Parameters:
+        query (str): Symbol or company name fragment
+        limit (int): Maximum number of results
+
+        Returns:
+        list: List of dictionaries containing stock symbols and company names
+        """
+        query = query.strip()
+        if not query:
+            return []
+
+        with self._lock:
+            ranked = []
+            seen = set()
+
+            def take(entry_ids):
+                for entry_id in entry_ids:
+                    if entry_id not in seen:
+                        seen.add(entry_id)
+                        ranked.append(entry_id)
+
+            # Exact symbol first (with or without exchange suffix)
+            exact = self._positions.get(query.upper())
+            if exact is not None:
+                take([exact])
+
+            take(self._prefix_matches(self._symbol_keys, _root(query)))
+
+            # Every word of the query must prefix-match a word of the name
+            words = query.lower().split()
+            candidates = set(self._prefix_matches(self._word_keys, words[0]))
+            for word in words[1:]:
+                candidates &= set(self._prefix_matches(self._word_keys, word))
+            take(sorted(candidates, key=lambda entry_id: self._entries[entry_id]['name']))
+
+            # Fall back to trigram similarity for misspellings
+            if len(ranked) < limit and len(query) >= 3:
+                query_trigrams = _trigrams(query)
+                counts = defaultdict(int)
+                for trigram in query_trigrams:
+                    for entry_id in self._trigrams.get(trigram, ()):
+                        counts[entry_id] += 1
+                scored = [
+                    (count / len(query_trigrams), entry_id)
+                    for entry_id, count in counts.items()
+                    if count / len(query_trigrams) >= FUZZY_THRESHOLD
+                ]
+                take(entry_id for _, entry_id in sorted(scored, key=lambda item: (-item[0], item[1])))
+
+            return [dict(self._entries[entry_id]) for entry_id in ranked[:limit]]
+
+
+class RemoteEnricher:
+    """
+    Runs a remote search function in the background and caches its results
+
+    Results are kept for REMOTE_TTL seconds, for at most MAX_REMOTE_QUERIES
+    queries (least recently used first out).
+
+    Parameters:
+    search_fn (callable): Function taking a query and returning a list of result dictionaries
+    index (SymbolIndex): Index that remote results are added to
+    max_workers (int): Maximum number of concurrent remote searches
+    """
+
+    def __init__(self, search_fn, index=None, max_workers=2):
+        self._search_fn = search_fn
+        self._index = index
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._results = OrderedDict()    # query key -> (fetched at, results), oldest use first
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, query):
+        """
+        Return cached remote results for a query, scheduling a search if there are none
+
+        Parameters:
+        query (str): Search query
+
+        Returns:
+        list: Remote results, or an empty list while the search is still running
+        """
+        key = query.strip().lower()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached and time.time() - cached[0] < REMOTE_TTL:
+                self._results.move_to_end(key)
+                metrics.record_cache("symbol_search", hits=1)
+                return cached[1]
+            if key in self._pending:
+                metrics.record_cache("symbol_search", waits=1)
+            else:
+                self._pending[key] = self._executor.submit(self._run, key, query)
+                metrics.record_cache("symbol_search", misses=1)
+        return []
+
+    def is_pending(self, query):
+        """Whether a remote search for the query is still running"""
+        with self._lock:
+            return query.strip().lower() in self._pending
+
+    def _run(self, key, query):
+        try:
+            results = self._search_fn(query) or []
+        except Exception:
+            results = []
+        with self._lock:
+            self._results[key] = (time.time(), results)
+            self._results.move_to_end(key)
+            while len(self._results) > MAX_REMOTE_QUERIES:
+                self._results.popitem(last=False)
+            self._pending.pop(key, None)
+        if self._index is not None and results:
+            self._index.add(results)
+        return results
+
+
+def build_index(path=None):
+    """
+    Build a symbol index from the bundled NSE/BSE master file
+
+    Parameters:
+    path (str): CSV file to read (defaults to the screener universe file)
+
+    Returns:
+    SymbolIndex: Index over every symbol in the file
+    """
+    universe = screener.load_universe(path)
+    entries = universe.reset_index()[['symbol', 'name', 'exchange']].to_dict('records')
+    return SymbolIndex(entries)
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_index():
+    """Return the process-wide symbol index, building it on first use"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = build_index()
+        return _default_index
@@ -0,0 +1,22 @@
+"""
+Tests for loading the saved alert rules.
+"""
+import pytest
+
+import alerts
+
+
+@pytest.mark.parametrize('content', [
+    '{"rules": [{"id": "a1", "symbol": "TCS.NS"',     # truncated write
+    '{"rules": [{"id": "a1"}]}',                      # rule missing its fields
+    '[]',                                             # not a JSON object
+])
+def test_unreadable_file_starts_with_no_rules(tmp_path, content):
+    path = tmp_path / "alerts.json"
+    path.write_text(content, encoding='utf-8')
+
+    engine = alerts.AlertEngine(str(path), load_closes=lambda symbol: None)
+
+    assert engine.rules == {}
+    assert engine.history == []
+    assert (tmp_path / "alerts.json.corrupt").read_text(encoding='utf-8') == content
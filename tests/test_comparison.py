@@ -0,0 +1,35 @@
+"""
+Tests for comparison, checked against pandas' own pairwise statistics.
+"""
+import numpy as np
+import pandas as pd
+
+import comparison
+
+
+def make_returns(days=200):
+    rng = np.random.default_rng(7)
+    returns = pd.DataFrame(rng.normal(0, 0.01, size=(days, 4)),
+                           index=pd.date_range('2026-01-01', periods=days, freq='B'),
+                           columns=['RELIANCE.NS', 'TCS.NS', 'INFY.NS', 'ITC.NS'])
+    # A late listing and a trading halt exercise the pairwise handling
+    returns.iloc[:40, 1] = np.nan
+    returns.iloc[100:110, 2] = np.nan
+    return returns
+
+
+def test_rolling_correlation_matrix_matches_pandas():
+    returns = make_returns()
+    expected = returns.rolling(comparison.ROLLING_WINDOW, min_periods=comparison.MIN_PERIODS).corr()
+
+    rolling_corr = comparison.rolling_correlation_matrix(returns)
+
+    pd.testing.assert_frame_equal(rolling_corr, expected, check_names=False)
+
+
+def test_rolling_correlation_matrix_over_full_window_matches_static_matrix():
+    returns = make_returns()
+
+    rolling_corr = comparison.rolling_correlation_matrix(returns, window=len(returns))
+
+    pd.testing.assert_frame_equal(rolling_corr.loc[returns.index[-1]], comparison.correlation_matrix(returns))
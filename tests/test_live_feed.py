@@ -0,0 +1,227 @@
+"""
+Tests for live_feed, replaying recorded ticks instead of polling Yahoo.
+"""
+import threading
+
+import pandas as pd
+import pytest
+
+import live_feed
+
+
+# Friday 16 October 2026, 10:00 IST: the market is open
+MARKET_HOURS = pd.Timestamp('2026-10-16 10:00', tz='Asia/Kolkata').timestamp()
+
+
+class FakeClock:
+    """Clock that only moves when told to"""
+
+    def __init__(self, now=MARKET_HOURS):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+# A recorded batch: seconds after the first tick, symbol, price
+RECORDING = [
+    (0, 'AAA.NS', 100.0),
+    (0, 'BBB.NS', 50.0),
+    (30, 'AAA.NS', 101.0),
+    (60, 'AAA.NS', 99.5),
+    (60, 'BBB.NS', 51.0),
+    (400, 'AAA.NS', 102.0),
+]
+
+
+@pytest.fixture
+def recorded():
+    start = pd.Timestamp('2026-10-16 09:15', tz='Asia/Kolkata')
+    return pd.DataFrame({
+        'symbol': [symbol for _, symbol, _ in RECORDING],
+        'time': [(start + pd.Timedelta(seconds=offset)).isoformat() for offset, _, _ in RECORDING],
+        'price': [price for _, _, price in RECORDING],
+    })
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_replay_delivers_only_new_ticks_after_the_cursor(recorded, clock):
+    feed = live_feed.ReplayFeed(recorded, clock=clock)
+
+    # Playback starts at the first read
+    ticks, cursor = feed.updates()
+    assert [(tick.symbol, tick.price) for tick in ticks] == [('AAA.NS', 100.0), ('BBB.NS', 50.0)]
+    assert cursor == 2
+
+    # Nothing new until the recording reaches its next tick
+    assert feed.updates(cursor) == ([], 2)
+
+    clock.advance(60)
+    ticks, cursor = feed.updates(cursor)
+    assert [(tick.symbol, tick.price) for tick in ticks] == [('AAA.NS', 101.0), ('AAA.NS', 99.5), ('BBB.NS', 51.0)]
+    assert cursor == 5
+
+    # A reader starting from zero still gets everything retained
+    ticks, _ = feed.updates(0)
+    assert len(ticks) == 5
+
+
+def test_replay_stamps_ticks_with_play_time_and_first_price_as_prev_close(recorded, clock):
+    feed = live_feed.ReplayFeed(recorded, clock=clock)
+    first, cursor = feed.updates()
+    clock.advance(30)
+    ticks, _ = feed.updates(cursor)
+
+    assert {tick.time for tick in ticks} == {pd.Timestamp(clock.now, unit='s', tz='UTC')}
+    assert [tick.prev_close for tick in first + ticks] == [100.0, 50.0, 100.0]
+
+
+def test_readers_filter_by_symbol_with_independent_cursors(recorded, clock):
+    feed = live_feed.ReplayFeed(recorded, speed=10, clock=clock)
+    feed.updates()
+    clock.advance(6)
+
+    aaa, aaa_cursor = feed.updates(0, ['AAA.NS'])
+    bbb, bbb_cursor = feed.updates(0, ['BBB.NS'])
+    assert [tick.price for tick in aaa] == [100.0, 101.0, 99.5]
+    assert [tick.price for tick in bbb] == [50.0, 51.0]
+    assert aaa_cursor == bbb_cursor == 5
+
+    clock.advance(40)
+    aaa, _ = feed.updates(aaa_cursor, ['AAA.NS'])
+    bbb, _ = feed.updates(bbb_cursor, ['BBB.NS'])
+    assert [tick.price for tick in aaa] == [102.0]
+    assert bbb == []
+
+
+def test_cursor_survives_trimming_the_tick_log(recorded, clock, monkeypatch):
+    monkeypatch.setattr(live_feed, 'MAX_TICKS', 3)
+    feed = live_feed.ReplayFeed(recorded, clock=clock)
+
+    _, cursor = feed.updates()
+    clock.advance(400)
+    ticks, new_cursor = feed.updates(cursor)
+
+    # Only the newest three ticks are retained, but positions keep counting from the start
+    assert new_cursor == 6
+    assert [tick.price for tick in ticks] == [99.5, 51.0, 102.0]
+    assert feed.updates(new_cursor) == ([], 6)
+
+
+def test_merge_ticks_extends_the_open_bar_and_starts_new_ones(recorded, clock):
+    index = pd.DatetimeIndex(['2026-10-16 09:10'], tz='Asia/Kolkata', name='Datetime')
+    hist = pd.DataFrame({'Open': [99.0], 'High': [100.5], 'Low': [98.0], 'Close': [100.0], 'Volume': [1000]},
+                        index=index)
+    # Replayed ticks are stamped with play time, so start the clock inside the 09:10 bar
+    clock.now = pd.Timestamp('2026-10-16 09:13', tz='Asia/Kolkata').timestamp()
+    feed = live_feed.ReplayFeed(recorded, clock=clock)
+
+    ticks, cursor = feed.updates(0, ['AAA.NS'])
+    clock.advance(120)
+    later, _ = feed.updates(cursor, ['AAA.NS'])
+    merged = live_feed.merge_ticks(hist, ticks + later, '5min')
+
+    assert list(merged.index.strftime('%H:%M')) == ['09:10', '09:15']
+    assert merged.loc[index[0]].tolist() == [99.0, 100.5, 98.0, 100.0, 1000]
+    new_bar = merged.iloc[1]
+    assert (new_bar['Open'], new_bar['High'], new_bar['Low'], new_bar['Close']) == (101.0, 101.0, 99.5, 99.5)
+    assert new_bar['Volume'] == 0
+    assert merged['Volume'].dtype == hist['Volume'].dtype
+
+
+def test_apply_ticks_updates_price_and_change(recorded, clock):
+    feed = live_feed.ReplayFeed(recorded, clock=clock)
+    feed.updates()
+    clock.advance(60)
+    ticks, _ = feed.updates(0)
+    quotes = pd.DataFrame({'symbol': ['AAA.NS', 'CCC.NS'], 'price': [98.0, 10.0],
+                           'change': [-2.0, 1.0], 'pct_change': [-2.0, 10.0]})
+
+    updated = live_feed.apply_ticks(quotes, ticks)
+
+    assert updated['price'].tolist() == [99.5, 10.0]
+    assert updated['change'].tolist() == pytest.approx([-0.5, 1.0])
+    assert updated['pct_change'].tolist() == pytest.approx([-0.5, 10.0])
+
+
+def test_polling_feed_fetches_outside_the_lock_and_only_once(clock):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch(symbols):
+        calls.append(symbols)
+        started.set()
+        release.wait(5)
+        return {symbol: (10.0, 9.0) for symbol in symbols}, []
+
+    feed = live_feed.PollingFeed(fetch=fetch, clock=clock)
+    feed.subscribe(['AAA.NS'])
+    poller = threading.Thread(target=feed.updates)
+    poller.start()
+    assert started.wait(5)
+
+    # Another reader returns at once instead of waiting for (or repeating) the fetch
+    assert feed.updates() == ([], 0)
+    release.set()
+    poller.join(5)
+
+    ticks, cursor = feed.updates()
+    assert calls == [['AAA.NS']]
+    assert [(tick.symbol, tick.price) for tick in ticks] == [('AAA.NS', 10.0)]
+    assert cursor == 1
+
+
+def test_polling_feed_drops_symbols_nobody_reads(clock):
+    calls = []
+
+    def fetch(symbols):
+        calls.append(symbols)
+        return {symbol: (10.0, 9.0) for symbol in symbols}, []
+
+    feed = live_feed.PollingFeed(fetch=fetch, interval=5, clock=clock)
+    feed.subscribe(['AAA.NS', 'BBB.NS'])
+    feed.updates()
+
+    # Only AAA.NS keeps being asked for
+    for _ in range(live_feed.SUBSCRIPTION_TTL // 5 + 1):
+        clock.advance(5)
+        feed.subscribe(['AAA.NS'])
+        feed.updates()
+
+    assert calls[0] == ['AAA.NS', 'BBB.NS']
+    assert calls[-1] == ['AAA.NS']
+    assert feed.symbols == ['AAA.NS']
+
+    feed.unsubscribe(['AAA.NS'])
+    clock.advance(5)
+    feed.updates()
+    assert feed.symbols == []
+    assert calls[-1] == ['AAA.NS']
+
+
+@pytest.mark.parametrize('when', ['2026-10-16 08:30', '2026-10-16 16:00', '2026-10-17 11:00'])
+def test_polling_feed_logs_no_ticks_outside_market_hours(when):
+    calls = []
+
+    def fetch(symbols):
+        calls.append(symbols)
+        return {symbol: (10.0, 9.0) for symbol in symbols}, []
+
+    clock = FakeClock(pd.Timestamp(when, tz='Asia/Kolkata').timestamp())
+    feed = live_feed.PollingFeed(fetch=fetch, clock=clock)
+    feed.subscribe(['AAA.NS'])
+
+    assert feed.updates() == ([], 0)
+    assert calls == []
+
+
+def test_feed_requires_a_poll_implementation():
+    with pytest.raises(TypeError):
+        live_feed.Feed()
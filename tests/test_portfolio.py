@@ -0,0 +1,32 @@
+"""
+Tests for loading and saving the shared portfolio file.
+"""
+import pytest
+
+import portfolio
+
+
+@pytest.mark.parametrize('content', [
+    '{"transactions": [{"date": "2026-10-1',    # truncated write
+    '[]',                                       # not a JSON object
+    '{"transactions": [{"date": "soon", "symbol": "TCS.NS", "side": "BUY", "quantity": 1, "price": 1}]}',
+])
+def test_unreadable_file_loads_as_empty_portfolio(tmp_path, content):
+    path = tmp_path / "portfolio.json"
+    path.write_text(content, encoding='utf-8')
+
+    book = portfolio.Portfolio.load(str(path))
+
+    assert book.transactions.empty
+    assert book.is_current(str(path))
+    assert (tmp_path / "portfolio.json.corrupt").read_text(encoding='utf-8') == content
+
+
+def test_update_replaces_unreadable_file(tmp_path):
+    path = str(tmp_path / "portfolio.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"transactions": [')
+
+    portfolio.update(lambda book: book.add('TCS.NS', 'BUY', 2, 4000.0, on='2026-10-16'), path)
+
+    assert portfolio.Portfolio.load(path).transactions['symbol'].tolist() == ['TCS.NS']